@@ -1,7 +1,14 @@
+import importlib
+import os
+import re
+from collections import deque
+from contextlib import nullcontext
+from typing import ContextManager, Optional
 import streamlit as st
-import pandas as pd
-from datetime import datetime
-from typing import List, Dict, Any
+
+from metrics import METRICS_PATH, REGISTRY, begin_rerun, count, timed
+from storage import Store, StorePool, open_store
+from views import PAGES
 
 # ---------- PAGE CONFIG ----------
 st.set_page_config(
@@ -11,549 +18,156 @@ st.set_page_config(
 )
 
 # ---------- STATE INITIALISATION ----------
-def init_state():
-    if "settings" not in st.session_state:
-        st.session_state.settings = {
-            "diabetes_type": "Type 1",
-            "target_min": 4.0,
-            "target_max": 10.0,
-            "hypo_threshold": 4.0,
-            "hyper_threshold": 14.0,
-        }
-    if "bg_readings" not in st.session_state:
-        st.session_state.bg_readings: List[Dict[str, Any]] = []
-    if "med_logs" not in st.session_state:
-        st.session_state.med_logs: List[Dict[str, Any]] = []
-    if "meal_logs" not in st.session_state:
-        st.session_state.meal_logs: List[Dict[str, Any]] = []
-    if "activity_logs" not in st.session_state:
-        st.session_state.activity_logs: List[Dict[str, Any]] = []
-
-init_state()
-
-settings = st.session_state.settings
-bg_readings = st.session_state.bg_readings
-med_logs = st.session_state.med_logs
-meal_logs = st.session_state.meal_logs
-activity_logs = st.session_state.activity_logs
-
-# ---------- HELPERS (DATAFRAMES) ----------
-def bg_df() -> pd.DataFrame:
-    if not bg_readings:
-        return pd.DataFrame(columns=["time", "value", "context", "notes"])
-    df = pd.DataFrame(bg_readings)
-    df["time"] = pd.to_datetime(df["time"], errors="coerce")
-    return df.sort_values("time")
-
-def med_df() -> pd.DataFrame:
-    if not med_logs:
-        return pd.DataFrame(columns=["time", "name", "dose", "taken"])
-    df = pd.DataFrame(med_logs)
-    df["time"] = pd.to_datetime(df["time"], errors="coerce")
-    return df.sort_values("time")
-
-def meal_df() -> pd.DataFrame:
-    if not meal_logs:
-        return pd.DataFrame(columns=["time", "description", "carbs"])
-    df = pd.DataFrame(meal_logs)
-    df["time"] = pd.to_datetime(df["time"], errors="coerce")
-    return df.sort_values("time")
-
-def activity_df() -> pd.DataFrame:
-    if not activity_logs:
-        return pd.DataFrame(columns=["time", "type", "duration", "intensity"])
-    df = pd.DataFrame(activity_logs)
-    df["time"] = pd.to_datetime(df["time"], errors="coerce")
-    return df.sort_values("time")
-
-# ---------- SIDEBAR NAVIGATION ----------
-st.sidebar.title("💚 Alera")
-
-page = st.sidebar.radio(
-    "Navigation",
-    [
-        "Dashboard",
-        "Log blood glucose",
-        "Medication",
-        "Food",
-        "Activity",
-        "Insights",
-        "Education & coping",
-        "Settings",
-    ],
-)
-
-st.sidebar.markdown(
-    "This app is a **support tool** and does **not** replace your diabetes team."
+# ALERA_STORAGE picks the backend: "memory" (default: private to each
+# browser session, lost on restart) or "sqlite" (durable, but one file,
+# ALERA_DB_PATH, shared by every session: for running the app for yourself).
+STORAGE_BACKEND = os.environ.get("ALERA_STORAGE", "memory")
+DB_PATH = os.environ.get(
+    "ALERA_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "alera.db"),
 )
-
-# ---------- EMERGENCY BANNER ----------
-_all_bg = bg_df()
-latest_bg = _all_bg.iloc[-1] if not _all_bg.empty else None
-
-if latest_bg is not None:
-    if latest_bg["value"] < settings["hypo_threshold"]:
-        st.warning(
-            "⚠️ **Low blood sugar alert**  \n"
-            f"Your latest reading is **{latest_bg['value']} mmol/L**, "
-            "which is below your low threshold. "
-            "Take fast-acting sugar (e.g. juice or glucose tablets), "
-            "re-check in about 15 minutes, and contact emergency services "
-            "or your healthcare team if you feel very unwell.",
-            icon="⚠️",
-        )
-    elif latest_bg["value"] > settings["hyper_threshold"]:
-        st.error(
-            "🚨 **High blood sugar alert**  \n"
-            f"Your latest reading is **{latest_bg['value']} mmol/L**, "
-            "which is above your high threshold. If you feel very unwell "
-            "(nausea, vomiting, tummy pain, deep breathing), contact "
-            "emergency services or your healthcare team urgently.",
-            icon="🚨",
-        )
-
-# ---------- PAGES ----------
-def page_dashboard():
-    st.title("📊 Dashboard")
-
-    df_all = bg_df()
-
-    col1, col2 = st.columns([1.2, 1])
-
-    # --- LEFT: Latest + chart ---
-    with col1:
-        st.subheader("Latest reading")
-
-        latest = df_all.iloc[-1] if not df_all.empty else None
-
-        if latest is None:
-            st.info("No readings yet – log your first reading on the *Log blood glucose* page.")
-        else:
-            st.markdown(
-                f"""
-                <div style="
-                    padding: 1rem;
-                    border-radius: 1rem;
-                    border: 1px solid rgba(148,163,184,0.5);
-                    background: rgba(15,23,42,0.85);
-                ">
-                  <div style="font-size: 2.2rem; font-weight: 700; color: #22c55e;">
-                    {latest['value']} <span style="font-size: 1rem; color: #9ca3af;">mmol/L</span>
-                  </div>
-                  <div style="font-size: 0.85rem; color: #9ca3af;">
-                    {latest['time'].strftime('%d %b %Y, %H:%M')} · {latest['context']}
-                  </div>
-                  <div style="font-size: 0.85rem; color: #9ca3af; margin-top: 0.15rem;">
-                    Target: {settings['target_min']} – {settings['target_max']} mmol/L
-                  </div>
-                  {"<div style='margin-top:0.35rem; font-size:0.85rem; color:#e5e7eb;'>“" + str(latest['notes']) + "”</div>" if pd.notna(latest['notes']) and latest['notes'] else ""}
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
-
-        st.markdown("### Trend over time")
-        if df_all.empty:
-            st.info("Once you add some readings, a chart will appear here.")
-        else:
-            chart_df = df_all.set_index("time")[["value"]]
-            st.line_chart(chart_df)
-
-    # --- RIGHT: Today & counts ---
-    with col2:
-        st.subheader("Today at a glance")
-
-        today = pd.Timestamp.today().normalize()
-
-        def today_filter(df: pd.DataFrame) -> pd.DataFrame:
-            if df.empty:
-                return df
-            times = pd.to_datetime(df["time"], errors="coerce")
-            return df[times.dt.normalize() == today]
-
-        df_bg_today = today_filter(df_all)
-        df_med_today = today_filter(med_df())
-        df_meal_today = today_filter(meal_df())
-        df_act_today = today_filter(activity_df())
-
-        def stat(label: str, value: Any):
-            st.markdown(
-                f"""
-                <div style="
-                    padding: 0.4rem 0.7rem;
-                    margin-bottom: 0.3rem;
-                    border-radius: 999px;
-                    border: 1px solid rgba(148,163,184,0.6);
-                    display: flex;
-                    justify-content: space-between;
-                    font-size: 0.85rem;
-                ">
-                  <span style="color:#9ca3af;">{label}</span>
-                  <span style="font-weight:600;">{value}</span>
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
-
-        stat("Readings today", len(df_bg_today))
-        stat("Meds logged today", len(df_med_today))
-        stat("Meals today", len(df_meal_today))
-        stat("Activity logs today", len(df_act_today))
-
-        total = len(df_all)
-        if total:
-            in_range = df_all[
-                (df_all["value"] >= settings["target_min"])
-                & (df_all["value"] <= settings["target_max"])
-            ]
-            lows = df_all[df_all["value"] < settings["hypo_threshold"]]
-            highs = df_all[df_all["value"] > settings["hyper_threshold"]]
-            stat("Total readings", total)
-            stat("In range (%)", f"{round(len(in_range) / total * 100)}%")
-            stat("Lows", len(lows))
-            stat("Highs", len(highs))
-        else:
-            st.caption("Log some readings to see more stats here.")
-
-def page_log_bg():
-    st.title("🩸 Log blood glucose")
-
-    with st.form("bg_form", clear_on_submit=True):
-        cols = st.columns(2)
-        with cols[0]:
-            value = st.number_input("Value (mmol/L)", min_value=0.0, step=0.1)
-            context = st.selectbox(
-                "Context",
-                ["Before meal", "After meal", "Waking", "Bedtime", "Exercise"],
-            )
-        with cols[1]:
-            # Date + time instead of st.datetime_input
-            date_input = st.date_input("Date", value=datetime.now().date())
-            time_input = st.time_input("Time", value=datetime.now().time())
-            time = datetime.combine(date_input, time_input)
-
-            notes = st.text_input(
-                "Notes (optional)",
-                placeholder="How you felt / what was happening",
-            )
-
-        submitted = st.form_submit_button("Save reading")
-        if submitted:
-            bg_readings.append(
-                {
-                    "time": time.isoformat(),
-                    "value": float(value),
-                    "context": context,
-                    "notes": notes.strip(),
-                }
-            )
-            st.success("Saved blood glucose reading ✅")
-
-    st.markdown("### Recent readings")
-    df = bg_df().tail(15)
-    if df.empty:
-        st.info("No readings yet.")
-    else:
-        df_display = df.copy()
-        df_display["time"] = df_display["time"].dt.strftime("%d %b %Y, %H:%M")
-        st.dataframe(df_display, use_container_width=True)
-
-def page_meds():
-    st.title("💊 Medication")
-
-    with st.form("med_form", clear_on_submit=True):
-        cols = st.columns(2)
-        with cols[0]:
-            name = st.text_input(
-                "Medication name",
-                placeholder="e.g. Metformin, long-acting insulin",
-            )
-            dose = st.text_input("Dose", placeholder="e.g. 500mg, 10 units")
-        with cols[1]:
-            # Date + time instead of st.datetime_input
-            date_input = st.date_input("Date (medication)", value=datetime.now().date())
-            time_input = st.time_input("Time (medication)", value=datetime.now().time())
-            time = datetime.combine(date_input, time_input)
-
-            taken = st.checkbox("Taken now", value=True)
-
-        submitted = st.form_submit_button("Save medication log")
-        if submitted:
-            if not name.strip():
-                st.error("Please enter a medication name.")
-            else:
-                med_logs.append(
-                    {
-                        "time": time.isoformat(),
-                        "name": name.strip(),
-                        "dose": dose.strip() or "As prescribed",
-                        "taken": bool(taken),
-                    }
-                )
-                st.success("Saved medication log ✅")
-
-    st.markdown("### Recent medication")
-    df = med_df().tail(20)
-    if df.empty:
-        st.info("No medication logged yet.")
-    else:
-        df_display = df.copy()
-        df_display["time"] = df_display["time"].dt.strftime("%d %b %Y, %H:%M")
-        df_display["taken"] = df_display["taken"].map(
-            {True: "Taken", False: "Missed"}
-        )
-        st.dataframe(df_display, use_container_width=True)
-
-def page_food():
-    st.title("🍽️ Food & carbs")
-
-    with st.form("meal_form", clear_on_submit=True):
-        description = st.text_input(
-            "Meal / snack", placeholder="e.g. rice and chicken, porridge"
-        )
-        cols = st.columns(2)
-        with cols[0]:
-            carbs = st.number_input(
-                "Carbs (g, optional)", min_value=0, step=1
-            )
-        with cols[1]:
-            # Date + time instead of st.datetime_input
-            date_input = st.date_input("Date (meal)", value=datetime.now().date())
-            time_input = st.time_input("Time (meal)", value=datetime.now().time())
-            time = datetime.combine(date_input, time_input)
-
-        submitted = st.form_submit_button("Save meal")
-        if submitted:
-            if not description.strip():
-                st.error("Please enter a description.")
-            else:
-                meal_logs.append(
-                    {
-                        "time": time.isoformat(),
-                        "description": description.strip(),
-                        "carbs": int(carbs) if carbs else None,
-                    }
-                )
-                st.success("Saved meal ✅")
-
-    st.markdown("### Recent meals")
-    df = meal_df().tail(20)
-    if df.empty:
-        st.info("No meals logged yet.")
-    else:
-        df_display = df.copy()
-        df_display["time"] = df_display["time"].dt.strftime("%d %b %Y, %H:%M")
-        st.dataframe(df_display, use_container_width=True)
-
-def page_activity():
-    st.title("🏃 Activity")
-
-    with st.form("activity_form", clear_on_submit=True):
-        type_ = st.text_input(
-            "Activity type",
-            placeholder="e.g. walking, football, gym",
-        )
-        cols = st.columns(2)
-        with cols[0]:
-            duration = st.number_input(
-                "Duration (minutes)", min_value=0, step=5
-            )
-        with cols[1]:
-            intensity = st.selectbox(
-                "Intensity", ["Light", "Moderate", "Intense"]
-            )
-
-        # Date + time instead of st.datetime_input
-        date_input = st.date_input("Date (activity)", value=datetime.now().date())
-        time_input = st.time_input("Time (activity)", value=datetime.now().time())
-        time = datetime.combine(date_input, time_input)
-
-        submitted = st.form_submit_button("Save activity")
-        if submitted:
-            if not type_.strip():
-                st.error("Please enter an activity.")
-            else:
-                activity_logs.append(
-                    {
-                        "time": time.isoformat(),
-                        "type": type_.strip(),
-                        "duration": int(duration),
-                        "intensity": intensity,
-                    }
-                )
-                st.success("Saved activity ✅")
-
-    st.markdown("### Recent activity")
-    df = activity_df().tail(20)
-    if df.empty:
-        st.info("No activity logged yet.")
+# ALERA_DATA_DIR turns on multi-user mode for running one server for many
+# people: each user's entries and settings live in their own SQLite file in
+# that directory, picked with ?user=<name> in the URL.
+DATA_DIR = os.environ.get("ALERA_DATA_DIR")
+if DATA_DIR:
+    os.makedirs(DATA_DIR, exist_ok=True)
+USER_NAME = re.compile(r"[A-Za-z0-9_-]{1,64}")  # also a safe file name
+# Most stores (users' databases) kept open at once; past this the least
+# recently used one no rerun is using is flushed and closed, and reopened
+# when its user returns.
+MAX_STORES = int(os.environ.get("ALERA_MAX_STORES", "64"))
+
+# Wall time, rows and cache hits of the instrumented parts of this rerun.
+rerun = begin_rerun()
+
+# One store per database file for the whole process, so every session of a
+# user shares its connection, indexes and (through cache.shared_cache) the
+# frames and reports built from it.
+@st.cache_resource
+def store_pool() -> StorePool:
+    return StorePool(MAX_STORES)
+
+def leased_store(path: Optional[str]) -> ContextManager[Store]:
+    # SQLite stores are leased from the pool for one rerun at a time, so
+    # none is closed while a rerun uses it; memory stores live in the session.
+    if path is None:
+        return nullcontext(st.session_state.store)
+    return store_pool().lease(path)
+
+def current_user() -> Optional[str]:
+    name = st.query_params.get("user", "")
+    return name if USER_NAME.fullmatch(name) else None
+
+def sign_in():
+    st.title("💚 Alera")
+    name = st.text_input("Your name", help="Letters, numbers, - and _ only.")
+    if st.button("Continue") and name:
+        if USER_NAME.fullmatch(name):
+            st.query_params["user"] = name
+            st.rerun()
+        st.error("Please use only letters, numbers, - and _.")
+    st.stop()
+
+@timed()
+def init_state() -> Optional[str]:
+    # The database file this session's store reads, or None for a memory store.
+    if DATA_DIR:
+        user = current_user()
+        if user is None:
+            sign_in()
+        st.session_state.user = user
+        return os.path.join(DATA_DIR, f"{user}.db")
+    if STORAGE_BACKEND == "sqlite":
+        return DB_PATH
+    if "store" not in st.session_state:
+        st.session_state.store = open_store(STORAGE_BACKEND)
     else:
-        df_display = df.copy()
-        df_display["time"] = df_display["time"].dt.strftime("%d %b %Y, %H:%M")
-        st.dataframe(df_display, use_container_width=True)
-
-def page_insights():
-    st.title("🧠 Insights & patterns")
-
-    df = bg_df()
-    if df.empty:
-        st.info("Once you’ve logged some readings, insights will appear here.")
-        return
-
-    insights = []
-
-    lows = df[df["value"] < settings["hypo_threshold"]]
-    highs = df[df["value"] > settings["hyper_threshold"]]
-    in_range = df[
-        (df["value"] >= settings["target_min"])
-        & (df["value"] <= settings["target_max"])
-    ]
-
-    if len(lows) >= 3:
-        insights.append(
-            "You’ve had several low readings. This is something to discuss with your "
-            "diabetes nurse or doctor. Make sure you carry fast-acting sugar with you."
-        )
-    if len(highs) >= 3:
-        insights.append(
-            "You’ve had multiple high readings. It may help to review your insulin/"
-            "medication and meal pattern with your healthcare team."
-        )
-    if len(df) >= 5 and len(in_range) / len(df) >= 0.7:
-        insights.append(
-            "A lot of your readings are within your target range. That’s really positive – "
-            "remember that one off day doesn’t mean failure."
-        )
-    if not insights:
-        insights.append(
-            "Your readings are still building up. Keep logging and patterns will become "
-            "clearer to talk through with your team."
-        )
-
-    st.markdown("### Suggestions based on your data")
-    for i, text in enumerate(insights, start=1):
-        st.markdown(f"**Insight {i}:** {text}")
-
-    st.markdown("### Graph view")
-    chart_df = df.set_index("time")[["value"]]
-    st.line_chart(chart_df)
-
-    st.caption(
-        "This app never tells you to change your doses. It only highlights patterns so you can "
-        "discuss them with a professional."
+        count(cache_hits=1)
+    return None
+
+store_path = init_state()
+
+with leased_store(store_path) as store:
+    st.session_state.store = store
+    # A copy of the store's settings on every rerun, so a change saved in
+    # another session or tab shows up here too.
+    st.session_state.settings = dict(store.settings)
+    settings = st.session_state.settings
+
+    # ---------- SIDEBAR NAVIGATION ----------
+    st.sidebar.title("💚 Alera")
+    if DATA_DIR:
+        st.sidebar.caption(f"Signed in as **{st.session_state.user}**")
+
+    page = st.sidebar.radio(
+        "Navigation",
+        [label for label in PAGES if label != "Diagnostics" or settings["diagnostics"]],
+        key="page",
     )
 
-def page_education():
-    st.title("📚 Education & coping")
-
-    st.markdown(
-        """
-        Living with diabetes means juggling food, movement, stress, sleep, and medication.  
-        This space is for calm, human-language explanations – not judgement.
-        """
+    st.sidebar.markdown(
+        "This app is a **support tool** and does **not** replace your diabetes team."
     )
 
-    with st.expander("Lows (hypoglycaemia)"):
-        st.write(
-            "Low blood sugar can make you feel shaky, sweaty, confused, hungry, or just 'not right'. "
-            "Treat with fast-acting sugar (like juice or glucose tablets) and re-test after about "
-            "15 minutes. If you don’t feel better, or you can’t keep sugar down, seek urgent "
-            "medical help."
-        )
-
-    with st.expander("Highs (hyperglycaemia)"):
-        st.write(
-            "High blood sugar over time can cause complications, but one high reading does **not** "
-            "mean you’ve failed. If you have very high readings and feel very unwell "
-            "(tummy pain, sickness, heavy breathing), contact emergency services – especially if you use insulin."
-        )
-
-    with st.expander("Stress, sleep & emotions"):
-        st.write(
-            "Exams, arguments, poor sleep and illness can all push your numbers up or down. You are "
-            "not a robot. Some days will just be messy – and that’s okay. What matters is safety "
-            "and patterns over time, not perfection."
-        )
-
-    with st.expander("Talking to your diabetes team"):
-        st.write(
-            "Bring this app to appointments. Show your nurse or doctor your readings and notes. "
-            "Use phrases like *'I’ve noticed I’m often high in the morning'* instead of *'I’m bad at this'*. "
-            "You deserve care, not judgement."
-        )
-
-    st.caption(
-        "Always follow advice from your diabetes team. This app is a companion, not a replacement for professional care."
-    )
-
-def page_settings():
-    st.title("⚙️ Settings")
-
-    st.markdown("Set targets **with your healthcare team** if you can.")
-
-    with st.form("settings_form"):
-        diabetes_type = st.selectbox(
-            "Diabetes type",
-            ["Type 1", "Type 2", "Gestational", "Other / unsure"],
-            index=["Type 1", "Type 2", "Gestational", "Other / unsure"].index(
-                settings["diabetes_type"]
-            )
-            if settings["diabetes_type"]
-            in ["Type 1", "Type 2", "Gestational", "Other / unsure"]
-            else 0,
-        )
+    # ---------- EMERGENCY BANNER ----------
+    # The store keeps the newest reading, with its stored class, current on
+    # every write, so this costs the same on every page however long the history.
+    with rerun.section("banner"):
+        latest_bg = store.latest("bg_readings")
+        count(rows=int(latest_bg is not None))
+
+        if latest_bg is not None:
+            if latest_bg["status"] == "low":
+                st.warning(
+                    "⚠️ **Low blood sugar alert**  \n"
+                    f"Your latest reading is **{latest_bg['value']} mmol/L**, "
+                    "which is below your low threshold. "
+                    "Take fast-acting sugar (e.g. juice or glucose tablets), "
+                    "re-check in about 15 minutes, and contact emergency services "
+                    "or your healthcare team if you feel very unwell.",
+                    icon="⚠️",
+                )
+            elif latest_bg["status"] == "very high":
+                st.error(
+                    "🚨 **High blood sugar alert**  \n"
+                    f"Your latest reading is **{latest_bg['value']} mmol/L**, "
+                    "which is above your high threshold. If you feel very unwell "
+                    "(nausea, vomiting, tummy pain, deep breathing), contact "
+                    "emergency services or your healthcare team urgently.",
+                    icon="🚨",
+                )
 
-        col1, col2 = st.columns(2)
-        with col1:
-            target_min = st.number_input(
-                "Target min (mmol/L)",
-                value=float(settings["target_min"]),
-                step=0.1,
-            )
-            hypo_threshold = st.number_input(
-                "Low alert threshold",
-                value=float(settings["hypo_threshold"]),
-                step=0.1,
-            )
-        with col2:
-            target_max = st.number_input(
-                "Target max (mmol/L)",
-                value=float(settings["target_max"]),
-                step=0.1,
+        # Entries that kept failing to save: the user was told they were
+        # saved, and a low reading among them isn't in the alert above.
+        failed = store.failed_writes()
+        if failed:
+            st.error(
+                f"💾 **{len(failed)} of your entries could not be saved** and are not in your logs yet, "
+                "so the alerts and charts don't include them. Please try again, and if it keeps "
+                "failing write them down and contact whoever runs this app.",
+                icon="💾",
             )
-            hyper_threshold = st.number_input(
-                "High alert threshold",
-                value=float(settings["hyper_threshold"]),
-                step=0.1,
-            )
-
-        submitted = st.form_submit_button("Save settings")
-        if submitted:
-            settings["diabetes_type"] = diabetes_type
-            settings["target_min"] = float(target_min)
-            settings["target_max"] = float(target_max)
-            settings["hypo_threshold"] = float(hypo_threshold)
-            settings["hyper_threshold"] = float(hyper_threshold)
-            st.success("Settings updated ✅")
-
-    st.caption(
-        "These values are used to colour readings as low / in range / high and to show safety alerts."
-    )
-
-# ---------- ROUTER ----------
-if page == "Dashboard":
-    page_dashboard()
-elif page == "Log blood glucose":
-    page_log_bg()
-elif page == "Medication":
-    page_meds()
-elif page == "Food":
-    page_food()
-elif page == "Activity":
-    page_activity()
-elif page == "Insights":
-    page_insights()
-elif page == "Education & coping":
-    page_education()
-elif page == "Settings":
-    page_settings()
+            with st.expander("Unsaved entries"):
+                st.dataframe(failed, hide_index=True, use_container_width=True)
+            if st.button("Try saving them again", key="retry_failed"):
+                if store.retry_failed():
+                    st.warning("Some entries still could not be saved.")
+                else:
+                    st.rerun()
+
+    # ---------- ROUTER ----------
+    # Each page lives in its own module under views/ and is imported the first
+    # time it is shown, so pandas and the analytics code are only loaded once a
+    # page that needs them is opened.
+    module_name, function_name = PAGES[page]
+    getattr(importlib.import_module(f"views.{module_name}"), function_name)()
+
+# ---------- METRICS ----------
+# Each session keeps its last reruns for the diagnostics page; the process
+# totals go to the metrics file when one is configured.
+rerun.page = page
+REGISTRY.record(rerun.finish())
+st.session_state.setdefault("rerun_history", deque(maxlen=30)).append(rerun)
+if METRICS_PATH:
+    REGISTRY.write(METRICS_PATH)
@@ -0,0 +1,150 @@
+import os
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+# ---------- SEGMENTS ----------
+# Entries older than the hot window are moved out of SQLite into one
+# zstd-compressed Parquet file per log per calendar month. A segment holds
+# the entries' ids and stored columns in (time, id) order. Derived columns
+# (a reading's class) are not archived but recomputed when a segment is
+# read, so new thresholds never rewrite segments.
+#
+# pyarrow is imported on first use, so pages that never reach back into
+# the archive don't load it.
+PARQUET_TYPES = {"REAL": "float64", "TEXT": "string", "INTEGER": "int64"}
+
+
+@dataclass
+class Segment:
+    # One row of the store's manifest: what a segment holds, so a query
+    # only opens the segments its window overlaps.
+    log: str
+    month: str  # YYYY-MM
+    file: str  # name in the archive directory
+    rows: int
+    min_time: str
+    max_time: str
+    min_id: int
+    max_id: int
+
+    def overlaps(self, lo: str, hi: str) -> bool:
+        # Whether any entry can have lo <= time < hi (ISO strings).
+        return self.min_time < hi and self.max_time >= lo
+
+
+def month_bounds(month: str) -> Tuple[str, str]:
+    # The first days of `month` (YYYY-MM) and of the month after, as ISO
+    # dates: they sort before every time on that day.
+    year, number = int(month[:4]), int(month[5:7])
+    after = f"{year + number // 12:04d}-{number % 12 + 1:02d}"
+    return f"{month}-01", f"{after}-01"
+
+
+def segment_table(types: Dict[str, str], columns: Sequence[Sequence[Any]]):
+    # A table from the id, time and other columns (lists or arrays, values
+    # as SQLite returns them); `types` maps the columns after time to their
+    # SQL types.
+    import pyarrow as pa
+
+    names = ["id", "time", *types]
+    kinds = [pa.int64(), pa.string(), *(pa.type_for_alias(PARQUET_TYPES[kind]) for kind in types.values())]
+    return pa.table(
+        [pa.array(values, type=kind) for values, kind in zip(columns, kinds)],
+        names=names,
+    )
+
+
+def merge_tables(tables: List[Any]):
+    import pyarrow as pa
+
+    return pa.concat_tables(tables).sort_by([("time", "ascending"), ("id", "ascending")])
+
+
+def describe(log_name: str, month: str, file: str, table) -> Segment:
+    import pyarrow.compute as pc
+
+    ids = pc.min_max(table["id"])
+    return Segment(
+        log=log_name,
+        month=month,
+        file=file,
+        rows=table.num_rows,
+        min_time=table["time"][0].as_py(),
+        max_time=table["time"][-1].as_py(),
+        min_id=ids["min"].as_py(),
+        max_id=ids["max"].as_py(),
+    )
+
+
+def write_segment(path: str, table):
+    # Written in full and synced before it takes the final name: the store
+    # deletes the archived rows from SQLite right after.
+    import pyarrow.parquet as pq
+
+    partial = path + ".partial"
+    with open(partial, "wb") as out:
+        pq.write_table(table, out, compression="zstd")
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(partial, path)
+
+
+def read_segment(path: str, columns: Optional[List[str]] = None):
+    import pyarrow.parquet as pq
+
+    return pq.read_table(path, columns=columns)
+
+
+# ---------- FILTERS ----------
+# Masks over a segment table, matching the WHERE clauses of the SQL the
+# store runs against its hot tables, and `select` to apply them.
+def select(table, *masks):
+    import pyarrow.compute as pc
+
+    if not masks:
+        return table
+    mask = masks[0]
+    for other in masks[1:]:
+        mask = pc.and_(mask, other)
+    return table.filter(mask)
+
+
+def in_window(table, lo: str, hi: str):
+    import pyarrow.compute as pc
+
+    return pc.and_(pc.greater_equal(table["time"], lo), pc.less(table["time"], hi))
+
+
+def ids_after(table, version: int):
+    import pyarrow.compute as pc
+
+    return pc.greater(table["id"], version)
+
+
+def after_key(table, key: Tuple[str, int]):
+    # (time, id) > key
+    import pyarrow.compute as pc
+
+    time, entry_id = key
+    return pc.or_(
+        pc.greater(table["time"], time),
+        pc.and_(pc.equal(table["time"], time), pc.greater(table["id"], entry_id)),
+    )
+
+
+def before_key(table, key: Tuple[str, int]):
+    # (time, id) < key
+    import pyarrow.compute as pc
+
+    time, entry_id = key
+    return pc.or_(
+        pc.less(table["time"], time),
+        pc.and_(pc.equal(table["time"], time), pc.less(table["id"], entry_id)),
+    )
+
+
+def equal_to(table, column: str, value: Any):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    return pc.equal(table[column], pa.scalar(value).cast(table[column].type))
@@ -0,0 +1,196 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List, Dict, Any
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from bench.synth import synth_db
+
+# Drives every page of app.py headlessly with Streamlit's AppTest against
+# synthetic SQLite histories, and compares the numbers with a stored
+# baseline. Run from the repository root:
+#
+#     python -m bench.run_bench                      # compare with baseline
+#     python -m bench.run_bench --sizes 1k 100k      # a subset of sizes
+#     python -m bench.run_bench --save-baseline      # record a new baseline
+#
+# For each page it reports:
+#   cold_ms   median first render of the page across fresh sessions
+#   rerun_ms  median of further reruns of the page in the last session
+#   peak_mb   peak traced Python memory during a cold render
+#
+# A fresh session starts with the process-wide caches (st.cache_resource:
+# the store pool and the shared frame cache) emptied, as on a server that
+# has just started, so cold numbers include opening the store and building
+# every frame. Modules stay imported.
+
+ROOT = Path(__file__).resolve().parent.parent
+APP = ROOT / "app.py"
+BASELINE = Path(__file__).with_name("baseline.json")
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+TIMEOUT = 600
+
+
+def fresh_session(page: str) -> AppTest:
+    at = AppTest.from_file(str(APP), default_timeout=TIMEOUT)
+    at.session_state["page"] = page
+    return at
+
+
+def discard(at: AppTest):
+    # Ends a session and empties the process-wide caches for the next one.
+    # The store it used is closed first, so the next session's pool doesn't
+    # open a second connection to the file while this one is still open.
+    if "store" in at.session_state:
+        at.session_state["store"].close()
+    st.cache_resource.clear()
+
+
+def check(at: AppTest, page: str):
+    if at.exception:
+        raise RuntimeError(f"{page} raised: {at.exception[0].message}")
+
+
+def bench_page(page: str, sessions: int, reruns: int) -> Dict[str, float]:
+    cold = []
+    for session in range(sessions):
+        at = fresh_session(page)
+        start = time.perf_counter()
+        at.run()
+        cold.append(time.perf_counter() - start)
+        check(at, page)
+        if session < sessions - 1:
+            discard(at)
+
+    times = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - start)
+        check(at, page)
+    discard(at)
+
+    # Memory is measured in a separate session: tracing slows everything
+    # down, so it must not overlap the timed runs.
+    at = fresh_session(page)
+    tracemalloc.start()
+    at.run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    discard(at)
+
+    return {
+        "cold_ms": round(statistics.median(cold) * 1000, 1),
+        "rerun_ms": round(statistics.median(times) * 1000, 1),
+        "peak_mb": round(peak / 1e6, 1),
+    }
+
+
+def bench_size(label: str, data_dir: Path, sessions: int, reruns: int) -> Dict[str, Dict[str, float]]:
+    path = data_dir / f"alera-{label}.db"
+    if not path.exists():
+        print(f"Generating {SIZES[label]:,} readings…", file=sys.stderr)
+        synth_db(str(path), SIZES[label])
+    os.environ["ALERA_STORAGE"] = "sqlite"
+    os.environ["ALERA_DB_PATH"] = str(path)
+
+    at = AppTest.from_file(str(APP), default_timeout=TIMEOUT).run()
+    pages = at.sidebar.radio[0].options
+    discard(at)
+    results = {}
+    for page in pages:
+        results[page] = bench_page(page, sessions, reruns)
+        print(f"{label:>5}  {page:<22} {json.dumps(results[page])}", file=sys.stderr)
+    return results
+
+
+def regressions(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, floors: Dict[str, float]
+) -> List[str]:
+    # A metric regresses when it is worse than the baseline by more than
+    # `tolerance` (relative) and by more than its absolute floor, so that
+    # jitter on fast pages isn't reported.
+    found = []
+    for size, pages in results["sizes"].items():
+        for page, metrics in pages.items():
+            before = baseline.get("sizes", {}).get(size, {}).get(page)
+            if before is None:
+                continue
+            for metric, value in metrics.items():
+                old = before.get(metric)
+                if old is None or value <= old * (1 + tolerance):
+                    continue
+                if value - old < floors[metric.rsplit("_", 1)[1]]:
+                    continue
+                found.append(f"{size} / {page} / {metric}: {old} → {value}")
+    return found
+
+
+def print_table(results: Dict[str, Any]):
+    print(f"{'size':>5}  {'page':<22} {'cold_ms':>9} {'rerun_ms':>9} {'peak_mb':>8}")
+    for size, pages in results["sizes"].items():
+        for page, m in pages.items():
+            print(f"{size:>5}  {page:<22} {m['cold_ms']:>9} {m['rerun_ms']:>9} {m['peak_mb']:>8}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Alera's pages headlessly.")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--sessions", type=int, default=3)
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--data-dir", type=Path, default=Path(tempfile.gettempdir()) / "alera-bench")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--floor-ms", type=float, default=100.0)
+    parser.add_argument("--floor-mb", type=float, default=5.0)
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args(argv)
+    # Driving AppTest from the main thread warns about a missing script
+    # context on every session; the warning is harmless here.
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+
+    args.data_dir.mkdir(parents=True, exist_ok=True)
+    results = {
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "sizes": {label: bench_size(label, args.data_dir, args.sessions, args.reruns) for label in args.sizes},
+    }
+    print_table(results)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print("No baseline yet; run with --save-baseline to record one.")
+        return 0
+
+    found = regressions(
+        results,
+        json.loads(args.baseline.read_text()),
+        args.tolerance,
+        {"ms": args.floor_ms, "mb": args.floor_mb},
+    )
+    for line in found:
+        print(f"REGRESSION {line}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from storage import Store, open_store
+
+# ---------- SYNTHETIC DATA ----------
+# A CGM reading every 5 minutes with a daily rhythm, meal bumps and noise,
+# plus two doses, three meals and (most days) one activity a day. The
+# history ends now, so "today" always has data.
+CGM_INTERVAL = timedelta(minutes=5)
+MEAL_HOURS = [8, 13, 19]
+FOODS = [
+    ("Porridge", 45), ("Toast and jam", 40), ("Chicken and rice", 70), ("Pasta", 80),
+    ("Salad", 15), ("Fish and chips", 90), ("Curry", 75), ("Sandwich", 50),
+    ("Yoghurt", 20), ("Apple", 15), ("Pizza", 100), ("Soup and bread", 45),
+]
+ACTIVITIES = [("Walking", "Light"), ("Cycling", "Moderate"), ("Football", "Intense"), ("Gym", "Moderate")]
+
+
+def synth_readings(n: int, end: datetime, rng: np.random.Generator) -> pd.DataFrame:
+    times = pd.date_range(end=end, periods=n, freq=CGM_INTERVAL).floor("s")
+    hours = times.hour.to_numpy() + times.minute.to_numpy() / 60
+    values = 7 + 1.2 * np.sin(2 * np.pi * (hours - 4) / 24)
+    for meal in MEAL_HOURS:
+        values += 4 * np.exp(-((hours - meal - 1) ** 2) / 0.6)
+    drift = np.cumsum(rng.normal(0, 0.08, n))
+    drift -= pd.Series(drift).rolling(288, min_periods=1).mean().to_numpy()
+    values = np.clip(values + drift + rng.normal(0, 0.4, n), 2.2, 22.0).round(1)
+    return pd.DataFrame({"time": times, "value": values, "context": "Imported", "notes": ""})
+
+
+def synth_days(readings: pd.DataFrame) -> pd.DatetimeIndex:
+    return pd.date_range(readings["time"].iloc[0].normalize(), readings["time"].iloc[-1], freq="D")
+
+
+def at_hours(days: pd.DatetimeIndex, hours: list, last: pd.Timestamp) -> pd.DatetimeIndex:
+    # Each day at each of `hours`, leaving out anything after `last`.
+    times = days.repeat(len(hours)) + pd.to_timedelta(np.tile(hours, len(days)), unit="h")
+    return times[times <= last]
+
+
+def iso_list(times: pd.Series) -> list:
+    return np.datetime_as_string(pd.Series(times).to_numpy(dtype="datetime64[s]")).tolist()
+
+
+def populate(store: Store, n: int, seed: int = 7, end: Optional[datetime] = None):
+    rng = np.random.default_rng(seed)
+    readings = synth_readings(n, end or datetime.now(), rng)
+    store.append_many(
+        "bg_readings",
+        zip(iso_list(readings["time"]), readings["value"].tolist(), readings["context"], readings["notes"]),
+    )
+
+    days, last = synth_days(readings), readings["time"].iloc[-1]
+    doses = at_hours(days, [8, 20], last)
+    store.append_many(
+        "med_logs",
+        zip(iso_list(doses), ["Metformin"] * len(doses), ["500mg"] * len(doses), (rng.random(len(doses)) < 0.95).tolist()),
+    )
+
+    meals = at_hours(days, MEAL_HOURS, last)
+    picks = rng.integers(0, len(FOODS), len(meals))
+    store.append_many(
+        "meal_logs",
+        zip(iso_list(meals), [FOODS[i][0] for i in picks], [FOODS[i][1] for i in picks]),
+    )
+
+    active = at_hours(days[rng.random(len(days)) < 0.6], [17], last)
+    kinds = rng.integers(0, len(ACTIVITIES), len(active))
+    store.append_many(
+        "activity_logs",
+        zip(
+            iso_list(active),
+            [ACTIVITIES[i][0] for i in kinds],
+            (rng.integers(3, 19, len(active)) * 5).tolist(),
+            [ACTIVITIES[i][1] for i in kinds],
+        ),
+    )
+
+
+def synth_db(path: str, n: int, seed: int = 7):
+    store = open_store("sqlite", path)
+    populate(store, n, seed)
+    # Archive the history outside the hot window now, as the store's
+    # writer would shortly after opening, so runs don't race it.
+    store.compact()
+    store.close()
@@ -0,0 +1,98 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, fields, is_dataclass
+from typing import Dict, Any, Hashable, Optional
+
+import numpy as np
+import streamlit as st
+
+# Derived data (frames, insight reports, response summaries) is cached once
+# per process and shared by every session of the same user, instead of each
+# browser session building and holding its own copy. ALERA_CACHE_MB caps
+# the total size; the least recently used entries are dropped past it.
+CACHE_MB = float(os.environ.get("ALERA_CACHE_MB", "512"))
+
+
+def size_of(value: Any) -> int:
+    # Approximate bytes held by a cached value. Frames count their arrays
+    # (not the strings inside object columns, which would mean a slow deep
+    # scan), so the cap is a guide rather than an exact limit.
+    if hasattr(value, "memory_usage") and hasattr(value, "columns"):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(size_of(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(size_of(item) for item in value.values())
+    if is_dataclass(value):
+        return sum(size_of(getattr(value, field.name)) for field in fields(value))
+    return sys.getsizeof(value)
+
+
+@dataclass
+class CacheStats:
+    entries: int = 0
+    bytes: int = 0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class SharedCache:
+    # An LRU of (version, value) per key. Callers pass the version the value
+    # must have been built from (the store's data version, thresholds...),
+    # and `get` only returns a value built from exactly that. Entries are
+    # read-only once stored: sessions on other threads may be using them.
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.stats = CacheStats()
+
+    def get(self, key: Hashable, version: Any = None) -> Optional[Any]:
+        # The value for `key` if it was built from `version`.
+        entry = self.latest(key)
+        if entry is None or entry[0] != version:
+            with self.lock:
+                self.stats.misses += 1
+            return None
+        with self.lock:
+            self.stats.hits += 1
+        return entry[1]
+
+    def latest(self, key: Hashable) -> Optional[tuple]:
+        # The (version, value) stored for `key`, whatever its version, so a
+        # caller can extend an older value instead of starting over.
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def put(self, key: Hashable, version: Any, value: Any):
+        size = size_of(value)
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.stats.bytes -= old[2]
+            self.entries[key] = (version, value, size)
+            self.stats.bytes += size
+            # The newest entry stays even if it alone is over the cap.
+            while self.stats.bytes > self.max_bytes and len(self.entries) > 1:
+                _, (_, _, dropped) = self.entries.popitem(last=False)
+                self.stats.bytes -= dropped
+                self.stats.evictions += 1
+            self.stats.entries = len(self.entries)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(vars(self.stats))
+
+
+@st.cache_resource
+def shared_cache() -> SharedCache:
+    return SharedCache(int(CACHE_MB * 1024 * 1024))
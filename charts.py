@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+# ---------- DOWNSAMPLING ----------
+def lttb_indices(x: np.ndarray, y: np.ndarray, budget: int) -> np.ndarray:
+    # Largest-Triangle-Three-Buckets: keeps the first and last points and,
+    # from each bucket in between, the point that forms the largest
+    # triangle with the previously kept point and the next bucket's mean.
+    # Peaks and dips survive, which matters more here than smoothness.
+    n = len(x)
+    if budget >= n or budget < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, budget - 1).astype(np.int64)
+    sums_x = np.add.reduceat(x[1 : n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1 : n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    means_x = np.append(sums_x / sizes, x[-1])
+    means_y = np.append(sums_y / sizes, y[-1])
+
+    kept = np.empty(budget, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(budget - 2):
+        start, end = edges[i], edges[i + 1]
+        next_x, next_y = means_x[i + 1], means_y[i + 1]
+        area = np.abs(
+            (x[a] - next_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (next_y - y[a])
+        )
+        a = start + int(area.argmax())
+        kept[i + 1] = a
+    return kept
+
+def downsample(df: pd.DataFrame, budget: int) -> pd.DataFrame:
+    # df is sorted by time; returns at most `budget` rows of time/value.
+    df = df[["time", "value"]].dropna()
+    if len(df) <= budget:
+        return df
+    x = df["time"].to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+    y = df["value"].to_numpy(dtype=np.float64)
+    return df.iloc[lttb_indices(x, y, budget)]
+
+def window(df: pd.DataFrame, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+    # Rows with start <= time < end, found by binary search on sorted times.
+    times = df["time"].to_numpy(dtype="datetime64[ns]")
+    lo = times.searchsorted(start.to_datetime64(), side="left")
+    hi = times.searchsorted(end.to_datetime64(), side="left")
+    return df.iloc[lo:hi]
@@ -0,0 +1,414 @@
+import argparse
+import html
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from insights import agp_profile, build_report, variability_stats
+from responses import activity_responses, meal_responses
+from storage import LOG_COLUMNS, SQLiteStore
+from tir import CLASSES, LOW, classify
+
+# Clinic reports: one page per user summarising a period before an
+# appointment, written for every user of a multi-user data directory (see
+# ALERA_DATA_DIR) at once. Run from the repository root:
+#
+#     python -m clinic --data-dir users/                     # everyone, last 14 days
+#     python -m clinic --data-dir users/ alice bob --format html pdf
+#     python -m clinic --data-dir users/ --days 28 --end 2025-03-01 --workers 4
+#
+# Reports are built in a process pool, each worker opening the user's own
+# SQLite file and running the app's analytics over it. PDF output needs
+# weasyprint, which turns the HTML report into a PDF.
+
+DEFAULT_DAYS = 14
+
+
+# ---------- SUMMARY ----------
+@dataclass
+class ClinicSummary:
+    user: str
+    start: datetime
+    end: datetime
+    settings: Dict[str, Any]
+    classes: Dict[str, int]  # readings per class (tir.CLASSES)
+    variability: Optional[Dict[str, float]]
+    agp: Optional[pd.DataFrame]
+    lows: pd.DataFrame  # low readings, newest first
+    insights: List[str]
+    adherence: pd.DataFrame  # per medication
+    totals: Dict[str, float]  # daily rollups summed over the period
+    meals: pd.DataFrame
+    activity: pd.DataFrame
+
+    @property
+    def readings(self) -> int:
+        return sum(self.classes.values())
+
+    @property
+    def days(self) -> int:
+        return (self.end - self.start).days
+
+
+def log_frame(store: SQLiteStore, log_name: str, start: datetime, end: datetime) -> pd.DataFrame:
+    # The log's entries in [start, end) in time order. Readings' stored
+    # classes are left out: the analytics classify values themselves.
+    df = pd.DataFrame(store.between(log_name, start, end), columns=LOG_COLUMNS[log_name])
+    df["time"] = pd.to_datetime(df["time"], format="ISO8601")
+    if log_name == "bg_readings":
+        df["value"] = df["value"].astype(float)
+    return df
+
+
+def adherence_table(meds: pd.DataFrame) -> pd.DataFrame:
+    if meds.empty:
+        return pd.DataFrame()
+    table = meds.groupby(meds["name"].str.strip()).agg(
+        logged=("taken", "size"), taken=("taken", "sum")
+    )
+    table["missed"] = table["logged"] - table["taken"]
+    table["taken_pct"] = (table["taken"] / table["logged"] * 100).round()
+    return table.sort_values("logged", ascending=False)
+
+
+def summarise(store: SQLiteStore, user: str, start: datetime, end: datetime) -> ClinicSummary:
+    settings = store.settings
+    readings = log_frame(store, "bg_readings", start, end)
+    codes = classify(readings["value"].to_numpy(), settings)
+    # The whole period, rather than the Insights page's last RECENT_DAYS.
+    period = readings.assign(hour=readings["time"].dt.hour)
+    totals: Dict[str, float] = {}
+    for rollup in store.daily(start.date(), end.date()):
+        for field, value in rollup.items():
+            if field != "day" and isinstance(value, (int, float)):
+                totals[field] = totals.get(field, 0) + value
+    return ClinicSummary(
+        user=user,
+        start=start,
+        end=end,
+        settings=settings,
+        classes={name: int((codes == code).sum()) for code, name in enumerate(CLASSES)},
+        variability=variability_stats(period),
+        agp=agp_profile(period),
+        lows=readings[codes == LOW].sort_values("time", ascending=False),
+        insights=build_report(readings, settings).insights,
+        adherence=adherence_table(log_frame(store, "med_logs", start, end)),
+        totals=totals,
+        meals=meal_responses(readings, log_frame(store, "meal_logs", start, end)),
+        activity=activity_responses(readings, log_frame(store, "activity_logs", start, end)),
+    )
+
+
+# ---------- RENDERING ----------
+STYLE = """
+body { font-family: -apple-system, "Segoe UI", Helvetica, Arial, sans-serif; color: #1f2937;
+       max-width: 760px; margin: 2rem auto; padding: 0 1rem; line-height: 1.45; }
+h1 { font-size: 1.5rem; margin-bottom: 0.2rem; }
+h2 { font-size: 1.1rem; margin-top: 1.8rem; border-bottom: 1px solid #e5e7eb; padding-bottom: 0.2rem; }
+.muted { color: #6b7280; font-size: 0.85rem; }
+.metrics { display: flex; gap: 0.6rem; flex-wrap: wrap; }
+.metric { border: 1px solid #e5e7eb; border-radius: 0.6rem; padding: 0.4rem 0.8rem; min-width: 6.5rem; }
+.metric b { display: block; font-size: 1.2rem; }
+table { border-collapse: collapse; font-size: 0.85rem; margin-top: 0.4rem; }
+th, td { padding: 0.2rem 0.7rem; border-bottom: 1px solid #f3f4f6; text-align: right; }
+th:first-child, td:first-child { text-align: left; }
+.bar { display: flex; height: 1.1rem; border-radius: 0.3rem; overflow: hidden; margin: 0.5rem 0; }
+@media print { body { margin: 0; } h2 { break-after: avoid; } }
+"""
+
+# Colours of the classes, as on the dashboard.
+CLASS_COLOURS = {
+    "low": "#f59e0b",
+    "below target": "#facc15",
+    "in range": "#22c55e",
+    "high": "#fb923c",
+    "very high": "#ef4444",
+}
+
+
+def share(part: float, whole: float) -> str:
+    return f"{round(part / whole * 100)}%" if whole else "–"
+
+
+def metric(label: str, value: Any) -> str:
+    return f'<div class="metric"><span class="muted">{html.escape(label)}</span><b>{html.escape(str(value))}</b></div>'
+
+
+def table_html(df: pd.DataFrame, columns: Dict[str, str], index: str) -> str:
+    # `columns` maps the frame's columns to headings, in display order.
+    rows = []
+    for key, row in df.iterrows():
+        cells = [html.escape(str(key))]
+        for column in columns:
+            value = row[column]
+            if pd.isna(value):
+                cells.append("–")
+            elif isinstance(value, float):
+                cells.append(f"{value + 0:g}")  # + 0 turns -0.0 into 0
+            else:
+                cells.append(html.escape(str(value)))
+        rows.append("<tr>" + "".join(f"<td>{cell}</td>" for cell in cells) + "</tr>")
+    head = "".join(f"<th>{html.escape(heading)}</th>" for heading in [index, *columns.values()])
+    return f"<table><tr>{head}</tr>{''.join(rows)}</table>"
+
+
+def agp_svg(agp: pd.DataFrame, settings: Dict[str, Any], width: int = 680, height: int = 260) -> str:
+    # The percentile bands as an inline SVG, so the report is one file with
+    # no plotting library behind it.
+    profile = agp.interpolate(limit_area="inside").dropna()
+    top = max(20.0, float(np.nanmax(profile.to_numpy())) + 1)
+    left, right, upper, lower = 36, 10, 10, 24
+
+    def x(hour: float) -> float:
+        return left + hour / 23 * (width - left - right)
+
+    def y(value: float) -> float:
+        return upper + (1 - value / top) * (height - upper - lower)
+
+    def band(low: str, high: str) -> str:
+        points = [(x(h), y(v)) for h, v in profile[high].items()]
+        points += [(x(h), y(v)) for h, v in profile[low].iloc[::-1].items()]
+        return " ".join(f"{px:.1f},{py:.1f}" for px, py in points)
+
+    median = " ".join(f"{x(h):.1f},{y(v):.1f}" for h, v in profile["Median"].items())
+    target_top, target_bottom = y(settings["target_max"]), y(settings["target_min"])
+    ticks = []
+    for value in sorted({settings["hypo_threshold"], settings["target_min"], settings["target_max"], settings["hyper_threshold"]}):
+        ticks.append(f'<text x="{left - 4}" y="{y(value) + 3:.1f}" text-anchor="end">{value:g}</text>')
+    for hour in (0, 6, 12, 18, 23):
+        ticks.append(f'<text x="{x(hour):.1f}" y="{height - 6}" text-anchor="middle">{hour:02d}:00</text>')
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-size="10" fill="#6b7280">'
+        f'<rect x="{left}" y="{target_top:.1f}" width="{width - left - right}" '
+        f'height="{target_bottom - target_top:.1f}" fill="#dcfce7"/>'
+        f'<polygon points="{band("5th", "95th")}" fill="#bfdbfe" fill-opacity="0.7"/>'
+        f'<polygon points="{band("25th", "75th")}" fill="#60a5fa" fill-opacity="0.7"/>'
+        f'<polyline points="{median}" fill="none" stroke="#1d4ed8" stroke-width="2"/>'
+        f'{"".join(ticks)}</svg>'
+    )
+
+
+def render_html(summary: ClinicSummary) -> str:
+    settings = summary.settings
+    last_day = summary.end - timedelta(days=1)
+    parts = [
+        f"<h1>Alera clinic report – {html.escape(summary.user)}</h1>",
+        f'<p class="muted">{summary.start:%d %b %Y} to {last_day:%d %b %Y} ({summary.days} days) · '
+        f"{html.escape(str(settings['diabetes_type']))} · target {settings['target_min']}–{settings['target_max']} mmol/L · "
+        f"written {datetime.now():%d %b %Y, %H:%M}</p>",
+    ]
+
+    parts.append("<h2>Time in range</h2>")
+    total = summary.readings
+    if not total:
+        parts.append("<p>No readings were logged in this period.</p>")
+    else:
+        parts.append(
+            '<div class="bar">'
+            + "".join(
+                f'<div style="width:{count / total * 100:.2f}%;background:{CLASS_COLOURS[name]}"></div>'
+                for name, count in summary.classes.items()
+                if count
+            )
+            + "</div>"
+        )
+        parts.append(
+            '<div class="metrics">'
+            + "".join(metric(name.capitalize(), share(count, total)) for name, count in summary.classes.items())
+            + metric("Readings", f"{total:,}")
+            + metric("Per day", f"{total / summary.days:.1f}")
+            + "</div>"
+        )
+        if summary.variability is not None:
+            stats = summary.variability
+            parts.append(
+                '<div class="metrics" style="margin-top:0.6rem">'
+                + metric("Average", f"{stats['mean']:.1f} mmol/L")
+                + metric("Standard deviation", f"{stats['sd']:.1f}")
+                + metric("Variability (CV)", f"{stats['cv']:.0f}%")
+                + "</div>"
+            )
+
+    if summary.agp is not None:
+        parts.append("<h2>Typical day</h2>")
+        parts.append(agp_svg(summary.agp, settings))
+        parts.append(
+            '<p class="muted">Readings by hour of day: the dark line is the median, the darker band '
+            "holds half of the readings (25th–75th percentile) and the lighter one 90% (5th–95th). "
+            "The green band is the target range.</p>"
+        )
+
+    parts.append("<h2>Lows</h2>")
+    lows = summary.lows
+    if lows.empty:
+        parts.append(f"<p>No readings below {settings['hypo_threshold']} mmol/L.</p>")
+    else:
+        overnight = int((lows["time"].dt.hour < 6).sum())
+        parts.append(
+            '<div class="metrics">'
+            + metric("Low readings", len(lows))
+            + metric("Overnight (00–06)", overnight)
+            + metric("Lowest", f"{lows['value'].min():g} mmol/L")
+            + "</div>"
+        )
+        recent = lows.head(10).set_index(lows["time"].head(10).dt.strftime("%a %d %b, %H:%M"))
+        parts.append(table_html(recent, {"value": "mmol/L", "context": "Context", "notes": "Notes"}, "Time"))
+
+    parts.append("<h2>Medication</h2>")
+    if summary.adherence.empty:
+        parts.append("<p>No doses were logged in this period.</p>")
+    else:
+        parts.append(
+            table_html(
+                summary.adherence,
+                {"logged": "Doses logged", "taken": "Taken", "missed": "Missed", "taken_pct": "Taken (%)"},
+                "Medication",
+            )
+        )
+
+    totals = summary.totals
+    parts.append("<h2>Food and activity</h2>")
+    parts.append(
+        '<div class="metrics">'
+        + metric("Meals logged", int(totals.get("meal_count", 0)))
+        + metric("Carbs per day", f"{totals.get('carbs_total', 0) / summary.days:.0f} g")
+        + metric("Activity sessions", int(totals.get("activity_count", 0)))
+        + metric("Activity per week", f"{totals.get('activity_minutes', 0) / summary.days * 7:.0f} min")
+        + "</div>"
+    )
+    columns = {"before": "Before", "after": "About 2h after", "change": "Change"}
+    if not summary.meals.empty:
+        parts.append("<p><b>After meals</b></p>")
+        parts.append(
+            table_html(summary.meals.head(10).round(1), {"meals": "Times", "carbs": "Carbs (g)", **columns}, "Meal")
+        )
+    if not summary.activity.empty:
+        parts.append("<p><b>After activity</b></p>")
+        parts.append(
+            table_html(summary.activity.round(1), {"sessions": "Times", "minutes": "Minutes", **columns}, "Intensity")
+        )
+
+    parts.append("<h2>Observations</h2>")
+    parts.append("<ul>" + "".join(f"<li>{html.escape(text)}</li>" for text in summary.insights) + "</ul>")
+    parts.append(
+        '<p class="muted">Written by Alera from the entries logged in the app. These are observations to '
+        "talk through with your diabetes team, not clinical advice.</p>"
+    )
+    return (
+        f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        f"<title>Clinic report – {html.escape(summary.user)}</title><style>{STYLE}</style></head>"
+        f"<body>{''.join(parts)}</body></html>"
+    )
+
+
+def render_pdf(page: str, path: str):
+    from weasyprint import HTML
+
+    HTML(string=page).write_pdf(path)
+
+
+# ---------- BATCH ----------
+def is_alera_db(path: Path) -> bool:
+    # Whether `path` holds Alera's tables, checked over a read-only
+    # connection: opening any other SQLite file as a store would write the
+    # schema into it.
+    try:
+        conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+    return {"settings", *LOG_COLUMNS} <= tables
+
+
+def write_report(path: str, user: str, out: str, start: datetime, end: datetime, formats: List[str]) -> List[str]:
+    # Runs in a worker process. Returns the files written.
+    store = SQLiteStore(path, write_behind=False)
+    try:
+        page = render_html(summarise(store, user, start, end))
+    finally:
+        store.close()
+    stem = os.path.join(out, f"{user}-{end - timedelta(days=1):%Y-%m-%d}")
+    written = []
+    if "html" in formats:
+        with open(f"{stem}.html", "w", encoding="utf-8") as file:
+            file.write(page)
+        written.append(f"{stem}.html")
+    if "pdf" in formats:
+        render_pdf(page, f"{stem}.pdf")
+        written.append(f"{stem}.pdf")
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Write clinic reports for the users of a data directory.")
+    parser.add_argument("users", nargs="*", help="user names (default: everyone with a <name>.db)")
+    parser.add_argument(
+        "--data-dir", type=Path, default=os.environ.get("ALERA_DATA_DIR"), help="default: $ALERA_DATA_DIR"
+    )
+    parser.add_argument("--out", type=Path, default=Path("reports"))
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS)
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today(), help="last day to include")
+    parser.add_argument("--format", nargs="+", choices=["html", "pdf"], default=["html"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    if args.data_dir is None:
+        parser.error("pass --data-dir or set ALERA_DATA_DIR")
+    if args.days < 1:
+        parser.error("--days must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    data_dir = Path(args.data_dir)
+    if "pdf" in args.format:
+        try:
+            import weasyprint  # noqa: F401
+        except ImportError:
+            parser.error("PDF reports need weasyprint: pip install weasyprint")
+    # Other SQLite files in the directory are left alone.
+    users = args.users or sorted(path.stem for path in data_dir.glob("*.db") if is_alera_db(path))
+    missing = [user for user in users if not is_alera_db(data_dir / f"{user}.db")]
+    if missing:
+        parser.error(f"no Alera database in {data_dir} for: {', '.join(missing)}")
+    if not users:
+        parser.error(f"no users in {data_dir}")
+
+    end = datetime.combine(args.end + timedelta(days=1), datetime.min.time())
+    start = end - timedelta(days=args.days)
+    args.out.mkdir(parents=True, exist_ok=True)
+
+    began = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        jobs = {
+            pool.submit(write_report, str(data_dir / f"{user}.db"), user, str(args.out), start, end, args.format): user
+            for user in users
+        }
+        for job in as_completed(jobs):
+            try:
+                files = job.result()
+            except Exception as error:
+                failed += 1
+                print(f"{jobs[job]}: failed – {error}", file=sys.stderr)
+            else:
+                print(f"{jobs[job]}: {', '.join(files)}")
+    seconds = time.perf_counter() - began
+    done = len(users) - failed
+    workers = f"{args.workers} worker{'s' if args.workers != 1 else ''}"
+    print(f"{done} reports in {seconds:.1f} s: {done / seconds:.1f} reports/second with {workers}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+from bisect import bisect_left
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Sequence
+
+import numpy as np
+
+# Typed, array-backed logs for the memory store. A reading costs 8 bytes
+# of timestamp, 4 of value and a small code per text field instead of a
+# dict of Python objects, and a log can be handed to pandas as views over
+# its arrays rather than rebuilt from records.
+#
+# Column kinds:
+#   time      int64 nanoseconds since the epoch (naive, like the ISO strings)
+#   float     float32
+#   int       int32, with NULL_INT standing in for a missing value
+#   bool      bool
+#   category  codes into a list of distinct strings, so repeated text
+#             (contexts, medication names, doses, meals) is stored once
+LOG_KINDS: Dict[str, Dict[str, str]] = {
+    "bg_readings": {"time": "time", "value": "float", "context": "category", "notes": "category"},
+    "med_logs": {"time": "time", "name": "category", "dose": "category", "taken": "bool"},
+    "meal_logs": {"time": "time", "description": "category", "carbs": "int"},
+    "activity_logs": {"time": "time", "type": "category", "duration": "int", "intensity": "category"},
+}
+
+NULL_INT = np.iinfo(np.int32).min
+NS_PER_DAY = 86_400 * 10**9
+
+# float32 keeps about 7 significant digits; values are read back rounded
+# to this many decimals so 5.6 comes back as 5.6 and not 5.599999904.
+FLOAT_DECIMALS = 4
+
+INITIAL_CAPACITY = 1024
+
+
+# ---------- COLUMNS ----------
+class Column:
+    # A numpy buffer that doubles when full, so appends are amortised O(1)
+    # and `view()` never copies.
+    def __init__(self, dtype):
+        self.data = np.empty(INITIAL_CAPACITY, dtype=dtype)
+        self.size = 0
+
+    def extend(self, values: np.ndarray):
+        needed = self.size + len(values)
+        if needed > len(self.data):
+            grown = np.empty(max(needed, 2 * len(self.data)), dtype=self.data.dtype)
+            grown[: self.size] = self.data[: self.size]
+            self.data = grown
+        self.data[self.size : needed] = values
+        self.size = needed
+
+    def view(self, start: int = 0) -> np.ndarray:
+        return self.data[start : self.size]
+
+    def encode(self, values: Sequence[Any]) -> np.ndarray:
+        return np.asarray(values, dtype=self.data.dtype)
+
+    def decode(self, stored: np.ndarray) -> List[Any]:
+        return stored.tolist()
+
+
+class TimeColumn(Column):
+    def __init__(self):
+        super().__init__(np.int64)
+
+    def encode(self, values: Sequence[Any]) -> np.ndarray:
+        return np.asarray(values, dtype="datetime64[ns]").astype(np.int64)
+
+    def decode(self, stored: np.ndarray) -> List[Any]:
+        return iso_strings(stored)
+
+
+class FloatColumn(Column):
+    def __init__(self):
+        super().__init__(np.float32)
+
+    def decode(self, stored: np.ndarray) -> List[Any]:
+        return np.round(stored.astype(np.float64), FLOAT_DECIMALS).tolist()
+
+
+class IntColumn(Column):
+    def __init__(self):
+        super().__init__(np.int32)
+
+    def encode(self, values: Sequence[Any]) -> np.ndarray:
+        return np.array([NULL_INT if v is None else v for v in values], dtype=np.int32)
+
+    def decode(self, stored: np.ndarray) -> List[Any]:
+        return [None if v == NULL_INT else v for v in stored.tolist()]
+
+
+class BoolColumn(Column):
+    def __init__(self):
+        super().__init__(np.bool_)
+
+    def encode(self, values: Sequence[Any]) -> np.ndarray:
+        return np.array([bool(v) for v in values], dtype=np.bool_)
+
+
+class CategoryColumn(Column):
+    # Codes start as int8 and widen as distinct values are added; -1 is a
+    # missing value, as in pandas categoricals.
+    def __init__(self):
+        super().__init__(np.int8)
+        self.categories: List[str] = []
+        self.lookup: Dict[str, int] = {}
+
+    def encode(self, values: Sequence[Any]) -> np.ndarray:
+        codes = []
+        for value in values:
+            if value is None:
+                codes.append(-1)
+                continue
+            code = self.lookup.get(value)
+            if code is None:
+                code = self.lookup[value] = len(self.categories)
+                self.categories.append(value)
+            codes.append(code)
+        while len(self.categories) > np.iinfo(self.data.dtype).max:
+            self.data = self.data.astype(np.int16 if self.data.dtype == np.int8 else np.int32)
+        return np.array(codes, dtype=self.data.dtype)
+
+    def decode(self, stored: np.ndarray) -> List[Any]:
+        return [None if code < 0 else self.categories[code] for code in stored.tolist()]
+
+
+COLUMN_TYPES = {
+    "time": TimeColumn,
+    "float": FloatColumn,
+    "int": IntColumn,
+    "bool": BoolColumn,
+    "category": CategoryColumn,
+}
+
+
+# ---------- LOGS ----------
+class ColumnarLog:
+    # One log as a set of equal-length columns; the entry id is the row
+    # position plus one.
+    #
+    # The log also knows its (time, id) order. While entries arrive in time
+    # order that is just insertion order and costs nothing. A back-dated
+    # entry starts an `order` array of positions; entries after the first
+    # `merged` positions wait in insertion order until the next read merges
+    # them in, so a batch of back-dated entries costs one O(n) merge rather
+    # than a sort of the whole log.
+    #
+    # `derived` names columns the store computes from the others (such as a
+    # reading's class) with their fixed categories, so a code means the same
+    # class in every log; they are set with `derive()` rather than `extend()`.
+    def __init__(self, log_name: str, derived: Optional[Dict[str, List[str]]] = None):
+        self.kinds = dict(LOG_KINDS[log_name])
+        self.columns: Dict[str, Column] = {
+            name: COLUMN_TYPES[kind]() for name, kind in self.kinds.items()
+        }
+        self.inputs = list(self.columns.values())
+        for name, categories in (derived or {}).items():
+            self.kinds[name] = "category"
+            self.columns[name] = CategoryColumn()
+            self.columns[name].encode(categories)
+        self.order: Optional[Column] = None
+        self.merged = 0
+
+    def __len__(self) -> int:
+        return self.columns["time"].size
+
+    def extend(self, rows: Sequence[Sequence[Any]]):
+        # Rows are tuples in column order. Everything is encoded before
+        # anything is stored, so a bad row leaves the log unchanged.
+        if not rows:
+            return
+        self._store([column.encode(values) for column, values in zip(self.inputs, zip(*rows))])
+
+    def extend_columns(self, columns: Dict[str, Any]):
+        # The same as extend() from one array per column ("time" as
+        # datetime64), or one value for a column that is the same in every
+        # row; arrays are encoded whole, with no tuple per row.
+        size = len(columns["time"])
+        if not size:
+            return
+        encoded = []
+        for name, column in zip(self.kinds, self.inputs):
+            values = columns[name]
+            if isinstance(values, np.ndarray):
+                encoded.append(column.encode(values))
+            else:
+                encoded.append(np.repeat(column.encode([values]), size))
+        self._store(encoded)
+
+    def _store(self, encoded: List[np.ndarray]):
+        # Appends encoded input columns and keeps the time order up to date.
+        start = len(self)
+        for column, values in zip(self.inputs, encoded):
+            column.extend(values)
+
+        times = self.times(start)
+        if self.merged == start and (times[1:] >= times[:-1]).all() and (
+            start == 0 or times[0] >= self.times()[self.last_position()]
+        ):
+            if self.order is not None:
+                self.order.extend(np.arange(start, len(self)))
+            self.merged = len(self)
+
+    def derive(self, name: str, codes: np.ndarray, start: int = 0):
+        # Sets a derived column for the entries from position `start` on.
+        column = self.columns[name]
+        column.size = start
+        column.extend(codes.astype(column.data.dtype))
+
+    def last_position(self) -> int:
+        # Position of the newest merged entry.
+        return int(self.order.data[self.merged - 1]) if self.order is not None else self.merged - 1
+
+    def ordered(self) -> Optional[np.ndarray]:
+        # Positions in (time, id) order, or None when that is insertion order.
+        if self.merged < len(self):
+            times = self.times()
+            waiting = np.arange(self.merged, len(self))
+            waiting = waiting[np.argsort(times[waiting], kind="stable")]
+            current = self.order.view() if self.order is not None else np.arange(self.merged)
+            # After any equal times, since the waiting entries have higher ids.
+            at = np.searchsorted(times[current], times[waiting], side="right")
+            self.order = Column(np.int64)
+            self.order.extend(np.insert(current, at, waiting))
+            self.merged = len(self)
+        return self.order.view() if self.order is not None else None
+
+    def span(self, lo: int, hi: int) -> np.ndarray:
+        # Positions of entries with lo <= time < hi (epoch ns), in time
+        # order, found by binary search.
+        times, order = self.times(), self.ordered()
+        if order is None:
+            a, b = np.searchsorted(times, [lo, hi], side="left")
+            return np.arange(a, b)
+        keys = range(len(order))
+        a = bisect_left(keys, lo, key=lambda i: times[order[i]])
+        b = bisect_left(keys, hi, lo=a, key=lambda i: times[order[i]])
+        return order[a:b]
+
+    def last(self, n: int) -> np.ndarray:
+        # Positions of the n newest entries, oldest first.
+        order = self.ordered()
+        size = len(self)
+        start = max(size - n, 0) if n > 0 else size
+        return np.arange(start, size) if order is None else order[start:]
+
+    def times(self, start: int = 0) -> np.ndarray:
+        return self.columns["time"].view(start)
+
+    def values(self, start: int = 0) -> np.ndarray:
+        return self.columns["value"].view(start)
+
+    def equals(self, name: str, value: Any, positions: np.ndarray) -> np.ndarray:
+        # Mask of the entries at `positions` whose `name` column is `value`.
+        column = self.columns[name]
+        if isinstance(column, CategoryColumn):
+            code = column.lookup.get(value)
+            if code is None:
+                return np.zeros(len(positions), dtype=bool)
+            return column.view()[positions] == code
+        return column.view()[positions] == column.encode([value])[0]
+
+    def records(self, positions: np.ndarray) -> List[Dict[str, Any]]:
+        decoded = [
+            column.decode(column.view()[positions]) for column in self.columns.values()
+        ]
+        ids = (positions + 1).tolist()
+        names = ["id", *self.columns]
+        return [dict(zip(names, row)) for row in zip(ids, *decoded)]
+
+    def frame(self):
+        # The whole log in time order, indexed by id. While that is
+        # insertion order the columns are views over the arrays wherever
+        # pandas allows it; otherwise they are gathered once in time order.
+        import pandas as pd
+
+        order = self.ordered()
+        data = {}
+        for name, column in self.columns.items():
+            stored = column.view() if order is None else column.view()[order]
+            kind = self.kinds[name]
+            if kind == "time":
+                data[name] = stored.view("datetime64[ns]")
+            elif kind == "category":
+                data[name] = pd.Categorical.from_codes(
+                    stored, dtype=pd.CategoricalDtype(column.categories)
+                )
+            elif kind == "int":
+                data[name] = pd.arrays.IntegerArray(stored, stored == NULL_INT)
+            else:
+                data[name] = stored
+        index = pd.RangeIndex(1, len(self) + 1) if order is None else pd.Index(order + 1)
+        return pd.DataFrame(data, index=index, copy=False)
+
+
+def iso_strings(stored: np.ndarray) -> List[str]:
+    # Epoch ns as ISO strings like datetime.isoformat(): to the second, or
+    # with microseconds when any time has them.
+    moments = stored.astype("datetime64[ns]")
+    if (stored % 10**9 == 0).all():
+        return np.datetime_as_string(moments, unit="s").tolist()
+    return [moment.isoformat() for moment in moments.astype("datetime64[us]").tolist()]
+
+
+def epoch_ns(moment: datetime) -> int:
+    return int(np.datetime64(moment, "ns").astype(np.int64))
@@ -0,0 +1,106 @@
+import csv
+import heapq
+import io
+import tempfile
+from datetime import datetime
+from itertools import islice
+from typing import IO, List, Dict, Any, Iterable, Iterator
+
+import pandas as pd
+
+from storage import LOG_COLUMNS, Store
+
+CHUNK_ROWS = 50_000
+
+# Fixed column types, so every Parquet row group has the same schema.
+EXPORT_DTYPES: Dict[str, str] = {
+    "log": "string",
+    "time": "datetime64[ns]",
+    "value": "float64",
+    "context": "string",
+    "notes": "string",
+    "name": "string",
+    "dose": "string",
+    "taken": "boolean",
+    "description": "string",
+    "carbs": "Int64",
+    "type": "string",
+    "duration": "Int64",
+    "intensity": "string",
+}
+
+TIMELINE_COLUMNS = list(EXPORT_DTYPES)
+
+
+# ---------- RECORD STREAMS ----------
+# Exports are generators over records fetched a chunk at a time, so a
+# multi-year history is never held in memory in one piece.
+def log_records(store: Store, log_name: str, start: datetime, end: datetime) -> Iterator[Dict[str, Any]]:
+    for records in store.chunks(log_name, start, end, CHUNK_ROWS):
+        yield from records
+
+
+def tagged_records(store: Store, log_name: str, start: datetime, end: datetime) -> Iterator[Dict[str, Any]]:
+    for record in log_records(store, log_name, start, end):
+        yield {**record, "log": log_name}
+
+
+def timeline_records(store: Store, start: datetime, end: datetime) -> Iterator[Dict[str, Any]]:
+    # Every log is already time-ordered, so a k-way merge interleaves them
+    # while holding only one chunk per log.
+    streams = [tagged_records(store, log_name, start, end) for log_name in LOG_COLUMNS]
+    return heapq.merge(*streams, key=lambda record: record["time"])
+
+
+def export_columns(what: str) -> List[str]:
+    return TIMELINE_COLUMNS if what == "timeline" else LOG_COLUMNS[what]
+
+
+def export_records(store: Store, what: str, start: datetime, end: datetime) -> Iterator[Dict[str, Any]]:
+    # `what` is a log name or "timeline".
+    if what == "timeline":
+        return timeline_records(store, start, end)
+    return log_records(store, what, start, end)
+
+
+# ---------- WRITERS ----------
+def write_csv(records: Iterable[Dict[str, Any]], columns: List[str], out: IO[bytes]):
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    writer = csv.DictWriter(text, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(records)
+    text.flush()
+    text.detach()
+
+
+def export_frame(records: List[Dict[str, Any]], columns: List[str]) -> pd.DataFrame:
+    df = pd.DataFrame(records, columns=columns)
+    df["time"] = pd.to_datetime(df["time"], errors="coerce", format="ISO8601")
+    return df.astype({column: EXPORT_DTYPES[column] for column in columns})
+
+
+def write_parquet(records: Iterable[Dict[str, Any]], columns: List[str], out: IO[bytes]):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(export_frame([], columns), preserve_index=False)
+    with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+        records = iter(records)
+        while True:
+            batch = list(islice(records, CHUNK_ROWS))
+            if not batch:
+                break
+            frame = export_frame(batch, columns)
+            writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+
+
+def export_file(store: Store, what: str, start: datetime, end: datetime, fmt: str) -> IO[bytes]:
+    # Output spills from memory to a temporary file past 16 MB.
+    out = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024)
+    records, columns = export_records(store, what, start, end), export_columns(what)
+    if fmt == "parquet":
+        write_parquet(records, columns, out)
+    else:
+        write_csv(records, columns, out)
+    out.seek(0)
+    return out
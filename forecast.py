@@ -0,0 +1,90 @@
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+# Short-horizon glucose forecast: Holt's linear exponential smoothing,
+# which keeps a smoothed level and trend and updates both in O(1) per
+# reading instead of refitting on the history. Readings arrive at uneven
+# intervals (a CGM every 5 minutes, finger pricks hours apart), so the
+# smoothing weights are scaled by the time since the previous reading.
+HORIZONS = [30, 60]  # minutes ahead
+
+STEP_MINUTES = 5.0  # ALPHA and BETA are the weights for one step this long
+ALPHA = 0.5  # level
+BETA = 0.3  # trend
+
+# A longer gap starts a new trend, and a trend needs a few readings in a
+# row before it is used for a forecast.
+MAX_GAP_MINUTES = 30.0
+MIN_STEPS = 3
+
+# Readings older than this before the newest one no longer affect the
+# state in any visible way, so replays after a back-dated reading and bulk
+# imports only feed this much history.
+HISTORY_NS = 6 * 3600 * 10**9
+
+NS_PER_MINUTE = 60 * 10**9
+
+
+class Forecaster:
+    def __init__(self):
+        self.time: Optional[int] = None  # epoch ns of the newest reading
+        self.level = 0.0
+        self.trend = 0.0  # mmol/L per minute
+        self.steps = 0  # readings since the last gap
+
+    def update(self, time: int, value: float):
+        # One reading, no older than the newest seen so far.
+        if self.time is None or time - self.time > MAX_GAP_MINUTES * NS_PER_MINUTE:
+            self.time, self.level, self.trend, self.steps = time, value, 0.0, 1
+            return
+        minutes = (time - self.time) / NS_PER_MINUTE
+        if minutes == 0:
+            # A second reading at the same moment only refines the level.
+            self.level = ALPHA * value + (1 - ALPHA) * self.level
+            return
+        alpha = 1 - (1 - ALPHA) ** (minutes / STEP_MINUTES)
+        beta = 1 - (1 - BETA) ** (minutes / STEP_MINUTES)
+        level = alpha * value + (1 - alpha) * (self.level + self.trend * minutes)
+        self.trend = beta * (level - self.level) / minutes + (1 - beta) * self.trend
+        self.time, self.level = time, level
+        self.steps += 1
+
+    def add(self, times: np.ndarray, values: np.ndarray) -> bool:
+        # Feeds a batch (epoch ns, any order). Returns False, changing
+        # nothing, when a reading is older than the newest seen: the caller
+        # then replays recent history with `replay`.
+        if not len(times):
+            return True
+        order = np.argsort(times, kind="stable")
+        times, values = times[order], values[order]
+        if self.time is not None and times[0] < self.time:
+            return False
+        start = int(np.searchsorted(times, times[-1] - HISTORY_NS))
+        if start:
+            self.time = None
+        for time, value in zip(times[start:].tolist(), values[start:].tolist()):
+            self.update(time, value)
+        return True
+
+    @classmethod
+    def replay(cls, times: np.ndarray, values: np.ndarray) -> "Forecaster":
+        # A fresh model fed `times`/`values` - the last HISTORY_NS or more
+        # of readings in the log.
+        model = cls()
+        model.add(times, values)
+        return model
+
+    def forecast(self) -> Optional[Dict[str, Any]]:
+        # Predicted values HORIZONS minutes after the newest reading, if the
+        # current run of readings is long enough to have a trend.
+        if self.steps < MIN_STEPS:
+            return None
+        return {
+            "time": str(np.datetime_as_string(np.datetime64(self.time, "ns"), unit="s")),
+            "rate": round(self.trend * 60, 1),  # mmol/L per hour
+            "predictions": {
+                minutes: round(max(self.level + self.trend * minutes, 0.0), 1)
+                for minutes in HORIZONS
+            },
+        }
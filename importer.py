@@ -0,0 +1,175 @@
+import csv
+from dataclasses import dataclass
+from typing import IO, List, Iterator
+
+import numpy as np
+import pandas as pd
+from dateutil.tz import tzlocal
+
+MGDL_PER_MMOLL = 18.0182
+IMPORT_CONTEXT = "Imported"
+
+# ---------- COLUMN GUESSING ----------
+def read_header(file: IO[bytes], skiprows: int = 0) -> List[str]:
+    file.seek(0)
+    columns = list(pd.read_csv(file, skiprows=skiprows, nrows=0).columns)
+    file.seek(0)
+    return columns
+
+def guess_header_row(file: IO[bytes], max_rows: int = 5) -> int:
+    # Some exports (e.g. FreeStyle Libre) put a metadata line above the
+    # header; the header is the first line as wide as the line after it.
+    file.seek(0)
+    lines = [file.readline().decode("utf-8", "replace") for _ in range(max_rows + 1)]
+    file.seek(0)
+    widths = [len(row) for row in csv.reader(lines)]
+    for i in range(len(widths) - 1):
+        if widths[i] > 1 and widths[i] == widths[i + 1]:
+            return i
+    return 0
+
+def guess_column(columns: List[str], keywords: List[str]) -> int:
+    for keyword in keywords:
+        for i, column in enumerate(columns):
+            if keyword in column.lower():
+                return i
+    return 0
+
+def guess_units(value_column: str, values: pd.Series) -> str:
+    lowered = value_column.lower()
+    if "mg" in lowered:
+        return "mg/dL"
+    if "mmol" in lowered:
+        return "mmol/L"
+    # Nobody lives at 35 mmol/L, but 35 mg/dL is a (very) low reading.
+    return "mg/dL" if values.median() > 35 else "mmol/L"
+
+# ---------- DEDUPLICATION ----------
+def reading_keys(times: pd.Series, values: pd.Series) -> np.ndarray:
+    # One int64 per (time to the second, value to 0.1 mmol/L).
+    seconds = times.to_numpy(dtype="datetime64[s]").astype(np.int64)
+    tenths = np.round(values.to_numpy(dtype=np.float64) * 10).astype(np.int64)
+    return seconds * 10_000 + tenths
+
+class KeyIndex:
+    # Hash index over reading keys. Each batch is hashed as its own segment,
+    # so adding a batch never rehashes what is already indexed.
+    def __init__(self, keys: np.ndarray):
+        self.segments: List[pd.Index] = []
+        self.add(np.unique(keys))
+
+    def add(self, unique_keys: np.ndarray):
+        if len(unique_keys):
+            self.segments.append(pd.Index(unique_keys))
+
+    def contains(self, keys: np.ndarray) -> np.ndarray:
+        found = np.zeros(len(keys), dtype=bool)
+        for segment in self.segments:
+            found |= segment.get_indexer(keys) >= 0
+        return found
+
+# ---------- IMPORT ----------
+@dataclass
+class ImportProgress:
+    rows_read: int = 0
+    added: int = 0
+    duplicates: int = 0
+    unreadable: int = 0
+    fraction: float = 0.0
+
+DAYFIRST_FORMATS = ["%d-%m-%Y %H:%M", "%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S", "%d.%m.%Y %H:%M"]
+MONTHFIRST_FORMATS = ["%m-%d-%Y %H:%M", "%m/%d/%Y %H:%M", "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %I:%M %p"]
+
+# A UTC offset after the time, e.g. Nightscout's "...Z" or "+01:00".
+TZ_SUFFIX = r"\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?\s*(?:Z|[+-]\d{2}:?\d{2})$"
+
+def parse_times(raw: pd.Series, dayfirst: bool) -> pd.Series:
+    # Settle on one explicit format using a small sample so the whole chunk
+    # is parsed in a single vectorised pass; per-element guessing is the
+    # last resort. Times with an offset come back as local wall time, like
+    # the readings entered in the app.
+    sample = raw.dropna().head(100)
+    zoned = bool(sample.astype(str).str.contains(TZ_SUFFIX).any())
+    formats = ["ISO8601"] + (DAYFIRST_FORMATS if dayfirst else MONTHFIRST_FORMATS)
+    for fmt in formats:
+        if pd.to_datetime(sample, errors="coerce", format=fmt, utc=zoned).notna().all():
+            times = pd.to_datetime(raw, errors="coerce", format=fmt, utc=zoned)
+            break
+    else:
+        times = pd.to_datetime(raw, errors="coerce", format="mixed", dayfirst=dayfirst, utc=zoned)
+    if zoned:
+        times = times.dt.tz_convert(tzlocal()).dt.tz_localize(None)
+    return times
+
+def logged_keys(store, start: pd.Timestamp, end: pd.Timestamp) -> KeyIndex:
+    # Keys of the readings already logged in [start, end), read as a time
+    # and a value array (12 bytes a reading) rather than as records.
+    times, values = store.reading_arrays(start.to_pydatetime(), end.to_pydatetime())
+    return KeyIndex(reading_keys(pd.Series(times.astype("datetime64[ns]")), pd.Series(values)))
+
+def import_readings(
+    store,
+    file: IO[bytes],
+    time_column: str,
+    value_column: str,
+    units: str,
+    skiprows: int = 0,
+    dayfirst: bool = True,
+    chunk_rows: int = 250_000,
+) -> Iterator[ImportProgress]:
+    # Streams the CSV in chunks: parsing, unit conversion and duplicate
+    # checks are vectorised per chunk, and each chunk is written as one
+    # batch. Each chunk is checked against the readings logged over its own
+    # time span, which include the chunks written before it. Yields
+    # progress after every chunk.
+    file.seek(0, 2)
+    total_bytes = max(file.tell(), 1)
+    file.seek(0)
+
+    progress = ImportProgress()
+
+    chunks = pd.read_csv(
+        file,
+        skiprows=skiprows,
+        usecols=[time_column, value_column],
+        chunksize=chunk_rows,
+    )
+    for chunk in chunks:
+        progress.rows_read += len(chunk)
+
+        times = parse_times(chunk[time_column], dayfirst)
+        values = pd.to_numeric(chunk[value_column], errors="coerce").astype(np.float64)
+        if units == "mg/dL":
+            values = values / MGDL_PER_MMOLL
+        values = values.round(1)
+
+        readable = times.notna().to_numpy() & values.notna().to_numpy()
+        progress.unreadable += int((~readable).sum())
+        times, values = times[readable], values[readable]
+
+        keys = reading_keys(times, values)
+        if len(keys):
+            start = times.min().floor("s")
+            index = logged_keys(store, start, times.max().floor("s") + pd.Timedelta(seconds=1))
+        else:
+            index = KeyIndex(keys)
+        _, first = np.unique(keys, return_index=True)
+        fresh = np.zeros(len(keys), dtype=bool)
+        fresh[first] = True
+        fresh &= ~index.contains(keys)
+        progress.duplicates += int(len(keys) - fresh.sum())
+
+        if fresh.any():
+            store.append_columns("bg_readings", {
+                "time": times.to_numpy(dtype="datetime64[s]")[fresh],
+                "value": values.to_numpy()[fresh],
+                "context": IMPORT_CONTEXT,
+                "notes": "",
+            })
+            progress.added += int(fresh.sum())
+
+        progress.fraction = min(file.tell() / total_bytes, 1.0)
+        yield progress
+
+    progress.fraction = 1.0
+    yield progress
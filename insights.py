@@ -0,0 +1,209 @@
+from dataclasses import dataclass, field
+from typing import Callable, List, Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from tir import CLASSES, class_flags, classify
+
+# Patterns, variability and the daily profile look at this many days up to
+# the latest reading; the overall counts use the whole frame given, which
+# the app keeps to the hot window (storage.hot_start()) on.
+RECENT_DAYS = 14
+
+PERIODS = [("overnight", 0, 6), ("morning", 6, 12), ("afternoon", 12, 18), ("evening", 18, 24)]
+
+AGP_PERCENTILES = {"5th": 0.05, "25th": 0.25, "Median": 0.5, "75th": 0.75, "95th": 0.95}
+
+
+# ---------- CONTEXT ----------
+@dataclass
+class InsightContext:
+    # Everything a rule might need, computed once per report as whole
+    # columns so no rule has to loop over readings.
+    df: pd.DataFrame
+    settings: Dict[str, Any]
+    values: np.ndarray
+    low: np.ndarray
+    high: np.ndarray
+    in_range: np.ndarray
+    recent: pd.DataFrame
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, settings: Dict[str, Any]) -> "InsightContext":
+        df = df.dropna(subset=["time", "value"])
+        values = df["value"].to_numpy()
+        # Readings from a store carry their class; others are classed here.
+        if "status" in df:
+            codes = df["status"].cat.set_categories(CLASSES).cat.codes.to_numpy()
+        else:
+            codes = classify(values, settings)
+        flags = class_flags(codes)
+        low, high, in_range = flags["low"], flags["high"], flags["in_range"]
+
+        flagged = df.assign(low=low, high=high, in_range=in_range)
+        cutoff = df["time"].iloc[-1] - pd.Timedelta(days=RECENT_DAYS) if len(df) else None
+        recent = flagged[flagged["time"] > cutoff] if cutoff is not None else flagged
+        recent = recent.assign(hour=recent["time"].dt.hour, day=recent["time"].dt.normalize())
+        return cls(df, settings, values, low, high, in_range, recent)
+
+
+@dataclass
+class InsightReport:
+    insights: List[str]
+    variability: Optional[Dict[str, float]] = None
+    agp: Optional[pd.DataFrame] = field(default=None)
+
+
+# ---------- RULES ----------
+# A rule takes the context and returns a sentence, or None when it has
+# nothing to say. Rules run in the order they were registered.
+RULES: List[Callable[[InsightContext], Optional[str]]] = []
+
+
+def rule(func: Callable[[InsightContext], Optional[str]]):
+    RULES.append(func)
+    return func
+
+
+@rule
+def repeated_lows(ctx: InsightContext) -> Optional[str]:
+    if ctx.low.sum() >= 3:
+        return (
+            "You’ve had several low readings. This is something to discuss with your "
+            "diabetes nurse or doctor. Make sure you carry fast-acting sugar with you."
+        )
+    return None
+
+
+@rule
+def repeated_highs(ctx: InsightContext) -> Optional[str]:
+    if ctx.high.sum() >= 3:
+        return (
+            "You’ve had multiple high readings. It may help to review your insulin/"
+            "medication and meal pattern with your healthcare team."
+        )
+    return None
+
+
+@rule
+def mostly_in_range(ctx: InsightContext) -> Optional[str]:
+    if len(ctx.values) >= 5 and ctx.in_range.mean() >= 0.7:
+        return (
+            "A lot of your readings are within your target range. That’s really positive – "
+            "remember that one off day doesn’t mean failure."
+        )
+    return None
+
+
+@rule
+def nocturnal_lows(ctx: InsightContext) -> Optional[str]:
+    overnight = ctx.recent[(ctx.recent["hour"] < 6) & ctx.recent["low"]]
+    if len(overnight) >= 2:
+        return (
+            f"You’ve had {len(overnight)} low readings overnight (midnight to 6am) in the last "
+            f"{RECENT_DAYS} days. Night-time lows can go unnoticed, so they’re worth "
+            "mentioning to your team."
+        )
+    return None
+
+
+@rule
+def time_of_day_highs(ctx: InsightContext) -> Optional[str]:
+    # A period counts as a pattern when it had a high on at least 3 days and
+    # on at least half of the days it had any reading at all.
+    recent = ctx.recent
+    if recent.empty:
+        return None
+    period = pd.cut(
+        recent["hour"],
+        bins=[start for _, start, _ in PERIODS] + [24],
+        labels=[name for name, _, _ in PERIODS],
+        right=False,
+    )
+    per_day = recent.groupby([period, recent["day"]], observed=True)["high"].any()
+    days = per_day.groupby(level=0, observed=True).agg(["sum", "count"])
+    patterns = days[(days["sum"] >= 3) & (days["sum"] >= days["count"] / 2)]
+    if patterns.empty:
+        return None
+    name = patterns["sum"].idxmax()
+    high_days, seen_days = patterns.loc[name, "sum"], patterns.loc[name, "count"]
+    return (
+        f"Highs keep turning up in the {name} – on {high_days} of the {seen_days} days with "
+        f"{name} readings recently. A phrase like *“I’m often high in the {name}”* is a "
+        "helpful way to bring this up with your team."
+    )
+
+
+@rule
+def stable_streak(ctx: InsightContext) -> Optional[str]:
+    # Runs of consecutive in-range readings: each out-of-range reading
+    # starts a new run id, then the span of each in-range run is measured.
+    if not ctx.in_range.any():
+        return None
+    run_id = np.cumsum(~ctx.in_range)[ctx.in_range]
+    times = ctx.df["time"].to_numpy()[ctx.in_range]
+    runs = pd.DataFrame({"run": run_id, "time": times}).groupby("run")["time"].agg(["min", "max", "size"])
+    runs = runs[runs["size"] >= 4]
+    if runs.empty:
+        return None
+    hours = ((runs["max"] - runs["min"]).max()) / pd.Timedelta(hours=1)
+    if hours < 24:
+        return None
+    span = f"{hours / 24:.0f} days" if hours >= 48 else f"{hours:.0f} hours"
+    return (
+        f"Your longest steady stretch kept every reading in range for about {span}. "
+        "Whatever you were doing then was working well for you."
+    )
+
+
+@rule
+def variability(ctx: InsightContext) -> Optional[str]:
+    stats = variability_stats(ctx.recent)
+    if stats is None:
+        return None
+    if stats["cv"] > 36:
+        return (
+            f"Your readings have been swinging quite a lot lately (variability {stats['cv']:.0f}%). "
+            "Big swings are common and worth talking through with your team – they’re about "
+            "the pattern, not about you."
+        )
+    return (
+        f"Your readings have been fairly steady lately (variability {stats['cv']:.0f}%). "
+        "That steadiness is a real achievement."
+    )
+
+
+# ---------- SUMMARIES ----------
+def variability_stats(recent: pd.DataFrame) -> Optional[Dict[str, float]]:
+    if len(recent) < 10:
+        return None
+    values = recent["value"].to_numpy(dtype=np.float64)
+    mean, sd = values.mean(), values.std(ddof=1)
+    return {"mean": mean, "sd": sd, "cv": sd / mean * 100 if mean else 0.0}
+
+
+def agp_profile(recent: pd.DataFrame) -> Optional[pd.DataFrame]:
+    # Ambulatory glucose profile: percentiles of readings by hour of day.
+    if len(recent) < 24:
+        return None
+    profile = (
+        recent.groupby("hour")["value"]
+        .quantile(list(AGP_PERCENTILES.values()))
+        .unstack()
+        .reindex(range(24))
+    )
+    profile.columns = list(AGP_PERCENTILES)
+    profile.index.name = "Hour of day"
+    return profile
+
+
+def build_report(df: pd.DataFrame, settings: Dict[str, Any]) -> InsightReport:
+    ctx = InsightContext.build(df, settings)
+    insights = [text for text in (check(ctx) for check in RULES) if text]
+    if not insights:
+        insights.append(
+            "Your readings are still building up. Keep logging and patterns will become "
+            "clearer to talk through with your team."
+        )
+    return InsightReport(insights, variability_stats(ctx.recent), agp_profile(ctx.recent))
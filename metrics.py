@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import List, Dict, Iterator, Optional
+
+# ALERA_METRICS_PATH, when set, gets per-section rerun metrics in
+# Prometheus text format for scraping. The file is rewritten at most every
+# WRITE_INTERVAL seconds.
+METRICS_PATH = os.environ.get("ALERA_METRICS_PATH")
+WRITE_INTERVAL = 5.0
+
+
+# ---------- PER-RERUN ----------
+@dataclass
+class Section:
+    seconds: float = 0.0
+    calls: int = 0
+    rows: int = 0
+    cache_hits: int = 0
+
+
+@dataclass
+class RerunMetrics:
+    # Wall time, rows processed and cache hits per instrumented section of
+    # one script run. Sections nest (a page calls the frame builders), and
+    # rows and hits counted inside a section also count for every section
+    # around it, so a page's numbers include the work it triggered.
+    page: str = ""
+    sections: Dict[str, Section] = field(default_factory=dict)
+    started: float = field(default_factory=time.perf_counter)
+    seconds: float = 0.0
+    _open: List[Section] = field(default_factory=list)
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[Section]:
+        current = self.sections.setdefault(name, Section())
+        self._open.append(current)
+        start = time.perf_counter()
+        try:
+            yield current
+        finally:
+            current.seconds += time.perf_counter() - start
+            current.calls += 1
+            self._open.pop()
+
+    def count(self, rows: int = 0, cache_hits: int = 0):
+        for current in self._open:
+            current.rows += rows
+            current.cache_hits += cache_hits
+
+    def finish(self) -> "RerunMetrics":
+        self.seconds = time.perf_counter() - self.started
+        return self
+
+
+# Streamlit runs each session's script on its own thread, so the rerun in
+# progress is tracked per thread and instrumented code finds it from there.
+_current = threading.local()
+
+
+def begin_rerun() -> RerunMetrics:
+    _current.rerun = RerunMetrics()
+    return _current.rerun
+
+
+def current_rerun() -> RerunMetrics:
+    # Outside a script run (e.g. in a benchmark) a throwaway one is used.
+    rerun = getattr(_current, "rerun", None)
+    return rerun if rerun is not None else RerunMetrics()
+
+
+def timed(name: Optional[str] = None):
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with current_rerun().section(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(rows: int = 0, cache_hits: int = 0):
+    current_rerun().count(rows, cache_hits)
+
+
+# ---------- PROCESS TOTALS ----------
+class MetricsRegistry:
+    # Totals across every session in the process, exposed in Prometheus
+    # text format. Sessions run on their own threads, hence the lock.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reruns: Dict[str, int] = {}
+        self.rerun_seconds: Dict[str, float] = {}
+        self.sections: Dict[str, Section] = {}
+        self.last: Dict[str, Section] = {}
+        self.written = 0.0
+
+    def record(self, rerun: RerunMetrics):
+        with self.lock:
+            self.reruns[rerun.page] = self.reruns.get(rerun.page, 0) + 1
+            self.rerun_seconds[rerun.page] = self.rerun_seconds.get(rerun.page, 0.0) + rerun.seconds
+            for name, section in rerun.sections.items():
+                total = self.sections.setdefault(name, Section())
+                total.seconds += section.seconds
+                total.calls += section.calls
+                total.rows += section.rows
+                total.cache_hits += section.cache_hits
+                self.last[name] = section
+
+    def prometheus(self) -> str:
+        with self.lock:
+            lines: List[str] = []
+
+            def metric(name: str, kind: str, help_text: str, label: str, values: Dict[str, float]):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in sorted(values.items()):
+                    escaped = key.replace("\\", "\\\\").replace('"', '\\"')
+                    lines.append(f'{name}{{{label}="{escaped}"}} {value}')
+
+            metric("alera_reruns_total", "counter", "Script reruns per page.", "page", self.reruns)
+            metric(
+                "alera_rerun_seconds_total", "counter", "Wall time of reruns per page.", "page",
+                self.rerun_seconds,
+            )
+            metric(
+                "alera_section_seconds_total", "counter", "Wall time spent in each section.", "section",
+                {name: s.seconds for name, s in self.sections.items()},
+            )
+            metric(
+                "alera_section_calls_total", "counter", "Calls of each section.", "section",
+                {name: s.calls for name, s in self.sections.items()},
+            )
+            metric(
+                "alera_section_rows_total", "counter", "Rows processed in each section.", "section",
+                {name: s.rows for name, s in self.sections.items()},
+            )
+            metric(
+                "alera_section_cache_hits_total", "counter", "Cache hits in each section.", "section",
+                {name: s.cache_hits for name, s in self.sections.items()},
+            )
+            metric(
+                "alera_section_last_seconds", "gauge", "Wall time of each section in its latest rerun.",
+                "section", {name: s.seconds for name, s in self.last.items()},
+            )
+            return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        # Replaced atomically so a scraper never reads a half-written file.
+        now = time.monotonic()
+        if now - self.written < WRITE_INTERVAL:
+            return
+        self.written = now
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp, "w", encoding="utf-8") as out:
+            out.write(self.prometheus())
+        os.replace(temp, path)
+
+
+REGISTRY = MetricsRegistry()
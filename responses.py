@@ -0,0 +1,75 @@
+from typing import Optional
+
+import pandas as pd
+
+# A response pairs the last reading up to PRE_WINDOW before an event with
+# the reading nearest to POST_OFFSET after it, within POST_TOLERANCE either
+# way, i.e. something between 1 and 3 hours after.
+PRE_WINDOW = pd.Timedelta(minutes=60)
+POST_OFFSET = pd.Timedelta(hours=2)
+POST_TOLERANCE = pd.Timedelta(hours=1)
+
+
+def _ns(times: pd.Series) -> pd.Series:
+    return times.astype("datetime64[ns]")
+
+
+def event_responses(
+    readings: pd.DataFrame, events: pd.DataFrame, end: Optional[pd.Series] = None
+) -> pd.DataFrame:
+    # Sorted as-of joins instead of a scan per event: one backward join
+    # for the "before" reading and one nearest join for the "after" one.
+    # `end` moves the after-window, e.g. to when an activity finished.
+    bg = readings[["time", "value"]].dropna()
+    bg = bg.assign(time=_ns(bg["time"])).sort_values("time")
+    found = events.dropna(subset=["time"])
+    found = found.assign(time=_ns(found["time"]))
+    after_from = found["time"] if end is None else _ns(end.loc[found.index])
+    found = found.assign(after_time=after_from + POST_OFFSET)
+
+    found = pd.merge_asof(
+        found.sort_values("time"),
+        bg.rename(columns={"value": "before"}),
+        on="time",
+        direction="backward",
+        tolerance=PRE_WINDOW,
+    )
+    found = pd.merge_asof(
+        found.sort_values("after_time"),
+        bg.rename(columns={"time": "after_time", "value": "after"}),
+        on="after_time",
+        direction="nearest",
+        tolerance=POST_TOLERANCE,
+    )
+    found = found.dropna(subset=["before", "after"])
+    return found.assign(change=found["after"] - found["before"]).sort_values("time")
+
+
+def meal_responses(readings: pd.DataFrame, meals: pd.DataFrame) -> pd.DataFrame:
+    if readings.empty or meals.empty:
+        return pd.DataFrame()
+    found = event_responses(readings, meals)
+    food = found["description"].str.strip().str.lower()
+    summary = found.groupby(food).agg(
+        meals=("change", "size"),
+        carbs=("carbs", "mean"),
+        before=("before", "mean"),
+        after=("after", "mean"),
+        change=("change", "mean"),
+    )
+    return summary.sort_values(["meals", "change"], ascending=[False, False])
+
+
+def activity_responses(readings: pd.DataFrame, activity: pd.DataFrame) -> pd.DataFrame:
+    if readings.empty or activity.empty:
+        return pd.DataFrame()
+    finished = activity["time"] + pd.to_timedelta(activity["duration"].fillna(0).astype(float), unit="min")
+    found = event_responses(readings, activity, end=finished)
+    summary = found.groupby("intensity").agg(
+        sessions=("change", "size"),
+        minutes=("duration", "mean"),
+        before=("before", "mean"),
+        after=("after", "mean"),
+        change=("change", "mean"),
+    )
+    return summary.reindex([i for i in ["Light", "Moderate", "Intense"] if i in summary.index])
@@ -0,0 +1,1493 @@
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import astuple
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+from archive import (
+    Segment, after_key, before_key, describe, equal_to, ids_after, in_window, merge_tables,
+    month_bounds, read_segment, segment_table, select, write_segment,
+)
+from columnar import FLOAT_DECIMALS, NS_PER_DAY, NULL_INT, ColumnarLog, epoch_ns, iso_strings
+from forecast import HISTORY_NS, Forecaster
+from tir import CLASSES, LOW, BELOW_TARGET, IN_RANGE, HIGH, VERY_HIGH, TirIndex, class_flags, classify
+
+# ---------- SCHEMA ----------
+DEFAULT_SETTINGS: Dict[str, Any] = {
+    "diabetes_type": "Type 1",
+    "target_min": 4.0,
+    "target_max": 10.0,
+    "hypo_threshold": 4.0,
+    "hyper_threshold": 14.0,
+    "chart_points": 1500,
+    "diagnostics": False,
+}
+
+LOG_COLUMNS: Dict[str, List[str]] = {
+    "bg_readings": ["time", "value", "context", "notes"],
+    "med_logs": ["time", "name", "dose", "taken"],
+    "meal_logs": ["time", "description", "carbs"],
+    "activity_logs": ["time", "type", "duration", "intensity"],
+}
+
+SQL_TYPES: Dict[str, Dict[str, str]] = {
+    "bg_readings": {"value": "REAL", "context": "TEXT", "notes": "TEXT"},
+    "med_logs": {"name": "TEXT", "dose": "TEXT", "taken": "INTEGER"},
+    "meal_logs": {"description": "TEXT", "carbs": "INTEGER"},
+    "activity_logs": {"type": "TEXT", "duration": "INTEGER", "intensity": "TEXT"},
+}
+
+# The column each log's history can be filtered on; stores index it
+# together with time so a filtered page is still one index seek.
+FILTER_COLUMNS: Dict[str, str] = {
+    "bg_readings": "context",
+    "med_logs": "taken",
+    "activity_logs": "intensity",
+}
+
+# Columns the stores compute and keep alongside an entry, with their fixed
+# categories. A reading's "status" is its class (see tir.CLASSES) against
+# the thresholds in settings: set on insert, and recomputed for the whole
+# log in one pass when the thresholds change.
+DERIVED_COLUMNS: Dict[str, Dict[str, List[str]]] = {
+    "bg_readings": {"status": CLASSES},
+}
+
+THRESHOLD_KEYS = ["target_min", "target_max", "hypo_threshold", "hyper_threshold"]
+
+# The SQL form of tir.classify, for SQLite's status column: reclassifies
+# the stored readings when the thresholds change, and once for databases
+# from before the column. Inserts classify their readings themselves.
+CLASSIFY_SQL = (
+    f"UPDATE bg_readings SET status = CASE "
+    f"WHEN ROUND(value, {FLOAT_DECIMALS}) < :hypo_threshold THEN {LOW} "
+    f"WHEN ROUND(value, {FLOAT_DECIMALS}) > :hyper_threshold THEN {VERY_HIGH} "
+    f"WHEN ROUND(value, {FLOAT_DECIMALS}) > :target_max THEN {HIGH} "
+    f"WHEN ROUND(value, {FLOAT_DECIMALS}) >= :target_min THEN {IN_RANGE} "
+    f"ELSE {BELOW_TARGET} END WHERE id > :after"
+)
+
+
+def iso(moment: datetime) -> str:
+    return moment.isoformat()
+
+
+def stored_columns(log_name: str) -> List[str]:
+    return LOG_COLUMNS[log_name] + list(DERIVED_COLUMNS.get(log_name, {}))
+
+
+# ---------- DAILY ROLLUPS ----------
+# One pre-aggregated row per calendar day, kept up to date on every insert
+# so summaries read a row per day instead of scanning the logs. These are
+# the SQL aggregates each log contributes; rollup_columns mirrors them for
+# the memory store. The bg counts come from the readings' classes, so
+# rollups are rebuilt when the thresholds change.
+ROLLUP_SQL: Dict[str, Dict[str, str]] = {
+    "bg_readings": {
+        "bg_count": "COUNT(*)",
+        "bg_in_range": f"SUM(status = {IN_RANGE})",
+        "bg_low": f"SUM(status = {LOW})",
+        "bg_high": f"SUM(status = {VERY_HIGH})",
+        "bg_min": "MIN(value)",
+        "bg_max": "MAX(value)",
+        "bg_sum": "SUM(value)",
+    },
+    "med_logs": {
+        "med_count": "COUNT(*)",
+        "doses_taken": "SUM(taken)",
+        "doses_missed": "SUM(NOT taken)",
+    },
+    "meal_logs": {
+        "meal_count": "COUNT(*)",
+        "carbs_total": "SUM(COALESCE(carbs, 0))",
+    },
+    "activity_logs": {
+        "activity_count": "COUNT(*)",
+        "activity_minutes": "SUM(COALESCE(duration, 0))",
+    },
+}
+
+ROLLUP_FIELDS: List[str] = [field for fields in ROLLUP_SQL.values() for field in fields]
+
+
+def empty_rollup(day: str) -> Dict[str, Any]:
+    rollup: Dict[str, Any] = {"day": day, **{field: 0 for field in ROLLUP_FIELDS}}
+    rollup["bg_min"] = rollup["bg_max"] = None
+    return rollup
+
+
+def rollup_columns(log_name: str, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    # Per-entry contributions to each rollup field, from a log's columns as
+    # arrays (ints with NULL_INT for missing, readings' class codes as
+    # "status"); bg_min/bg_max are the values themselves.
+    if log_name == "bg_readings":
+        values = np.round(columns["value"].astype(np.float64), FLOAT_DECIMALS)
+        flags = class_flags(columns["status"])
+        return {
+            "bg_count": np.ones(len(values)),
+            "bg_in_range": flags["in_range"],
+            "bg_low": flags["low"],
+            "bg_high": flags["high"],
+            "bg_min": values,
+            "bg_max": values,
+            "bg_sum": values,
+        }
+    if log_name == "med_logs":
+        taken = columns["taken"]
+        return {"med_count": np.ones(len(taken)), "doses_taken": taken, "doses_missed": ~taken}
+    if log_name == "meal_logs":
+        carbs = columns["carbs"]
+        return {"meal_count": np.ones(len(carbs)), "carbs_total": np.where(carbs == NULL_INT, 0, carbs)}
+    duration = columns["duration"]
+    return {
+        "activity_count": np.ones(len(duration)),
+        "activity_minutes": np.where(duration == NULL_INT, 0, duration),
+    }
+
+
+def day_totals(
+    log_name: str, times: np.ndarray, columns: Dict[str, np.ndarray]
+) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    # Per-day totals of the rollup fields for entries at `times` (epoch
+    # ns), a whole column at a time: the days (ISO dates) and one array per
+    # field, aligned with them.
+    days, slot = np.unique(times // NS_PER_DAY, return_inverse=True)
+    totals = {}
+    for field, values in rollup_columns(log_name, columns).items():
+        if field == "bg_min":
+            totals[field] = np.full(len(days), np.inf)
+            np.minimum.at(totals[field], slot, values)
+        elif field == "bg_max":
+            totals[field] = np.full(len(days), -np.inf)
+            np.maximum.at(totals[field], slot, values)
+        else:
+            totals[field] = np.bincount(slot, weights=values, minlength=len(days))
+    return np.datetime_as_string(days.astype("datetime64[D]")).tolist(), totals
+
+
+# ---------- LATEST ENTRY ----------
+# Each store keeps a pointer to the newest entry of every log (by time,
+# then id, so back-dated inserts never replace it), with the reading's
+# stored status. It is updated on write and when the thresholds change, so
+# the safety banner never has to look at the history.
+def newer(record: Dict[str, Any], current: Optional[Dict[str, Any]]) -> bool:
+    return current is None or (record["time"], record["id"]) >= (current["time"], current["id"])
+
+
+def finish_rollup(rollup: Dict[str, Any]) -> Dict[str, Any]:
+    rollup = dict(rollup)
+    rollup["bg_mean"] = rollup["bg_sum"] / rollup["bg_count"] if rollup["bg_count"] else None
+    return rollup
+
+
+# ---------- TIERS ----------
+# Pages keep entries from hot_start() on in memory: the last HOT_DAYS days,
+# from the start of that month. The SQLite store moves older entries out
+# of its tables into monthly archive segments (archive.py), which are read
+# back only by queries that reach that far.
+HOT_DAYS = int(os.environ.get("ALERA_HOT_DAYS", "90"))
+
+# How often the SQLite store checks for a month to archive while idle.
+COMPACT_SECONDS = 3600
+# Times a queued batch is written whole before the entries that fail on
+# their own are set aside (`failed_writes()`) so the rest get through.
+WRITE_ATTEMPTS = 3
+
+log = logging.getLogger(__name__)
+
+
+def hot_start(now: Optional[datetime] = None) -> datetime:
+    moment = (now or datetime.now()) - timedelta(days=HOT_DAYS)
+    return datetime(moment.year, moment.month, 1)
+
+
+# ---------- STORES ----------
+# Every store exposes the same small API. Entries get a 1-based id in
+# insertion order, and `version()` is the id of the newest entry, so a
+# caller that has seen `version` entries can ask for just the rest.
+class Store:
+    # Columnar stores can hand out a log as a DataFrame over their arrays
+    # (`frame()`), which is cheaper than building one from records.
+    columnar = False
+    # Names the data the store holds, for the process-wide cache: stores
+    # over the same data share cached frames and reports.
+    cache_key = ""
+
+    def load_settings(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def save_settings(self, settings: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def append(self, log_name: str, record: Dict[str, Any]) -> None:
+        # May return before the entry is durable (see `flush`), but every
+        # read made after it returns sees the entry, unless writing it
+        # keeps failing and it is set aside (see `failed_writes`).
+        raise NotImplementedError
+
+    def append_many(self, log_name: str, rows: Iterable[Sequence[Any]]) -> None:
+        # Rows are tuples in LOG_COLUMNS order, written as a single batch.
+        raise NotImplementedError
+
+    def append_columns(self, log_name: str, columns: Dict[str, Any]) -> None:
+        # A batch as one array per LOG_COLUMNS column, "time" as datetime64,
+        # or a single value for a column that is the same in every row.
+        # Written like append_many without a tuple per row.
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        # Writes any appended entries that are still queued.
+        pass
+
+    def write_stats(self) -> Optional[Dict[str, int]]:
+        # Counters of the write queue, for stores that have one.
+        return None
+
+    def failed_writes(self) -> List[Dict[str, Any]]:
+        # Appended entries that could not be written, with the error.
+        return []
+
+    def retry_failed(self) -> int:
+        # Tries the failed entries again; returns how many still fail.
+        return 0
+
+    def close(self) -> None:
+        # Writes anything queued and releases the store's file and threads;
+        # the store can't be used afterwards.
+        pass
+
+    def compact(self) -> None:
+        # Archives entries from before hot_start(), for stores with tiers.
+        pass
+
+    def version(self, log_name: str) -> int:
+        raise NotImplementedError
+
+    def since(self, log_name: str, version: int, start: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        # Entries with id > version in id order, only those at or after
+        # `start` when given.
+        raise NotImplementedError
+
+    def between(self, log_name: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def count(self, log_name: str, start: datetime, end: datetime) -> int:
+        raise NotImplementedError
+
+    def tail(self, log_name: str, n: int) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def chunks(self, log_name: str, start: datetime, end: datetime, size: int) -> Iterator[List[Dict[str, Any]]]:
+        # Entries in [start, end) in time order, at most `size` at a time.
+        raise NotImplementedError
+
+    def reading_arrays(self, start: datetime, end: datetime) -> Tuple[np.ndarray, np.ndarray]:
+        # Times (epoch ns) and values of the readings in [start, end) in
+        # time order, without building a record per reading.
+        raise NotImplementedError
+
+    def page(
+        self,
+        log_name: str,
+        start: datetime,
+        end: datetime,
+        size: int,
+        before: Optional[Tuple[str, int]] = None,
+        where: Any = None,
+    ) -> List[Dict[str, Any]]:
+        # Up to `size` entries in [start, end), newest first, that come
+        # before the (time, id) of `before` - the last entry of the previous
+        # page. `where` keeps only entries whose FILTER_COLUMNS value equals it.
+        raise NotImplementedError
+
+    def daily(self, start: Optional[date] = None, end: Optional[date] = None) -> List[Dict[str, Any]]:
+        # Rollup rows for days in [start, end), oldest first.
+        raise NotImplementedError
+
+    def time_in_range(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, int]:
+        # Counts of readings in [start, end) - "count", "in_range", "low"
+        # and "high" - from the TirIndex. None leaves that side open.
+        raise NotImplementedError
+
+    def forecast(self) -> Optional[Dict[str, Any]]:
+        # The Forecaster's prediction after the newest reading, or None
+        # while there is no recent trend.
+        raise NotImplementedError
+
+    # Shared by both stores: `latest_records` maps log name to its newest entry.
+    def _track_latest(self, log_name: str, records: Iterable[Dict[str, Any]]):
+        current = self.latest_records.get(log_name)
+        for record in records:
+            if newer(record, current):
+                current = record
+        if current is not None:
+            self.latest_records[log_name] = current
+
+    def latest(self, log_name: str) -> Optional[Dict[str, Any]]:
+        # Newest entry by time; readings carry their "status".
+        current = self.latest_records.get(log_name)
+        return dict(current) if current is not None else None
+
+    def earliest(self, log_name: str) -> Optional[Dict[str, Any]]:
+        # Oldest entry by time, then id.
+        raise NotImplementedError
+
+
+class MemoryStore(Store):
+    # Keeps everything in typed columns for the lifetime of the session.
+    columnar = True
+
+    def __init__(self):
+        self.cache_key = f"memory:{uuid.uuid4().hex}"
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.logs: Dict[str, ColumnarLog] = {
+            name: ColumnarLog(name, DERIVED_COLUMNS.get(name)) for name in LOG_COLUMNS
+        }
+        self.rollups: Dict[str, Dict[str, Any]] = {}
+        self.latest_records: Dict[str, Dict[str, Any]] = {}
+        self.tir = TirIndex(self.settings)
+        self.forecaster = Forecaster()
+
+    def _roll_up(self, log_name: str, start: int):
+        # Aggregates entries from position `start` on per day and folds
+        # them into the rollups.
+        log = self.logs[log_name]
+        columns = {name: column.view(start) for name, column in log.columns.items()}
+        labels, totals = day_totals(log_name, log.times(start), columns)
+        for i, day in enumerate(labels):
+            rollup = self.rollups.setdefault(day, empty_rollup(day))
+            for field, per_day in totals.items():
+                value = per_day[i].item()
+                if field == "bg_min":
+                    rollup[field] = value if rollup[field] is None else min(rollup[field], value)
+                elif field == "bg_max":
+                    rollup[field] = value if rollup[field] is None else max(rollup[field], value)
+                elif field == "bg_sum":
+                    rollup[field] += value
+                else:
+                    rollup[field] += int(value)
+
+    def _track_appended(self, log_name: str, start: int):
+        # The newest of the entries from `start` on: the latest time, and
+        # the highest id among entries at that time.
+        times = self.logs[log_name].times(start)
+        if len(times):
+            newest = start + len(times) - 1 - int(times[::-1].argmax())
+            self._track_latest(log_name, self.logs[log_name].records(np.array([newest])))
+
+    def load_settings(self) -> Dict[str, Any]:
+        return dict(self.settings)
+
+    def save_settings(self, settings: Dict[str, Any]) -> None:
+        changed = any(self.settings[key] != settings[key] for key in THRESHOLD_KEYS)
+        self.settings = dict(settings)
+        if changed:
+            log = self.logs["bg_readings"]
+            log.derive("status", classify(log.values(), self.settings))
+            self.rollups = {}
+            for log_name in self.logs:
+                self._roll_up(log_name, 0)
+            self.tir.reclassify(self.settings)
+            self.latest_records.pop("bg_readings", None)
+            self._track_latest("bg_readings", self.tail("bg_readings", 1))
+
+    def append(self, log_name: str, record: Dict[str, Any]) -> None:
+        self.append_many(log_name, [tuple(record[column] for column in LOG_COLUMNS[log_name])])
+
+    def append_many(self, log_name: str, rows: Iterable[Sequence[Any]]) -> None:
+        log = self.logs[log_name]
+        start = len(log)
+        log.extend(list(rows))
+        self._appended(log_name, start)
+
+    def append_columns(self, log_name: str, columns: Dict[str, Any]) -> None:
+        log = self.logs[log_name]
+        start = len(log)
+        log.extend_columns(columns)
+        self._appended(log_name, start)
+
+    def _appended(self, log_name: str, start: int):
+        # Brings everything kept alongside the log up to date with the
+        # entries from position `start` on.
+        log = self.logs[log_name]
+        if log_name == "bg_readings":
+            log.derive("status", classify(log.values(start), self.settings), start)
+            self.tir.add(log.times(start), log.values(start))
+            if not self.forecaster.add(log.times(start), log.values(start)):
+                # Back-dated: replay the hours before the newest reading.
+                newest = log.times()[log.last(1)[0]]
+                found = log.span(newest - HISTORY_NS, newest + 1)
+                self.forecaster = Forecaster.replay(log.times()[found], log.values()[found])
+        self._roll_up(log_name, start)
+        self._track_appended(log_name, start)
+
+    def version(self, log_name: str) -> int:
+        return len(self.logs[log_name])
+
+    def since(self, log_name: str, version: int, start: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        log = self.logs[log_name]
+        positions = np.arange(version, len(log))
+        if start is not None:
+            positions = positions[log.times(version) >= epoch_ns(start)]
+        return log.records(positions)
+
+    def earliest(self, log_name: str) -> Optional[Dict[str, Any]]:
+        log = self.logs[log_name]
+        if not len(log):
+            return None
+        order = log.ordered()
+        return log.records(order[:1] if order is not None else np.arange(1))[0]
+
+    def frame(self, log_name: str):
+        # The whole log in time order, as a DataFrame over the columns' arrays.
+        return self.logs[log_name].frame()
+
+    def between(self, log_name: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        log = self.logs[log_name]
+        return log.records(log.span(epoch_ns(start), epoch_ns(end)))
+
+    def count(self, log_name: str, start: datetime, end: datetime) -> int:
+        return len(self.logs[log_name].span(epoch_ns(start), epoch_ns(end)))
+
+    def tail(self, log_name: str, n: int) -> List[Dict[str, Any]]:
+        log = self.logs[log_name]
+        return log.records(log.last(n))
+
+    def chunks(self, log_name: str, start: datetime, end: datetime, size: int) -> Iterator[List[Dict[str, Any]]]:
+        found = self.logs[log_name].span(epoch_ns(start), epoch_ns(end))
+        for i in range(0, len(found), size):
+            yield self.logs[log_name].records(found[i : i + size])
+
+    def reading_arrays(self, start: datetime, end: datetime) -> Tuple[np.ndarray, np.ndarray]:
+        log = self.logs["bg_readings"]
+        found = log.span(epoch_ns(start), epoch_ns(end))
+        return log.times()[found], np.round(log.values()[found].astype(np.float64), FLOAT_DECIMALS)
+
+    def page(
+        self,
+        log_name: str,
+        start: datetime,
+        end: datetime,
+        size: int,
+        before: Optional[Tuple[str, int]] = None,
+        where: Any = None,
+    ) -> List[Dict[str, Any]]:
+        # Walks back from the cursor a block at a time, so a page only looks
+        # at about as many entries as it shows (more when a filter is rare).
+        log = self.logs[log_name]
+        lo = epoch_ns(start)
+        if before is None:
+            older, ties = log.span(lo, epoch_ns(end)), np.empty(0, dtype=np.int64)
+        else:
+            at = epoch_ns(datetime.fromisoformat(before[0]))
+            older, ties = log.span(lo, at), log.span(at, at + 1)
+            ties = ties[ties + 1 < before[1]]
+        step = 4 * size
+        blocks = [ties] + [older[max(stop - step, 0) : stop] for stop in range(len(older), 0, -step)]
+        picked: List[np.ndarray] = []
+        wanted = size
+        for block in blocks:
+            block = block[::-1]
+            if where is not None:
+                block = block[log.equals(FILTER_COLUMNS[log_name], where, block)]
+            picked.append(block[:wanted])
+            wanted -= len(picked[-1])
+            if wanted <= 0:
+                break
+        return log.records(np.concatenate(picked))
+
+    def daily(self, start: Optional[date] = None, end: Optional[date] = None) -> List[Dict[str, Any]]:
+        lo = start.isoformat() if start else ""
+        hi = end.isoformat() if end else "~"
+        days = sorted(day for day in self.rollups if lo <= day < hi)
+        return [finish_rollup(self.rollups[day]) for day in days]
+
+    def time_in_range(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, int]:
+        return self.tir.window(
+            epoch_ns(start) if start else None, epoch_ns(end) if end else None
+        )
+
+    def forecast(self) -> Optional[Dict[str, Any]]:
+        return self.forecaster.forecast()
+
+
+class SQLiteStore(Store):
+    # One connection per process, shared by every session's script thread,
+    # so access is serialised with a lock. WAL lets readers proceed while a
+    # write commits, and every query is a fixed SQL string so sqlite3's
+    # statement cache reuses the prepared statement across reruns.
+    #
+    # Single entries (form submissions) are write-behind: `append` queues
+    # the entry and returns, and a background thread writes whatever has
+    # queued up in one transaction. Reads write the queue first, so they
+    # always see every entry appended before them.
+    #
+    # Entries from before `until` live in archive segments (one Parquet
+    # file per log per month, in <path>-archive) rather than in the tables;
+    # the same thread moves each month there once it leaves the hot window,
+    # and entries written with an older time go straight to their month's
+    # segment. Reads whose window reaches before `until` also read the
+    # segments it overlaps. Ids are assigned here rather than by SQLite, so
+    # they stay unique across both tiers.
+    #
+    # Short-lived readers such as the clinic report CLI open the file with
+    # write_behind=False: no writer thread, so they never archive or tidy
+    # the archive under the server that owns it. Their queued entries are
+    # written by the next read or flush().
+    def __init__(self, path: str, write_behind: bool = True):
+        self.path = path
+        self.cache_key = f"sqlite:{os.path.abspath(path)}"
+        self.lock = threading.Lock()
+        self.pending: List[Tuple[str, Dict[str, Any]]] = []
+        self.pending_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.closed = False
+        self.writes = {"batches": 0, "rows": 0, "largest": 0}
+        self.attempts = 0  # failed tries at the queued batch so far
+        self.failed: List[Tuple[str, Dict[str, Any], str]] = []
+        self.conn = sqlite3.connect(path, check_same_thread=False, cached_statements=128)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.sql: Dict[str, Dict[str, str]] = {}
+        unclassified = self._create_schema()
+        self.settings = self.load_settings()
+        self.archive_dir = f"{path}-archive"
+        self.until: Optional[str] = None  # ISO date
+        self.segments: Dict[str, Dict[str, Segment]] = {}  # log -> month -> segment
+        with self.lock:
+            self._load_manifest()
+            if write_behind:
+                self._remove_orphans()
+        with self.lock, self.conn:
+            # Databases written before readings had a stored class get them
+            # classified once, and rollups built from those.
+            if unclassified:
+                self._classify(0)
+            if unclassified or self.conn.execute("SELECT COUNT(*) FROM daily_rollups").fetchone()[0] == 0:
+                self._rebuild_rollups()
+        self.latest_records: Dict[str, Dict[str, Any]] = {}
+        # Built from the readings on first use, then kept up to date on write.
+        self.tir: Optional[TirIndex] = None
+        self.forecaster: Optional[Forecaster] = None
+        for log_name in LOG_COLUMNS:
+            self._track_latest(log_name, self.tail(log_name, 1))
+        self.writer: Optional[threading.Thread] = None
+        if write_behind:
+            self.writer = threading.Thread(target=self._write_behind, name=f"alera-writer:{path}", daemon=True)
+            self.writer.start()
+            # Entries still queued when the server shuts down are written then.
+            atexit.register(self.flush)
+
+    def _create_schema(self) -> bool:
+        # Returns whether derived columns had to be added to existing tables.
+        added = False
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+            rollup_types = {"bg_min": "REAL", "bg_max": "REAL", "bg_sum": "REAL NOT NULL DEFAULT 0"}
+            rollup_fields = ", ".join(
+                f"{field} {rollup_types.get(field, 'INTEGER NOT NULL DEFAULT 0')}"
+                for field in ROLLUP_FIELDS
+            )
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS daily_rollups (day TEXT PRIMARY KEY, {rollup_fields})"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS archive_segments (log TEXT NOT NULL, month TEXT NOT NULL, "
+                "file TEXT NOT NULL, rows INTEGER NOT NULL, min_time TEXT NOT NULL, max_time TEXT NOT NULL, "
+                "min_id INTEGER NOT NULL, max_id INTEGER NOT NULL, PRIMARY KEY (log, month))"
+            )
+            self.conn.execute("CREATE TABLE IF NOT EXISTS archive (until TEXT NOT NULL)")
+            for log_name, types in SQL_TYPES.items():
+                # Derived columns hold codes into their categories.
+                types = {**types, **{col: "INTEGER" for col in DERIVED_COLUMNS.get(log_name, {})}}
+                fields = ", ".join(f"{col} {kind}" for col, kind in types.items())
+                self.conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {log_name} "
+                    f"(id INTEGER PRIMARY KEY, time TEXT NOT NULL, {fields})"
+                )
+                existing = {row[1] for row in self.conn.execute(f"PRAGMA table_info({log_name})")}
+                for col in DERIVED_COLUMNS.get(log_name, {}):
+                    if col not in existing:
+                        self.conn.execute(f"ALTER TABLE {log_name} ADD COLUMN {col} INTEGER")
+                        added = True
+                self.conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {log_name}_time ON {log_name} (time)"
+                )
+                filter_column = FILTER_COLUMNS.get(log_name)
+                if filter_column:
+                    self.conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS {log_name}_{filter_column}_time "
+                        f"ON {log_name} ({filter_column}, time)"
+                    )
+                columns = ", ".join(LOG_COLUMNS[log_name])
+                selected = ", ".join(stored_columns(log_name))
+                placeholders = ", ".join("?" for _ in stored_columns(log_name))
+                self.sql[log_name] = {
+                    # Derived columns are written with the entry, not after it.
+                    "insert": f"INSERT INTO {log_name} (id, {selected}) VALUES (?, {placeholders})",
+                    "version": f"SELECT COALESCE(MAX(id), 0) FROM {log_name}",
+                    "since": f"SELECT id, {selected} FROM {log_name} WHERE id > ? ORDER BY id",
+                    "since_from": (
+                        f"SELECT id, {selected} FROM {log_name} WHERE id > ? AND time >= ? ORDER BY id"
+                    ),
+                    "between": (
+                        f"SELECT id, {selected} FROM {log_name} "
+                        "WHERE time >= ? AND time < ? ORDER BY time, id"
+                    ),
+                    "count": f"SELECT COUNT(*) FROM {log_name} WHERE time >= ? AND time < ?",
+                    "tail": (
+                        f"SELECT * FROM (SELECT id, {selected} FROM {log_name} "
+                        "ORDER BY time DESC, id DESC LIMIT ?) ORDER BY time, id"
+                    ),
+                    # Keyset pagination: each chunk resumes after the last
+                    # (time, id) seen, so every chunk is one index seek.
+                    "chunk": (
+                        f"SELECT id, {selected} FROM {log_name} "
+                        "WHERE (time, id) > (?, ?) AND time < ? ORDER BY time, id LIMIT ?"
+                    ),
+                    # History pages walk back from the previous page's last
+                    # (time, id); the first page starts from (end, 0).
+                    "page": (
+                        f"SELECT id, {selected} FROM {log_name} "
+                        "WHERE time >= ? AND (time, id) < (?, ?) ORDER BY time DESC, id DESC LIMIT ?"
+                    ),
+                    "newest_since": (
+                        f"SELECT id, {selected} FROM {log_name} WHERE id > ? "
+                        "ORDER BY time DESC, id DESC LIMIT 1"
+                    ),
+                    "head": f"SELECT id, {selected} FROM {log_name} ORDER BY time, id LIMIT 1",
+                    "roll_up": self._roll_up_sql(log_name),
+                    "merge_rollup": self._merge_rollup_sql(log_name),
+                    # Archiving moves a month of entries at a time.
+                    "first_time": f"SELECT MIN(time) FROM {log_name}",
+                    "month": (
+                        f"SELECT id, {columns} FROM {log_name} "
+                        "WHERE time >= ? AND time < ? ORDER BY time, id"
+                    ),
+                    "delete_month": f"DELETE FROM {log_name} WHERE time >= ? AND time < ?",
+                }
+                if log_name == "bg_readings":
+                    self.sql[log_name]["values_since"] = (
+                        f"SELECT time, value FROM {log_name} WHERE id > ? ORDER BY id"
+                    )
+                    self.sql[log_name]["values_from"] = (
+                        f"SELECT time, value FROM {log_name} WHERE time >= ? ORDER BY time, id"
+                    )
+                    self.sql[log_name]["values_between"] = (
+                        f"SELECT time, value FROM {log_name} WHERE time >= ? AND time < ? ORDER BY time, id"
+                    )
+                    self.sql[log_name]["classify"] = CLASSIFY_SQL
+                if filter_column:
+                    self.sql[log_name]["page_where"] = (
+                        f"SELECT id, {selected} FROM {log_name} "
+                        f"WHERE {filter_column} = ? AND time >= ? AND (time, id) < (?, ?) "
+                        "ORDER BY time DESC, id DESC LIMIT ?"
+                    )
+        return added
+
+    def _rollup_merges(self, log_name: str) -> str:
+        # How a day's new totals fold into daily_rollups: counts and sums
+        # add up, min/max take the extreme.
+        merges = []
+        for field in ROLLUP_SQL[log_name]:
+            if field in ("bg_min", "bg_max"):
+                pick = "MIN" if field == "bg_min" else "MAX"
+                merges.append(
+                    f"{field} = CASE WHEN {field} IS NULL THEN excluded.{field} "
+                    f"ELSE {pick}({field}, excluded.{field}) END"
+                )
+            else:
+                merges.append(f"{field} = {field} + excluded.{field}")
+        return f"ON CONFLICT(day) DO UPDATE SET {', '.join(merges)}"
+
+    def _roll_up_sql(self, log_name: str) -> str:
+        # Aggregates rows newer than :after per day and folds them in.
+        aggregates = ROLLUP_SQL[log_name]
+        return (
+            f"INSERT INTO daily_rollups (day, {', '.join(aggregates)}) "
+            f"SELECT substr(time, 1, 10) AS day, {', '.join(aggregates.values())} "
+            f"FROM {log_name} WHERE id > :after GROUP BY day {self._rollup_merges(log_name)}"
+        )
+
+    def _merge_rollup_sql(self, log_name: str) -> str:
+        # Folds in one day's totals computed outside SQL (archived months).
+        fields = list(ROLLUP_SQL[log_name])
+        return (
+            f"INSERT INTO daily_rollups (day, {', '.join(fields)}) "
+            f"VALUES (?, {', '.join('?' for _ in fields)}) {self._rollup_merges(log_name)}"
+        )
+
+    def _roll_up(self, log_name: str, after: int):
+        # Caller holds the lock and the transaction.
+        self.conn.execute(self.sql[log_name]["roll_up"], {"after": after})
+
+    def _classify(self, after: int):
+        # Caller holds the lock and the transaction. Sets the status of
+        # readings with id > after in one statement: for new thresholds
+        # and databases from before the column, as inserts classify their
+        # own readings.
+        params = {key: self.settings[key] for key in THRESHOLD_KEYS}
+        self.conn.execute(self.sql["bg_readings"]["classify"], {"after": after, **params})
+
+    def _insert(self, log_name: str, columns: Dict[str, Any]):
+        # Caller holds the lock and the transaction. Writes a batch, a list
+        # or array per LOG_COLUMNS column with times as ISO strings, with the
+        # next ids. Readings are classified with tir.classify on the whole
+        # batch, so each row is written once. Rows dated before the boundary
+        # go straight to their months' segments without passing through the
+        # tables.
+        after = self._version(log_name)
+        columns = {"id": np.arange(after + 1, after + 1 + len(columns["time"])), **columns}
+        if log_name == "bg_readings":
+            columns["status"] = classify(np.asarray(columns["value"], dtype=np.float64), self.settings)
+        strays: Dict[str, np.ndarray] = {}
+        if self.until is not None:
+            columns["time"] = np.asarray(columns["time"], dtype=str)
+            stray = columns["time"] < self.until
+            if stray.any():
+                strays = {name: np.asarray(values)[stray] for name, values in columns.items()}
+                columns = {name: np.asarray(values)[~stray] for name, values in columns.items()}
+        listed = [columns[name] for name in ["id", *stored_columns(log_name)]]
+        rows = zip(*(values.tolist() if isinstance(values, np.ndarray) else values for values in listed))
+        self.conn.executemany(self.sql[log_name]["insert"], rows)
+        self._inserted(log_name, after)
+        if strays:
+            self._archive_strays(log_name, strays)
+
+    def _inserted(self, log_name: str, after: int):
+        # Caller holds the lock and the transaction. Brings everything kept
+        # alongside the log up to date with the entries with id > after.
+        self._roll_up(log_name, after)
+        self._track_latest(log_name, self._records(
+            log_name, self.conn.execute(self.sql[log_name]["newest_since"], (after,))
+        ))
+        if log_name == "bg_readings":
+            self._follow_readings(after)
+
+    def _rebuild_rollups(self):
+        self.conn.execute("DELETE FROM daily_rollups")
+        for log_name in LOG_COLUMNS:
+            self._roll_up(log_name, 0)
+            for segment in self.segments[log_name].values():
+                self._roll_up_segment(log_name, segment)
+
+    def _time_values(self, statement: str, *params: Any) -> Tuple[np.ndarray, np.ndarray]:
+        # Caller holds the lock. Readings' times (epoch ns) and values.
+        rows = self.conn.execute(self.sql["bg_readings"][statement], params).fetchall()
+        # Two comprehensions: zip(*rows) is an order of magnitude slower on
+        # a million rows.
+        return (
+            np.array([row[0] for row in rows], dtype="datetime64[ns]").astype(np.int64),
+            np.array([row[1] for row in rows], dtype=np.float32),
+        )
+
+    def _follow_readings(self, after: int):
+        # Caller holds the lock. Feeds readings with id > after to the
+        # time-in-range index and the forecaster, once those exist.
+        if self.tir is None and self.forecaster is None:
+            return
+        times, values = self._time_values("values_since", after)
+        if self.tir is not None:
+            self.tir.add(times, values)
+        if self.forecaster is not None and not self.forecaster.add(times, values):
+            self.forecaster = self._replay_forecast()
+
+    def _replay_forecast(self) -> Forecaster:
+        # Caller holds the lock. A forecaster fed the hours of readings
+        # before the newest one.
+        newest = self.latest_records.get("bg_readings")
+        if newest is None:
+            return Forecaster()
+        since = datetime.fromisoformat(newest["time"]) - timedelta(microseconds=HISTORY_NS // 1000)
+        return Forecaster.replay(*self._time_values("values_from", iso(since)))
+
+    def _write_behind(self):
+        # Also archives whatever has left the hot window: at start-up, then
+        # on every wake-up and at least every COMPACT_SECONDS.
+        while True:
+            try:
+                self.flush()
+            except Exception:
+                log.exception("Writing queued entries to %s failed", self.path)
+            try:
+                self.compact()
+            except Exception:
+                # The month stays in the tables and is tried again next time.
+                log.exception("Archiving %s failed", self.path)
+            self.wake.wait(COMPACT_SECONDS)
+            self.wake.clear()
+            if self.closed:
+                return
+
+    def _write_pending(self):
+        # Caller holds the lock and the transaction. Writes the queued
+        # entries in submission order, one executemany per log. A batch
+        # that fails is logged and put back, WRITE_ATTEMPTS - 1 times; then
+        # its entries are written one by one and those that still fail are
+        # set aside. Never raises, so a bad entry can't fail reads or other
+        # writes.
+        with self.pending_lock:
+            batch, self.pending = self.pending, []
+        if not batch:
+            return
+        failed = len(self.failed)
+        try:
+            with self._savepoint():
+                by_log: Dict[str, List[Dict[str, Any]]] = {}
+                for log_name, record in batch:
+                    by_log.setdefault(log_name, []).append(record)
+                for log_name, records in by_log.items():
+                    self._insert(log_name, {col: [record[col] for record in records] for col in LOG_COLUMNS[log_name]})
+            written = True
+        except Exception:
+            log.exception("Writing %d queued entries to %s failed", len(batch), self.path)
+            self.attempts += 1
+            if self.attempts < WRITE_ATTEMPTS:
+                with self.pending_lock:
+                    self.pending[:0] = batch
+                return
+            written = False
+        if not written:
+            self._write_each(batch)
+        self.attempts = 0
+        self.writes["batches"] += 1
+        self.writes["rows"] += len(batch) - (len(self.failed) - failed)
+        self.writes["largest"] = max(self.writes["largest"], len(batch))
+
+    def _write_each(self, entries: List[Tuple[str, Dict[str, Any]]]):
+        # Caller holds the lock and the transaction. Sets aside the entries
+        # that fail on their own.
+        for log_name, record in entries:
+            try:
+                with self._savepoint():
+                    self._insert(log_name, {col: [record[col]] for col in LOG_COLUMNS[log_name]})
+            except Exception as error:
+                log.exception("Setting aside a %s entry for %s", log_name, record.get("time"))
+                self.failed.append((log_name, record, f"{type(error).__name__}: {error}"))
+
+    @contextmanager
+    def _savepoint(self) -> Iterator[None]:
+        # Caller holds the lock and the transaction. Undoes the block's
+        # writes if it raises, and drops what was kept in memory alongside
+        # them, to be rebuilt from what is left.
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN")
+        self.conn.execute("SAVEPOINT pending")
+        try:
+            yield
+        except Exception:
+            self.conn.execute("ROLLBACK TO pending")
+            self.conn.execute("RELEASE pending")
+            self._load_manifest()
+            self.tir = None
+            self.forecaster = None
+            for log_name in LOG_COLUMNS:
+                self.latest_records.pop(log_name, None)
+                self._track_latest(log_name, self._tail(log_name, 1))
+            raise
+        self.conn.execute("RELEASE pending")
+
+    def _write_queued(self):
+        # Caller holds the lock. Writes the queue in its own transaction.
+        if self.pending:
+            with self.conn:
+                self._write_pending()
+
+    @contextmanager
+    def _reading(self) -> Iterator[None]:
+        # Holds the lock for a read, after writing any queued entries.
+        with self.lock:
+            self._check_open()
+            self._write_queued()
+            yield
+
+    def _check_open(self):
+        # Raises, as the connection would, once close() has started: an
+        # entry appended after that would never be written.
+        if self.closed:
+            raise sqlite3.ProgrammingError(f"The store for {self.path} is closed.")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        # Caller holds the lock. Archiving updates the manifest in memory as
+        # it goes, so a rollback reloads it from the database.
+        try:
+            with self.conn:
+                yield
+        except Exception:
+            self._load_manifest()
+            raise
+
+    def _version(self, log_name: str) -> int:
+        # Caller holds the lock. Ids are never reused, archived or not.
+        archived = max((segment.max_id for segment in self.segments[log_name].values()), default=0)
+        return max(self.conn.execute(self.sql[log_name]["version"]).fetchone()[0], archived)
+
+    # ---- archive ----
+    def _load_manifest(self):
+        # Caller holds the lock.
+        row = self.conn.execute("SELECT until FROM archive").fetchone()
+        self.until = row[0] if row else None
+        self.segments = {log_name: {} for log_name in LOG_COLUMNS}
+        for row in self.conn.execute(
+            "SELECT log, month, file, rows, min_time, max_time, min_id, max_id FROM archive_segments"
+        ):
+            segment = Segment(*row)
+            self.segments[segment.log][segment.month] = segment
+
+    def _remove_orphans(self):
+        # Caller holds the lock. Deletes segment files the manifest doesn't
+        # name: ones a merge replaced, or written by a rolled-back transaction.
+        if not os.path.isdir(self.archive_dir):
+            return
+        named = {segment.file for segments in self.segments.values() for segment in segments.values()}
+        for name in os.listdir(self.archive_dir):
+            if name.endswith((".parquet", ".partial")) and name not in named:
+                os.remove(os.path.join(self.archive_dir, name))
+
+    def _segment_path(self, segment: Segment) -> str:
+        return os.path.join(self.archive_dir, segment.file)
+
+    def _overlapping(self, log_name: str, lo: str = "", hi: str = "~", newest_first: bool = False) -> List[Segment]:
+        # Caller holds the lock. Segments with entries in [lo, hi), in time order.
+        segments = [segment for segment in self.segments[log_name].values() if segment.overlaps(lo, hi)]
+        return sorted(segments, key=lambda segment: segment.month, reverse=newest_first)
+
+    def _archived(self, log_name: str, lo: str, hi: str, columns: Optional[List[str]] = None):
+        # Caller holds the lock. Archived entries with lo <= time < hi, a
+        # table per segment.
+        for segment in self._overlapping(log_name, lo, hi):
+            table = read_segment(self._segment_path(segment), columns)
+            if segment.min_time < lo or segment.max_time >= hi:
+                table = select(table, in_window(table, lo, hi))
+            yield table
+
+    def _archived_records(self, log_name: str, table) -> List[Dict[str, Any]]:
+        # Records like _records returns, classifying readings under the
+        # current thresholds.
+        records = table.to_pylist()
+        if log_name == "med_logs":
+            for record in records:
+                record["taken"] = bool(record["taken"])
+        elif log_name == "bg_readings":
+            codes = classify(table["value"].to_numpy(), self.settings)
+            for record, code in zip(records, codes.tolist()):
+                record["status"] = CLASSES[code]
+        return records
+
+    def _segment_columns(self, log_name: str, table) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        # A segment's times (epoch ns) and the columns rollup_columns needs.
+        times = np.array(table["time"].to_pylist(), dtype="datetime64[ns]").astype(np.int64)
+        columns = {}
+        for name, kind in SQL_TYPES[log_name].items():
+            if kind == "REAL":
+                columns[name] = table[name].to_numpy()
+            elif kind == "INTEGER":
+                columns[name] = table[name].fill_null(NULL_INT).to_numpy()
+        if log_name == "med_logs":
+            columns["taken"] = columns["taken"].astype(bool)
+        elif log_name == "bg_readings":
+            columns["status"] = classify(columns["value"], self.settings)
+        return times, columns
+
+    def _roll_up_segment(self, log_name: str, segment: Segment):
+        # Caller holds the lock and the transaction.
+        self._roll_up_table(log_name, read_segment(self._segment_path(segment)))
+
+    def _roll_up_table(self, log_name: str, table):
+        # Caller holds the lock and the transaction. Folds the entries of a
+        # segment table into the rollups.
+        days, totals = day_totals(log_name, *self._segment_columns(log_name, table))
+        fields = list(ROLLUP_SQL[log_name])
+        rows = []
+        for i, day in enumerate(days):
+            values = [totals[field][i].item() for field in fields]
+            rows.append((day, *(
+                value if field in ("bg_min", "bg_max", "bg_sum") else int(value)
+                for field, value in zip(fields, values)
+            )))
+        self.conn.executemany(self.sql[log_name]["merge_rollup"], rows)
+
+    def _archive_month(self, log_name: str, month: str):
+        # Caller holds the lock and the transaction. Moves the log's entries
+        # in `month` from its table into the month's segment. Their rollups
+        # stay as they are.
+        lo, hi = month_bounds(month)
+        rows = self.conn.execute(self.sql[log_name]["month"], (lo, hi)).fetchall()
+        if not rows:
+            return
+        columns = [[row[i] for row in rows] for i in range(len(rows[0]))]
+        self._archive_table(log_name, month, segment_table(SQL_TYPES[log_name], columns))
+        self.conn.execute(self.sql[log_name]["delete_month"], (lo, hi))
+
+    def _archive_strays(self, log_name: str, columns: Dict[str, np.ndarray]):
+        # Caller holds the lock and the transaction. Adds new entries (an
+        # array per stored column, and their ids) dated before the boundary
+        # to their months' segments, with their rollups and the latest entry.
+        order = np.lexsort((columns["id"], columns["time"]))
+        columns = {name: values[order] for name, values in columns.items()}
+        if log_name == "med_logs":
+            # Stored as 0/1, as SQLite returns them.
+            columns["taken"] = columns["taken"].astype(np.int64)
+        names = ["id", *stored_columns(log_name)]
+        newest = list(zip(*(columns[name][-1:].tolist() for name in names)))
+        self._track_latest(log_name, self._to_records(log_name, names, newest))
+        months = columns["time"].astype("U7")
+        bounds = [0, *(np.flatnonzero(months[1:] != months[:-1]) + 1).tolist(), len(months)]
+        for a, b in zip(bounds, bounds[1:]):
+            table = segment_table(SQL_TYPES[log_name], [columns[name][a:b] for name in ["id", "time", *SQL_TYPES[log_name]]])
+            self._roll_up_table(log_name, table)
+            self._archive_table(log_name, str(months[a]), table)
+
+    def _archive_table(self, log_name: str, month: str, table):
+        # Caller holds the lock and the transaction. Writes `table` (in
+        # (time, id) order) into the month's segment, merged with what the
+        # segment already holds.
+        old = self.segments[log_name].get(month)
+        if old is not None:
+            table = merge_tables([read_segment(self._segment_path(old)), table])
+        # Named after the newest id, so a merged segment never overwrites
+        # the file the manifest still names until this commits.
+        segment = describe(log_name, month, "", table)
+        segment.file = f"{log_name}-{month}-{segment.max_id}.parquet"
+        os.makedirs(self.archive_dir, exist_ok=True)
+        write_segment(self._segment_path(segment), table)
+        self.conn.execute("INSERT OR REPLACE INTO archive_segments VALUES (?, ?, ?, ?, ?, ?, ?, ?)", astuple(segment))
+        self.segments[log_name][month] = segment
+
+    def _set_until(self, until: str):
+        # Caller holds the lock and the transaction.
+        self.conn.execute("DELETE FROM archive")
+        self.conn.execute("INSERT INTO archive (until) VALUES (?)", (until,))
+        self.until = until
+
+    def _archived_tir(self, lo: Optional[datetime], hi: datetime) -> Dict[str, int]:
+        # Caller holds the lock. Time-in-range counts for archived readings
+        # with lo <= time < hi: whole days from the rollups, and the rest of
+        # a first or last day from the segments.
+        counts = {"count": 0, "in_range": 0, "low": 0, "high": 0}
+        if lo is not None and lo >= hi:
+            return counts
+        midnight = lambda day: datetime.combine(day, datetime.min.time())
+        first = None if lo is None else lo.date() + timedelta(days=lo != midnight(lo.date()))
+        last = hi.date()
+        parts = []
+        if first is not None and first > last:
+            parts.append((lo, hi))
+        else:
+            row = self.conn.execute(
+                "SELECT COALESCE(SUM(bg_count), 0), COALESCE(SUM(bg_in_range), 0), "
+                "COALESCE(SUM(bg_low), 0), COALESCE(SUM(bg_high), 0) "
+                "FROM daily_rollups WHERE day >= ? AND day < ?",
+                (first.isoformat() if first else "", last.isoformat()),
+            ).fetchone()
+            counts = dict(zip(counts, row))
+            if first is not None and lo < midnight(first):
+                parts.append((lo, midnight(first)))
+            if hi > midnight(last):
+                parts.append((midnight(last), hi))
+        for part_lo, part_hi in parts:
+            for table in self._archived("bg_readings", iso(part_lo), iso(part_hi), ["time", "value"]):
+                flags = class_flags(classify(table["value"].to_numpy(), self.settings))
+                counts["count"] += table.num_rows
+                for name in ("in_range", "low", "high"):
+                    counts[name] += int(flags[name].sum())
+        return counts
+
+    def _records(self, log_name: str, cursor: sqlite3.Cursor) -> List[Dict[str, Any]]:
+        return self._to_records(log_name, [d[0] for d in cursor.description], cursor.fetchall())
+
+    def _to_records(self, log_name: str, names: List[str], rows: List[Sequence[Any]]) -> List[Dict[str, Any]]:
+        # Plain tuples zipped into dicts are several times faster than
+        # sqlite3.Row for the large batches the frame cache reads.
+        records = [dict(zip(names, row)) for row in rows]
+        if log_name == "med_logs":
+            for record in records:
+                record["taken"] = bool(record["taken"])
+        elif log_name == "bg_readings" and "status" in names:
+            for record in records:
+                record["status"] = CLASSES[record["status"]]
+        return records
+
+    def _rows(self, log_name: str, statement: str, *params: Any) -> List[Dict[str, Any]]:
+        # Caller holds the lock.
+        return self._records(log_name, self.conn.execute(self.sql[log_name][statement], params))
+
+    def _tail(self, log_name: str, n: int) -> List[Dict[str, Any]]:
+        # Caller holds the lock. Filled from the newest segments when the
+        # table has fewer than n entries.
+        rows = self._rows(log_name, "tail", n)
+        wanted = n - len(rows)
+        for segment in self._overlapping(log_name, newest_first=True):
+            if wanted <= 0:
+                break
+            table = read_segment(self._segment_path(segment))
+            table = table.slice(max(table.num_rows - wanted, 0))
+            rows[:0] = self._archived_records(log_name, table)
+            wanted -= table.num_rows
+        return rows
+
+    def _chunk(self, log_name: str, after: Tuple[str, int], hi: str, size: int) -> List[Dict[str, Any]]:
+        # Caller holds the lock. Up to `size` entries after the (time, id)
+        # `after` and before `hi`, archived ones first.
+        found: List[Dict[str, Any]] = []
+        if self.until is not None and after[0] < self.until:
+            for segment in self._overlapping(log_name, after[0], hi):
+                table = read_segment(self._segment_path(segment))
+                table = select(table, after_key(table, after), in_window(table, "", hi))
+                found += self._archived_records(log_name, table.slice(0, size - len(found)))
+                if len(found) == size:
+                    return found
+        key = (found[-1]["time"], found[-1]["id"]) if found else after
+        return found + self._rows(log_name, "chunk", *key, hi, size - len(found))
+
+    def load_settings(self) -> Dict[str, Any]:
+        with self.lock:
+            self._check_open()
+            rows = self.conn.execute("SELECT key, value FROM settings").fetchall()
+        settings = dict(DEFAULT_SETTINGS)
+        settings.update({key: json.loads(value) for key, value in rows})
+        return settings
+
+    def save_settings(self, settings: Dict[str, Any]) -> None:
+        with self.lock, self.conn:
+            self._check_open()
+            self._write_pending()
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value)) for key, value in settings.items()],
+            )
+            changed = any(self.settings[key] != settings[key] for key in THRESHOLD_KEYS)
+            self.settings = dict(settings)
+            if changed:
+                self._classify(0)
+                self._rebuild_rollups()
+                if self.tir is not None:
+                    self.tir.reclassify(self.settings)
+                self.latest_records.pop("bg_readings", None)
+                self._track_latest("bg_readings", self._tail("bg_readings", 1))
+
+    def append(self, log_name: str, record: Dict[str, Any]) -> None:
+        # A copy of just the log's columns, so a missing one fails here.
+        record = {col: record[col] for col in LOG_COLUMNS[log_name]}
+        with self.pending_lock:
+            self._check_open()
+            self.pending.append((log_name, record))
+        self.wake.set()
+
+    def append_many(self, log_name: str, rows: Iterable[Sequence[Any]]) -> None:
+        with self.lock, self.conn:
+            self._check_open()
+            self._write_pending()
+            rows = list(rows)
+            self._insert(log_name, {col: [row[i] for row in rows] for i, col in enumerate(LOG_COLUMNS[log_name])})
+
+    def append_columns(self, log_name: str, columns: Dict[str, Any]) -> None:
+        # The tables keep ISO strings, so times are formatted here, a batch
+        # at a time.
+        size = len(columns["time"])
+        batch = {"time": iso_strings(np.asarray(columns["time"], dtype="datetime64[ns]").astype(np.int64))}
+        for name in LOG_COLUMNS[log_name][1:]:
+            values = columns[name]
+            batch[name] = values if isinstance(values, np.ndarray) else np.full(size, values, dtype=object)
+        with self.lock, self.conn:
+            self._check_open()
+            self._write_pending()
+            self._insert(log_name, batch)
+
+    def compact(self) -> None:
+        # Archives a month per transaction, oldest first, moving the boundary
+        # past it, so a read in between finds each entry in exactly one tier.
+        target = hot_start().date().isoformat()
+        # Stops between months when the store is closing.
+        while (self.until is None or self.until < target) and not self.closed:
+            with self.lock, self._transaction():
+                firsts = [self.conn.execute(self.sql[log_name]["first_time"]).fetchone()[0] for log_name in LOG_COLUMNS]
+                firsts = [first for first in firsts if first is not None and first < target]
+                if not firsts:
+                    self._set_until(target)
+                    break
+                month = min(firsts)[:7]
+                self._write_pending()
+                for log_name in LOG_COLUMNS:
+                    self._archive_month(log_name, month)
+                self._set_until(max(self.until or "", month_bounds(month)[1]))
+                # The index counts readings in the tables only; rebuilt on use.
+                self.tir = None
+        # Also files replaced when a back-dated entry was merged into its segment.
+        with self.lock:
+            self._remove_orphans()
+            # Give the space back once most of the file is archived rows:
+            # the first compaction of a long history.
+            free = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if free > self.conn.execute("PRAGMA page_count").fetchone()[0] // 2:
+                self.conn.execute("VACUUM")
+
+    def version(self, log_name: str) -> int:
+        with self._reading():
+            return self._version(log_name)
+
+    def since(self, log_name: str, version: int, start: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        lo = iso(start) if start is not None else ""
+        with self._reading():
+            archived = []
+            for segment in self._overlapping(log_name, lo):
+                if segment.max_id > version:
+                    table = read_segment(self._segment_path(segment))
+                    table = select(table, ids_after(table, version), in_window(table, lo, "~"))
+                    archived += self._archived_records(log_name, table)
+            if start is None:
+                rows = self._rows(log_name, "since", version)
+            else:
+                rows = self._rows(log_name, "since_from", version, lo)
+        if not archived:
+            return rows
+        return sorted(archived + rows, key=lambda record: record["id"])
+
+    def between(self, log_name: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        lo, hi = iso(start), iso(end)
+        with self._reading():
+            archived = [
+                record
+                for table in self._archived(log_name, lo, hi)
+                for record in self._archived_records(log_name, table)
+            ]
+            return archived + self._rows(log_name, "between", lo, hi)
+
+    def count(self, log_name: str, start: datetime, end: datetime) -> int:
+        lo, hi = iso(start), iso(end)
+        with self._reading():
+            archived = 0
+            for segment in self._overlapping(log_name, lo, hi):
+                if lo <= segment.min_time and segment.max_time < hi:
+                    archived += segment.rows
+                else:
+                    table = read_segment(self._segment_path(segment), ["time"])
+                    archived += select(table, in_window(table, lo, hi)).num_rows
+            return archived + self.conn.execute(self.sql[log_name]["count"], (lo, hi)).fetchone()[0]
+
+    def tail(self, log_name: str, n: int) -> List[Dict[str, Any]]:
+        with self._reading():
+            return self._tail(log_name, n)
+
+    def earliest(self, log_name: str) -> Optional[Dict[str, Any]]:
+        with self._reading():
+            for segment in self._overlapping(log_name):
+                table = read_segment(self._segment_path(segment))
+                return self._archived_records(log_name, table.slice(0, 1))[0]
+            rows = self._rows(log_name, "head")
+            return rows[0] if rows else None
+
+    def chunks(self, log_name: str, start: datetime, end: datetime, size: int) -> Iterator[List[Dict[str, Any]]]:
+        after, hi = (iso(start), 0), iso(end)
+        while True:
+            with self._reading():
+                found = self._chunk(log_name, after, hi, size)
+            if not found:
+                return
+            yield found
+            after = (found[-1]["time"], found[-1]["id"])
+
+    def reading_arrays(self, start: datetime, end: datetime) -> Tuple[np.ndarray, np.ndarray]:
+        lo, hi = iso(start), iso(end)
+        with self._reading():
+            parts = [
+                (np.array(table["time"].to_pylist(), dtype="datetime64[ns]").astype(np.int64), table["value"].to_numpy())
+                for table in self._archived("bg_readings", lo, hi, ["time", "value"])
+            ]
+            parts.append(self._time_values("values_between", lo, hi))
+        times = np.concatenate([part[0] for part in parts])
+        values = np.concatenate([part[1].astype(np.float64) for part in parts])
+        return times, np.round(values, FLOAT_DECIMALS)
+
+    def page(
+        self,
+        log_name: str,
+        start: datetime,
+        end: datetime,
+        size: int,
+        before: Optional[Tuple[str, int]] = None,
+        where: Any = None,
+    ) -> List[Dict[str, Any]]:
+        cursor = before if before is not None else (iso(end), 0)
+        lo = iso(start)
+        with self._reading():
+            if where is None:
+                rows = self._rows(log_name, "page", lo, *cursor, size)
+            else:
+                rows = self._rows(log_name, "page_where", where, lo, *cursor, size)
+            # Archived entries are all older than the table's, so a page
+            # continues into the newest segments before the cursor.
+            for segment in self._overlapping(log_name, lo, newest_first=True):
+                wanted = size - len(rows)
+                if wanted <= 0:
+                    break
+                if segment.min_time > cursor[0]:
+                    continue
+                table = read_segment(self._segment_path(segment))
+                masks = [in_window(table, lo, "~"), before_key(table, cursor)]
+                if where is not None:
+                    masks.append(equal_to(table, FILTER_COLUMNS[log_name], where))
+                table = select(table, *masks)
+                table = table.slice(max(table.num_rows - wanted, 0))
+                rows += self._archived_records(log_name, table)[::-1]
+            return rows
+
+    def daily(self, start: Optional[date] = None, end: Optional[date] = None) -> List[Dict[str, Any]]:
+        lo = start.isoformat() if start else ""
+        hi = end.isoformat() if end else "~"
+        with self._reading():
+            cursor = self.conn.execute(
+                "SELECT * FROM daily_rollups WHERE day >= ? AND day < ? ORDER BY day", (lo, hi)
+            )
+            names = [d[0] for d in cursor.description]
+            return [finish_rollup(dict(zip(names, row))) for row in cursor.fetchall()]
+
+    def time_in_range(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, int]:
+        with self._reading():
+            if self.tir is None:
+                self.tir = TirIndex(self.settings)
+                self.tir.add(*self._time_values("values_since", 0))
+            counts = self.tir.window(
+                epoch_ns(start) if start else None, epoch_ns(end) if end else None
+            )
+            if self.until is None or (start is not None and iso(start) >= self.until):
+                return counts
+            until = datetime.fromisoformat(self.until)
+            archived = self._archived_tir(start, min(end, until) if end else until)
+            return {name: counts[name] + archived[name] for name in counts}
+
+    def forecast(self) -> Optional[Dict[str, Any]]:
+        with self._reading():
+            if self.forecaster is None:
+                self.forecaster = self._replay_forecast()
+            return self.forecaster.forecast()
+
+    def latest(self, log_name: str) -> Optional[Dict[str, Any]]:
+        with self._reading():
+            return super().latest(log_name)
+
+    def flush(self) -> None:
+        # Taking the lock also waits for a batch the writer is in the middle of.
+        with self.lock:
+            self._write_queued()
+
+    def write_stats(self) -> Optional[Dict[str, int]]:
+        with self.pending_lock:
+            return {"queued": len(self.pending), "failed": len(self.failed), **self.writes}
+
+    def failed_writes(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [
+                {"log": log_name, **{col: record[col] for col in LOG_COLUMNS[log_name]}, "error": error}
+                for log_name, record, error in self.failed
+            ]
+
+    def retry_failed(self) -> int:
+        with self.lock, self.conn:
+            self._write_pending()
+            entries, self.failed = self.failed, []
+            self._write_each([(log_name, record) for log_name, record, _ in entries])
+            return len(self.failed)
+
+    def close(self) -> None:
+        # Lets the writer finish what it is doing before the last flush.
+        # Closed under the queue's lock, so an append either lands in the
+        # queue before that flush or raises.
+        with self.pending_lock:
+            if self.closed:
+                return
+            self.closed = True
+        self.wake.set()
+        if self.writer is not None:
+            self.writer.join()
+            atexit.unregister(self.flush)
+        with self.lock:
+            try:
+                for _ in range(WRITE_ATTEMPTS):
+                    self._write_queued()
+            finally:
+                self.conn.close()
+        for log_name, record, error in self.failed:
+            log.error("Lost a %s entry on closing %s (%s): %s", log_name, self.path, error, record)
+
+
+def open_store(backend: str, path: Optional[str] = None) -> Store:
+    if backend == "memory":
+        return MemoryStore()
+    if backend == "sqlite":
+        return SQLiteStore(path or "alera.db")
+    raise ValueError(f"Unknown storage backend: {backend!r}")
+
+
+# ---------- POOL ----------
+class StorePool:
+    # Open SQLite stores, one per file, shared by every session in the
+    # process. Keeps at most `size` open, closing the least recently used
+    # one that no rerun holds a lease on (more while they all are).
+    #
+    # The pool's lock only covers its dicts. Opening a store (which may
+    # migrate and roll up an old file) and closing one (which waits for
+    # its writer, maybe mid-archive) happen under that file's own lock, so
+    # a file is never open twice and reruns on other files don't wait.
+    def __init__(self, size: int):
+        self.size = size
+        self.lock = threading.Lock()
+        self.stores: Dict[str, SQLiteStore] = {}  # least recently used first
+        self.leases: Dict[str, int] = {}
+        self.file_locks: Dict[str, threading.Lock] = {}
+
+    @contextmanager
+    def lease(self, path: str) -> Iterator[SQLiteStore]:
+        # The store stays open until the block exits.
+        with self.lock:
+            self.leases[path] = self.leases.get(path, 0) + 1
+            file_lock = self.file_locks.setdefault(path, threading.Lock())
+        try:
+            with file_lock:
+                with self.lock:
+                    store = self.stores.get(path)
+                if store is None:
+                    store = SQLiteStore(path)
+                with self.lock:
+                    self.stores.pop(path, None)
+                    self.stores[path] = store
+                    evicted = self._evict()
+            for other_lock, other in evicted:
+                try:
+                    other.close()
+                except Exception:
+                    log.exception("Closing %s failed", other.path)
+                finally:
+                    other_lock.release()
+            yield store
+        finally:
+            with self.lock:
+                self.leases[path] -= 1
+
+    def _evict(self) -> List[Tuple[threading.Lock, SQLiteStore]]:
+        # Caller holds the lock. Takes idle stores out of the pool, least
+        # recently used first, and returns them with their files' locks
+        # held, for the caller to close. Stores holding set-aside entries
+        # stay open so they can be retried.
+        evicted = []
+        idle = [
+            other for other, candidate in self.stores.items()
+            if not self.leases[other] and not candidate.failed
+        ]
+        for other in idle[: max(len(self.stores) - self.size, 0)]:
+            # Free for an idle store: a lease counts before taking it.
+            if self.file_locks[other].acquire(blocking=False):
+                evicted.append((self.file_locks[other], self.stores.pop(other)))
+                del self.leases[other]
+        return evicted
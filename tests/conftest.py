@@ -0,0 +1,23 @@
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Any
+
+import pytest
+
+# The app's modules live at the repository root and are imported by name.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def reading(minutes_ago: float, value: float = 6.5, context: str = "Fasting") -> Dict[str, Any]:
+    time = datetime.now().replace(microsecond=0) - timedelta(minutes=minutes_ago)
+    return {"time": time.isoformat(), "value": value, "context": context, "notes": ""}
+
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    from storage import SQLiteStore
+
+    store = SQLiteStore(str(tmp_path / "alera.db"))
+    yield store
+    store.close()
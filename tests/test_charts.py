@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from charts import downsample, lttb_indices
+
+
+@pytest.mark.parametrize("n, budget", [(4, 3), (10, 9), (11, 3), (1000, 300), (1001, 999), (5000, 77)])
+def test_lttb_keeps_endpoints_and_exactly_budget_points(n, budget):
+    rng = np.random.default_rng(n)
+    x = np.sort(rng.uniform(0, 1e6, n))
+    y = rng.normal(7, 2, n)
+    kept = lttb_indices(x, y, budget)
+    assert len(kept) == budget
+    assert kept[0] == 0 and kept[-1] == n - 1
+    assert (np.diff(kept) > 0).all()  # sorted and unique
+
+
+def test_lttb_keeps_peaks_and_dips():
+    x = np.arange(2000, dtype=np.float64)
+    y = np.full(2000, 6.0)
+    y[700], y[1500] = 22.0, 2.1
+    kept = lttb_indices(x, y, 50)
+    assert 700 in kept and 1500 in kept
+
+
+def test_lttb_small_inputs_keep_everything():
+    x = np.arange(5, dtype=np.float64)
+    assert list(lttb_indices(x, x, 5)) == [0, 1, 2, 3, 4]
+    assert list(lttb_indices(x, x, 8)) == [0, 1, 2, 3, 4]
+
+
+def test_downsample_returns_budget_rows_in_time_order():
+    times = pd.date_range("2026-01-01", periods=3000, freq="5min")
+    df = pd.DataFrame({"time": times, "value": np.sin(np.arange(3000) / 50) + 7})
+    small = downsample(df, 200)
+    assert len(small) == 200
+    assert small["time"].is_monotonic_increasing
+    assert small["time"].iloc[0] == times[0] and small["time"].iloc[-1] == times[-1]
@@ -0,0 +1,80 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+import clinic
+from storage import SQLiteStore
+
+END = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+START = END - timedelta(days=14)
+# (hours before END, value): two lows, three in range, one very high.
+READINGS = [(100, 3.2), (80, 6.0), (60, 7.5), (40, 2.9), (20, 9.8), (10, 16.0)]
+# (hours before END, name, taken)
+DOSES = [(90, "Insulin", True), (70, "Insulin", False), (50, "Insulin", True), (30, "Metformin", True)]
+
+
+def seed(path: str, outside: bool = False):
+    store = SQLiteStore(path, write_behind=False)
+    at = lambda hours: (END - timedelta(hours=hours)).isoformat()
+    store.append_many("bg_readings", [(at(hours), value, "Fasting", "") for hours, value in READINGS])
+    store.append_many("med_logs", [(at(hours), name, "4u", taken) for hours, name, taken in DOSES])
+    store.append_many("meal_logs", [(at(61), "Lunch", 40)])
+    if outside:
+        # A day after the period and a day before it: not in the report.
+        store.append_many("bg_readings", [(at(-24), 2.0, "Fasting", ""), (at(15 * 24), 2.0, "Fasting", "")])
+    store.close()
+
+
+@pytest.fixture
+def summary(tmp_path):
+    path = str(tmp_path / "alice.db")
+    seed(path, outside=True)
+    store = SQLiteStore(path, write_behind=False)
+    yield clinic.summarise(store, "alice", START, END)
+    store.close()
+
+
+def test_summary_counts_the_period(summary):
+    assert summary.classes == {"low": 2, "below target": 0, "in range": 3, "high": 0, "very high": 1}
+    assert summary.days == 14
+    assert summary.lows["value"].tolist() == [2.9, 3.2]  # newest first
+    adherence = summary.adherence
+    assert adherence.loc["Insulin", ["logged", "taken", "missed"]].tolist() == [3, 2, 1]
+    assert adherence.loc["Metformin", ["logged", "taken", "missed"]].tolist() == [1, 1, 0]
+    assert summary.totals["meal_count"] == 1 and summary.totals["carbs_total"] == 40
+
+
+def test_report_html(summary):
+    page = clinic.render_html(summary)
+    assert page.startswith("<!DOCTYPE html>")
+    assert "Alera clinic report – alice" in page
+    assert "<b>50%</b>" in page  # in range: 3 of 6
+    assert "<td>Insulin</td><td>3</td><td>2</td><td>1</td>" in page
+    assert "2.9" in page and "2.0" not in page
+
+
+def test_main_reports_every_user(tmp_path, capsys):
+    data, out = tmp_path / "users", tmp_path / "reports"
+    data.mkdir()
+    for user in ("alice", "bob"):
+        seed(str(data / f"{user}.db"))
+    # Another program's database in the same folder is left untouched.
+    other = sqlite3.connect(data / "other.db")
+    other.execute("CREATE TABLE things (name TEXT)")
+    other.commit()
+    other.close()
+
+    args = ["--data-dir", str(data), "--out", str(out), "--end", (END - timedelta(days=1)).date().isoformat()]
+    assert clinic.main([*args, "--workers", "1"]) == 0
+    day = f"{END - timedelta(days=1):%Y-%m-%d}"
+    assert sorted(path.name for path in out.iterdir()) == [f"alice-{day}.html", f"bob-{day}.html"]
+    assert "2 reports" in capsys.readouterr().out
+    other = sqlite3.connect(data / "other.db")
+    assert [row[0] for row in other.execute("SELECT name FROM sqlite_master")] == ["things"]
+    other.close()
+    assert not (data / "other.db-archive").exists()
+
+    for bad in (["--days", "0"], ["--workers", "0"], ["--workers", "-2"], ["other"]):
+        with pytest.raises(SystemExit):
+            clinic.main([*args, *bad])
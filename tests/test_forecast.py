@@ -0,0 +1,81 @@
+import numpy as np
+
+from forecast import HISTORY_NS, MAX_GAP_MINUTES, MIN_STEPS, NS_PER_MINUTE, Forecaster
+
+START = 1_790_000_000 * 10**9  # epoch ns
+
+
+def cgm(minutes: int, rate: float = 0.02, seed: int = 5):
+    # A reading every 5 minutes drifting at `rate` mmol/L per minute.
+    rng = np.random.default_rng(seed)
+    offsets = np.arange(0, minutes, 5)
+    times = START + offsets * NS_PER_MINUTE
+    values = (6.0 + rate * offsets + rng.normal(0, 0.1, len(offsets))).astype(np.float32)
+    return times, values
+
+
+def state(model: Forecaster):
+    return model.time, model.level, model.trend, model.steps
+
+
+def test_trend_needs_a_run_of_readings():
+    model = Forecaster()
+    times, values = cgm(5 * MIN_STEPS)
+    for i, (time, value) in enumerate(zip(times.tolist(), values.tolist()), 1):
+        model.update(time, value)
+        assert (model.forecast() is None) == (i < MIN_STEPS)
+    forecast = model.forecast()
+    assert forecast["rate"] > 0
+    assert forecast["predictions"][60] > forecast["predictions"][30] > 0
+
+
+def test_gap_starts_a_new_trend():
+    model = Forecaster()
+    times, values = cgm(60)
+    model.add(times, values)
+    assert model.forecast() is not None
+    later = int(times[-1] + (MAX_GAP_MINUTES + 1) * NS_PER_MINUTE)
+    model.update(later, 9.0)
+    assert (model.time, model.level, model.trend, model.steps) == (later, 9.0, 0.0, 1)
+    assert model.forecast() is None
+    # Exactly MAX_GAP_MINUTES still continues the run.
+    model.update(int(later + MAX_GAP_MINUTES * NS_PER_MINUTE), 9.5)
+    assert model.steps == 2
+
+
+def test_same_time_only_refines_the_level():
+    model = Forecaster()
+    times, values = cgm(30)
+    model.add(times, values)
+    time, level, trend, steps = state(model)
+    model.update(time, level + 1.0)
+    assert model.time == time and model.trend == trend and model.steps == steps
+    assert level < model.level < level + 1.0
+
+
+def test_older_reading_is_refused_unchanged():
+    model = Forecaster()
+    times, values = cgm(60)
+    model.add(times, values)
+    before = state(model)
+    assert not model.add(times[:1] - NS_PER_MINUTE, values[:1])
+    assert state(model) == before
+
+
+def test_replay_matches_reading_by_reading():
+    # A day of readings: replay feeds only the last HISTORY_NS of them, in
+    # shuffled batches; the forecast is the same as feeding every one.
+    times, values = cgm(24 * 60, rate=-0.001)
+    assert times[-1] - times[0] > HISTORY_NS
+    one_by_one = Forecaster()
+    for time, value in zip(times.tolist(), values.tolist()):
+        one_by_one.update(time, value)
+    order = np.random.default_rng(2).permutation(len(times))
+    replayed = Forecaster.replay(times[order], values[order])
+    assert replayed.time == one_by_one.time and replayed.steps < one_by_one.steps
+    assert replayed.forecast() == one_by_one.forecast()
+
+    batched = Forecaster()
+    for batch in np.array_split(np.arange(len(times)), 9):
+        assert batched.add(times[batch], values[batch])
+    assert batched.forecast() == one_by_one.forecast()
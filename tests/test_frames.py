@@ -0,0 +1,68 @@
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+import streamlit as st
+
+from conftest import reading
+from views import common
+
+
+@pytest.fixture
+def session(sqlite_store, monkeypatch):
+    # cached_frame finds the store in session state, as in a rerun.
+    monkeypatch.setattr(st, "session_state", SimpleNamespace(store=sqlite_store))
+    return sqlite_store
+
+
+def test_cached_frame_follows_appends(session):
+    for minutes in range(50, 0, -10):
+        session.append("bg_readings", reading(minutes))
+    assert list(common.cached_frame("bg_readings").index) == [1, 2, 3, 4, 5]
+    session.append("bg_readings", reading(0))
+    assert list(common.cached_frame("bg_readings").index) == [1, 2, 3, 4, 5, 6]
+
+
+def test_cached_frame_append_between_version_and_rows(session, monkeypatch):
+    # Another session submits a reading after this one has read the
+    # version but before it reads the rows.
+    for minutes in range(60, 0, -10):
+        session.append("bg_readings", reading(minutes))
+    common.cached_frame("bg_readings")
+    session.append("bg_readings", reading(5))
+
+    since = session.since
+
+    def since_after_another_append(*args, **kwargs):
+        monkeypatch.setattr(session, "since", since)
+        session.append("bg_readings", reading(1))
+        return since(*args, **kwargs)
+
+    monkeypatch.setattr(session, "since", since_after_another_append)
+    assert list(common.cached_frame("bg_readings").index) == [1, 2, 3, 4, 5, 6, 7]
+    assert list(common.cached_frame("bg_readings").index) == [1, 2, 3, 4, 5, 6, 7, 8]
+
+
+def test_insight_report_follows_the_hot_window(session, monkeypatch):
+    for minutes in range(50, 0, -10):
+        session.append("bg_readings", reading(minutes))
+    df = common.bg_df()
+    report = common.insight_report(df)
+    assert common.insight_report(df) is report
+    # A month leaves the window with no new entry.
+    later = common.hot_start() + timedelta(days=31)
+    monkeypatch.setattr(common, "hot_start", lambda: later)
+    assert common.insight_report(df) is not report
+    # The whole-history fallback isn't the hot frame's report either.
+    report = common.insight_report(df)
+    assert common.insight_report(df.iloc[1:]) is not report
+
+
+def test_response_summaries_follow_the_hot_window(session, monkeypatch):
+    session.append("bg_readings", reading(10))
+    df = common.bg_df()
+    summaries = common.response_summaries(df)
+    assert common.response_summaries(df) is summaries
+    later = common.hot_start() + timedelta(days=31)
+    monkeypatch.setattr(common, "hot_start", lambda: later)
+    assert common.response_summaries(df) is not summaries
@@ -0,0 +1,75 @@
+import io
+import time
+import warnings
+
+import pytest
+
+from importer import import_readings
+from storage import open_store
+
+ROWS = [
+    ("2026-09-01 08:00:30", "6.5"),
+    ("2026-09-01 08:05:00", "7.1"),
+    ("2026-09-01 08:00:30", "6.5"),  # again in the same chunk
+    ("2026-09-02 09:00:00", "5.0"),
+    ("2026-09-01 08:05:00", "7.1"),  # again in a later chunk
+    ("2026-09-03 10:00:00", "x"),
+]
+
+
+def csv_file(rows):
+    lines = ["Time,Glucose mmol/L"] + [f"{time},{value}" for time, value in rows]
+    return io.BytesIO("\n".join(lines).encode())
+
+
+def run_import(store, rows, chunk_rows=2):
+    for progress in import_readings(
+        store, csv_file(rows), "Time", "Glucose mmol/L", "mmol/L", chunk_rows=chunk_rows
+    ):
+        pass
+    return progress
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = open_store(request.param, str(tmp_path / "alera.db"))
+    yield store
+    store.close()
+
+
+def test_duplicates_skipped_within_and_across_chunks(store):
+    progress = run_import(store, ROWS)
+    assert (progress.added, progress.duplicates, progress.unreadable) == (3, 2, 1)
+    times = [record["time"] for record in store.tail("bg_readings", 10)]
+    assert times == ["2026-09-01T08:00:30", "2026-09-01T08:05:00", "2026-09-02T09:00:00"]
+
+
+def test_reimport_adds_only_new_readings(store):
+    run_import(store, ROWS[:4])
+    progress = run_import(store, ROWS + [("2026-09-02 09:00:00", "5.4")], chunk_rows=3)
+    assert (progress.added, progress.duplicates) == (1, 5)
+    assert len(store.tail("bg_readings", 10)) == 4
+
+
+@pytest.fixture
+def berlin(monkeypatch):
+    monkeypatch.setenv("TZ", "Europe/Berlin")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_utc_offsets_become_local_time(store, berlin):
+    store.append("bg_readings", {"time": "2026-06-01T10:00:00", "value": 6.5, "context": "Fasting", "notes": ""})
+    rows = [
+        ("2026-06-01T08:00:00Z", "6.5"),  # the reading above
+        ("2026-06-01T10:30:00+01:00", "7.0"),
+        ("2026-01-15T12:00:00.000Z", "5.0"),  # winter: one hour ahead
+    ]
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        progress = run_import(store, rows, chunk_rows=10)
+    assert (progress.added, progress.duplicates) == (2, 1)
+    times = sorted(record["time"] for record in store.tail("bg_readings", 10))
+    assert times == ["2026-01-15T13:00:00", "2026-06-01T10:00:00", "2026-06-01T11:30:00"]
@@ -0,0 +1,47 @@
+import os
+
+import metrics
+from metrics import MetricsRegistry, RerunMetrics
+
+
+def test_nested_sections_roll_up_into_the_page():
+    rerun = RerunMetrics(page="Dashboard")
+    with rerun.section("page"):
+        rerun.count(rows=1)
+        for _ in range(2):
+            with rerun.section("frame"):
+                rerun.count(rows=10, cache_hits=1)
+    rerun.count(rows=100)  # outside every section: not counted
+    page, frame = rerun.sections["page"], rerun.sections["frame"]
+    assert (page.calls, page.rows, page.cache_hits) == (1, 21, 2)
+    assert (frame.calls, frame.rows, frame.cache_hits) == (2, 20, 2)
+    assert page.seconds >= frame.seconds
+
+
+def test_prometheus_file_is_replaced_at_most_every_interval(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(metrics.time, "monotonic", lambda: clock[0])
+    registry, path = MetricsRegistry(), str(tmp_path / "alera.prom")
+    renamed = []
+    replace = os.replace
+    monkeypatch.setattr(metrics.os, "replace", lambda src, dst: (renamed.append((src, dst)), replace(src, dst)))
+    rerun = RerunMetrics(page="Dashboard")
+    with rerun.section("banner"):
+        rerun.count(rows=1)
+    registry.record(rerun.finish())
+
+    registry.write(path)
+    text = open(path).read()
+    assert 'alera_reruns_total{page="Dashboard"} 1' in text
+    assert 'alera_section_rows_total{section="banner"} 1' in text
+
+    registry.record(rerun)
+    clock[0] += metrics.WRITE_INTERVAL / 2
+    registry.write(path)  # too soon: left as it was
+    assert open(path).read() == text
+    clock[0] += metrics.WRITE_INTERVAL
+    registry.write(path)
+    assert 'alera_reruns_total{page="Dashboard"} 2' in open(path).read()
+    # Each write went to a temporary file, renamed over the old one.
+    assert len(renamed) == 2 and all(src != path and dst == path for src, dst in renamed)
+    assert os.listdir(tmp_path) == ["alera.prom"]
@@ -0,0 +1,85 @@
+import sqlite3
+import threading
+
+import pytest
+
+import storage
+from conftest import reading
+from storage import StorePool
+
+
+def test_pool_closes_least_recently_used_idle_store(tmp_path):
+    pool = StorePool(1)
+    paths = [str(tmp_path / f"{name}.db") for name in "abc"]
+    with pool.lease(paths[0]) as a:
+        a.append("bg_readings", reading(10))
+        with pool.lease(paths[1]) as b:
+            # Over the limit, but both are in use.
+            assert not a.closed and not b.closed
+            b.append("bg_readings", reading(5))
+        assert a.tail("bg_readings", 10)
+    with pool.lease(paths[2]) as c:
+        # a and b were idle: the older one goes first, then the other.
+        assert a.closed and b.closed and not c.closed
+    with pool.lease(paths[0]) as reopened:
+        assert reopened is not a
+        assert len(reopened.tail("bg_readings", 10)) == 1
+    with pool.lease(paths[1]) as reopened:
+        assert len(reopened.tail("bg_readings", 10)) == 1
+
+
+def test_closed_store_refuses_reads_and_writes(sqlite_store):
+    sqlite_store.append("bg_readings", reading(10))
+    sqlite_store.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        sqlite_store.append("bg_readings", reading(5))
+    with pytest.raises(sqlite3.ProgrammingError):
+        sqlite_store.append_many("bg_readings", [])
+    with pytest.raises(sqlite3.ProgrammingError):
+        sqlite_store.latest("bg_readings")
+    with pytest.raises(sqlite3.ProgrammingError):
+        sqlite_store.tail("bg_readings", 10)
+
+
+def test_pool_keeps_stores_with_set_aside_entries(tmp_path):
+    pool = StorePool(1)
+    with pool.lease(str(tmp_path / "a.db")) as a:
+        a.failed.append(("bg_readings", reading(10), "OSError: disk full"))
+    with pool.lease(str(tmp_path / "b.db")):
+        assert not a.closed
+
+
+def test_opening_and_closing_leave_other_files_free(tmp_path, monkeypatch):
+    pool = StorePool(1)
+    slow, other = str(tmp_path / "slow.db"), str(tmp_path / "other.db")
+    opening, release = threading.Event(), threading.Event()
+
+    class SlowStore(storage.SQLiteStore):
+        def __init__(self, path, *args, **kwargs):
+            if path == slow:
+                opening.set()
+                assert release.wait(5)
+            super().__init__(path, *args, **kwargs)
+
+        def close(self):
+            # Evicted stores are closed outside the pool's lock.
+            assert not pool.lock.locked()
+            super().close()
+
+    monkeypatch.setattr(storage, "SQLiteStore", SlowStore)
+
+    def lease_slow():
+        with pool.lease(slow):
+            pass
+
+    thread = threading.Thread(target=lease_slow)
+    thread.start()
+    assert opening.wait(5)
+    # The slow file is still opening; another file's lease doesn't wait.
+    with pool.lease(other) as store:
+        assert store.tail("bg_readings", 1) == []
+    release.set()
+    thread.join(5)
+    assert not thread.is_alive()
+    # Opening slow.db evicted other.db.
+    assert list(pool.stores) == [slow] and store.closed
@@ -0,0 +1,152 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import storage
+from storage import FILTER_COLUMNS, LOG_COLUMNS, MemoryStore, SQLiteStore
+
+NOW = datetime.now().replace(microsecond=0)
+START = NOW - timedelta(days=400)
+# Not on a day or hour boundary, so windows cut through days and segments.
+MID = NOW - timedelta(days=200, hours=5, minutes=17)
+WHERE = {"bg_readings": "Fasting", "med_logs": True, "activity_logs": "Hard"}
+
+
+def history():
+    # About 400 days of every log, at irregular intervals.
+    rng = random.Random(1)
+    rows = {log_name: [] for log_name in LOG_COLUMNS}
+    time = START
+    while time < NOW:
+        stamp = time.isoformat()
+        rows["bg_readings"].append(
+            (stamp, round(rng.uniform(2, 20), 1), rng.choice(["Fasting", "Before meal", "After meal"]), "")
+        )
+        if rng.random() < 0.05:
+            rows["med_logs"].append((stamp, "Insulin", "4u", rng.random() < 0.8))
+            rows["meal_logs"].append((stamp, "Lunch", rng.choice([None, 40])))
+            rows["activity_logs"].append((stamp, "Walk", rng.choice([None, 30]), rng.choice(["Light", "Hard"])))
+        time += timedelta(minutes=rng.randint(30, 200))
+    return rows
+
+
+def snapshot(store):
+    # Everything the pages and reports read, over windows reaching into
+    # the archive, across its boundary and within the hot window.
+    out = {}
+    lo, hi = START - timedelta(days=1), NOW + timedelta(days=1)
+    for log_name in LOG_COLUMNS:
+        out[log_name, "version"] = store.version(log_name)
+        out[log_name, "since"] = store.since(log_name, 0)
+        out[log_name, "since version"] = store.since(log_name, 50)
+        out[log_name, "since start"] = store.since(log_name, 0, MID)
+        out[log_name, "between"] = store.between(log_name, MID - timedelta(days=40), MID)
+        out[log_name, "count"] = store.count(log_name, MID - timedelta(days=40, hours=3), MID)
+        out[log_name, "count all"] = store.count(log_name, lo, hi)
+        out[log_name, "tail"] = store.tail(log_name, 40)
+        out[log_name, "tail all"] = store.tail(log_name, 10 ** 6)
+        out[log_name, "earliest"] = store.earliest(log_name)
+        out[log_name, "latest"] = store.latest(log_name)
+        out[log_name, "chunks"] = [[record["id"] for record in chunk] for chunk in store.chunks(log_name, lo, hi, 333)]
+        pages, before = [], None
+        while True:
+            page = store.page(log_name, lo, hi, 97, before=before)
+            if not page:
+                break
+            pages.append([record["id"] for record in page])
+            before = (page[-1]["time"], page[-1]["id"])
+        out[log_name, "pages"] = pages
+        if log_name in FILTER_COLUMNS:
+            out[log_name, "page where"] = store.page(
+                log_name, MID - timedelta(days=100), MID, 50, where=WHERE[log_name]
+            )
+    windows = [
+        (None, None),
+        (MID, None),
+        (MID - timedelta(days=3, hours=2), MID),
+        (MID.replace(hour=0, minute=0, second=0), MID + timedelta(days=9)),
+        (MID, MID + timedelta(hours=3)),
+        (NOW - timedelta(days=14), None),
+    ]
+    for start, end in windows:
+        out["time in range", start, end] = store.time_in_range(start, end)
+    out["daily"] = store.daily()
+    return out
+
+
+def assert_same(memory, sqlite):
+    expected, found = snapshot(memory), snapshot(sqlite)
+    assert [key for key in expected if expected[key] != found[key]] == []
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    # The SQLite store keeps 90 days in its tables and archives the rest.
+    monkeypatch.setattr(storage, "HOT_DAYS", 90)
+    memory, sqlite = MemoryStore(), SQLiteStore(str(tmp_path / "alera.db"), write_behind=False)
+    for log_name, rows in history().items():
+        memory.append_many(log_name, rows)
+        sqlite.append_many(log_name, rows)
+    sqlite.compact()
+    assert sqlite.segments["bg_readings"]
+    yield memory, sqlite
+    sqlite.close()
+
+
+def test_archived_store_matches_memory(stores):
+    assert_same(*stores)
+
+
+def test_back_dated_entries_match(stores):
+    memory, sqlite = stores
+    old = (NOW - timedelta(days=300)).isoformat()
+    for store in stores:
+        store.append("bg_readings", {"time": old, "value": 3.1, "context": "Fasting", "notes": "late"})
+        store.append_many("meal_logs", [(old, "Snack", 10)])
+        store.append_many("med_logs", [(old, "Insulin", "2u", True), (old, "Insulin", "2u", False)])
+    assert_same(memory, sqlite)
+
+
+def test_column_batches_match(stores):
+    # As the importer writes them: times as datetime64, one context for the
+    # batch, and back-dated readings among recent ones.
+    memory, sqlite = stores
+    times = [NOW - timedelta(days=300, minutes=7), NOW, NOW - timedelta(days=300)]
+    columns = {
+        "time": np.array(times, dtype="datetime64[s]"),
+        "value": np.array([3.1, 12.4, 5.5]),
+        "context": "Imported",
+        "notes": "",
+    }
+    for store in stores:
+        store.append_columns("bg_readings", columns)
+    assert_same(memory, sqlite)
+    assert memory.tail("bg_readings", 1)[0]["context"] == "Imported"
+
+
+def test_reading_arrays_match_records(stores):
+    for store in stores:
+        times, values = store.reading_arrays(MID - timedelta(days=150), NOW)
+        records = store.between("bg_readings", MID - timedelta(days=150), NOW)
+        assert times.astype("datetime64[ns]").astype("datetime64[us]").tolist() == [datetime.fromisoformat(r["time"]) for r in records]
+        assert values.tolist() == [record["value"] for record in records]
+
+
+def test_threshold_change_matches(stores):
+    memory, sqlite = stores
+    for store in stores:
+        settings = dict(store.settings)
+        settings["target_max"] = 8.0
+        settings["hypo_threshold"] = 4.5
+        store.save_settings(settings)
+    assert_same(memory, sqlite)
+
+
+def test_reopened_store_matches(stores, tmp_path):
+    memory, sqlite = stores
+    sqlite.close()
+    reopened = SQLiteStore(str(tmp_path / "alera.db"), write_behind=False)
+    assert_same(memory, reopened)
+    reopened.close()
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from storage import DEFAULT_SETTINGS
+from tir import TirIndex, class_flags, classify
+
+NS_PER_HOUR = 3_600_000_000_000
+
+
+def brute_force(times, values, settings, lo, hi):
+    # The counts TirIndex.window must give, from a scan of every reading.
+    inside = np.ones(len(times), dtype=bool)
+    if lo is not None:
+        inside &= times >= lo
+    if hi is not None:
+        inside &= times < hi
+    flags = class_flags(classify(values[inside], settings))
+    return {"count": int(inside.sum()), **{flag: int(found.sum()) for flag, found in flags.items()}}
+
+
+def windows(times):
+    rng = np.random.default_rng(3)
+    picks = rng.choice(times, 20)
+    yield None, None
+    yield int(times.min()), None
+    yield None, int(np.median(times))
+    yield int(times.max()) + 1, None  # empty
+    yield int(np.median(times)), int(times.min())  # reversed: empty
+    for lo, hi in zip(picks[::2], picks[1::2]):
+        yield int(min(lo, hi)), int(max(lo, hi))
+
+
+def assert_windows(index, times, values, settings):
+    for lo, hi in windows(times):
+        assert index.window(lo, hi) == brute_force(times, values, settings, lo, hi), (lo, hi)
+
+
+@pytest.fixture
+def readings():
+    rng = np.random.default_rng(1)
+    times = np.sort(rng.integers(0, 2000, 500)) * NS_PER_HOUR
+    values = np.round(rng.uniform(2, 20, 500), 1).astype(np.float32)
+    return times, values
+
+
+def test_appended_batches(readings):
+    times, values = readings
+    index = TirIndex(DEFAULT_SETTINGS)
+    for batch in np.array_split(np.arange(len(times)), 7):
+        index.add(times[batch], values[batch])
+    assert len(index) == len(times)
+    assert_windows(index, times, values, DEFAULT_SETTINGS)
+
+
+def test_back_dated_merges(readings):
+    times, values = readings
+    index = TirIndex(DEFAULT_SETTINGS)
+    recent = times >= times[300]
+    index.add(times[recent], values[recent])
+    # Older readings in several unsorted batches, some at times already indexed.
+    older = np.flatnonzero(~recent)[::-1]
+    for batch in np.array_split(older, 4):
+        index.add(times[batch], values[batch])
+    duplicate = np.array([times[320]]), np.array([3.0], dtype=np.float32)
+    index.add(*duplicate)
+    times = np.concatenate([times, duplicate[0]])
+    values = np.concatenate([values, duplicate[1]])
+    assert len(index) == len(times)
+    assert_windows(index, times, values, DEFAULT_SETTINGS)
+
+
+def test_reclassify(readings):
+    times, values = readings
+    index = TirIndex(DEFAULT_SETTINGS)
+    index.add(times, values)
+    settings = {**DEFAULT_SETTINGS, "target_min": 5.0, "target_max": 9.0, "hypo_threshold": 4.5}
+    index.reclassify(settings)
+    assert_windows(index, times, values, settings)
+    # Values exactly on a threshold count as in range, at the stored precision.
+    index = TirIndex(settings)
+    edge = np.array([5.0, 9.0, 4.5, 4.4], dtype=np.float32)
+    index.add(np.arange(4) * NS_PER_HOUR, edge)
+    assert index.window() == {"count": 4, "in_range": 2, "low": 1, "high": 0}
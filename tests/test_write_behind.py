@@ -0,0 +1,77 @@
+import threading
+
+import storage
+from conftest import reading
+from storage import SQLiteStore, WRITE_ATTEMPTS
+
+
+def read_until_written(store):
+    # Reads never raise while the failing batch is retried; after
+    # WRITE_ATTEMPTS tries (some maybe by the writer) it is split up.
+    for _ in range(WRITE_ATTEMPTS):
+        records = store.tail("bg_readings", 10)
+    return records
+
+
+def test_flush_writes_queued_entries(tmp_path):
+    path = str(tmp_path / "alera.db")
+    store = SQLiteStore(path)
+    for minutes in range(30, 0, -10):
+        store.append("bg_readings", reading(minutes))
+    store.flush()
+    assert store.write_stats()["queued"] == 0
+    assert store.write_stats()["rows"] == 3
+    store.close()
+    assert not store.writer.is_alive()
+    reopened = SQLiteStore(path, write_behind=False)
+    assert [record["id"] for record in reopened.tail("bg_readings", 10)] == [1, 2, 3]
+    reopened.close()
+
+
+def test_failing_entry_is_set_aside(sqlite_store, monkeypatch):
+    sqlite_store.compact()
+
+    def broken(*args, **kwargs):
+        raise OSError("disk full")
+
+    # Only the back-dated reading goes to the archive.
+    monkeypatch.setattr(storage, "write_segment", broken)
+    sqlite_store.append("bg_readings", reading(20, 5.5))
+    sqlite_store.append("bg_readings", reading(200 * 24 * 60, 7.0))
+    sqlite_store.append("bg_readings", reading(10, 6.0))
+
+    records = read_until_written(sqlite_store)
+    assert [record["value"] for record in records] == [5.5, 6.0]
+    assert sqlite_store.tail("bg_readings", 10) == records
+    failed = sqlite_store.failed_writes()
+    assert [(entry["log"], entry["value"]) for entry in failed] == [("bg_readings", 7.0)]
+    assert "disk full" in failed[0]["error"]
+    assert sqlite_store.write_stats()["failed"] == 1
+    assert sqlite_store.latest("bg_readings")["value"] == 6.0
+    assert sqlite_store.writer.is_alive()
+
+    monkeypatch.undo()
+    assert sqlite_store.retry_failed() == 0
+    assert sqlite_store.failed_writes() == []
+    assert [record["value"] for record in sqlite_store.tail("bg_readings", 10)] == [7.0, 5.5, 6.0]
+
+
+def test_writer_survives_errors(sqlite_store, monkeypatch):
+    # Not an sqlite3.Error, like a pyarrow error from archiving.
+    called = threading.Event()
+
+    def broken():
+        called.set()
+        raise ValueError("bad segment")
+
+    monkeypatch.setattr(sqlite_store, "compact", broken)
+    for _ in range(2):
+        called.clear()
+        sqlite_store.wake.set()
+        assert called.wait(5)
+    called.clear()
+    sqlite_store.append("bg_readings", reading(10))
+    sqlite_store.wake.set()
+    assert called.wait(5)
+    assert sqlite_store.writer.is_alive()
+    assert sqlite_store.write_stats()["rows"] == 1
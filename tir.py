@@ -0,0 +1,99 @@
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from columnar import FLOAT_DECIMALS, Column
+
+# ---------- CLASSES ----------
+# Every reading is stored with its class against the thresholds in
+# settings, so pages read the class instead of comparing values again.
+# "below target" only occurs when the hypo threshold is set under
+# target_min; "low" and "very high" are what the safety banner alerts on.
+CLASSES = ["low", "below target", "in range", "high", "very high"]
+LOW, BELOW_TARGET, IN_RANGE, HIGH, VERY_HIGH = range(len(CLASSES))
+
+TIR_FLAGS = ["in_range", "low", "high"]
+
+
+def classify(values: np.ndarray, settings: Dict[str, Any]) -> np.ndarray:
+    # Class codes for `values`, in one vectorised pass. Readings are
+    # compared at FLOAT_DECIMALS, so a float32 10.1 is in range against a
+    # 10.1 target. CLASSIFY_SQL in storage.py mirrors this.
+    values = np.round(np.asarray(values, dtype=np.float64), FLOAT_DECIMALS)
+    codes = np.full(len(values), BELOW_TARGET, dtype=np.int8)
+    codes[values >= settings["target_min"]] = IN_RANGE
+    codes[values > settings["target_max"]] = HIGH
+    codes[values > settings["hyper_threshold"]] = VERY_HIGH
+    codes[values < settings["hypo_threshold"]] = LOW
+    return codes
+
+
+def class_flags(codes: np.ndarray) -> Dict[str, np.ndarray]:
+    # The counts the rollups, the time-in-range index and insights report.
+    return {"in_range": codes == IN_RANGE, "low": codes == LOW, "high": codes == VERY_HIGH}
+
+
+# ---------- INDEX ----------
+class TirIndex:
+    # Readings in (time, id) order with running totals of each flag:
+    # totals[flag][k] is how many of the first k readings have it. The
+    # counts for any window are then the difference of two totals, found
+    # by two binary searches on time, however long the window.
+    #
+    # Readings newer than everything indexed are appended in O(k); a
+    # back-dated batch is merged in and the totals recomputed from there,
+    # and new thresholds recompute them all in one pass.
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = dict(settings)
+        self.times = Column(np.int64)
+        self.values = Column(np.float32)
+        self.totals = {flag: Column(np.int32) for flag in TIR_FLAGS}
+        for column in self.totals.values():
+            column.extend(np.zeros(1, dtype=np.int32))
+
+    def __len__(self) -> int:
+        return self.times.size
+
+    def add(self, times: np.ndarray, values: np.ndarray):
+        # `times` in epoch ns, in insertion order.
+        if not len(times):
+            return
+        order = np.argsort(times, kind="stable")
+        times, values = times[order], values[order]
+        known = self.times.view()
+        if not len(known) or times[0] >= known[-1]:
+            self.times.extend(times)
+            self.values.extend(values)
+            self._total(len(known))
+            return
+        # After any equal times, since the new readings have higher ids.
+        at = np.searchsorted(known, times, side="right")
+        merged_times = np.insert(known, at, times)
+        merged_values = np.insert(self.values.view(), at, values)
+        self.times, self.values = Column(np.int64), Column(np.float32)
+        self.times.extend(merged_times)
+        self.values.extend(merged_values)
+        self._total(int(at[0]))
+
+    def reclassify(self, settings: Dict[str, Any]):
+        self.settings = dict(settings)
+        self._total(0)
+
+    def _total(self, start: int):
+        # Recomputes the totals for readings from position `start` on.
+        flags = class_flags(classify(self.values.view(start), self.settings))
+        for flag, column in self.totals.items():
+            running = np.cumsum(flags[flag], dtype=np.int64) + column.data[start]
+            column.size = start + 1
+            column.extend(running.astype(np.int32))
+
+    def window(self, lo: Optional[int] = None, hi: Optional[int] = None) -> Dict[str, int]:
+        # Counts for lo <= time < hi (epoch ns); None leaves that side open.
+        times = self.times.view()
+        a = 0 if lo is None else int(np.searchsorted(times, lo, side="left"))
+        b = len(times) if hi is None else int(np.searchsorted(times, hi, side="left"))
+        b = max(a, b)
+        counts = {"count": b - a}
+        for flag, column in self.totals.items():
+            counts[flag] = int(column.data[b] - column.data[a])
+        return counts
@@ -0,0 +1,15 @@
+# Navigation label -> (module in this package, page function). The router
+# in app.py imports a module the first time its page is shown.
+PAGES = {
+    "Dashboard": ("dashboard", "page_dashboard"),
+    "Log blood glucose": ("log_bg", "page_log_bg"),
+    "Import readings": ("import_readings", "page_import"),
+    "Medication": ("medication", "page_meds"),
+    "Food": ("food", "page_food"),
+    "Activity": ("activity", "page_activity"),
+    "Insights": ("insights", "page_insights"),
+    "Export": ("export", "page_export"),
+    "Education & coping": ("education", "page_education"),
+    "Settings": ("settings", "page_settings"),
+    "Diagnostics": ("diagnostics", "page_diagnostics"),
+}
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import streamlit as st
+
+from metrics import timed
+from storage import Store
+from views.common import history_browser
+
+INTENSITIES = ["Light", "Moderate", "Intense"]
+
+
+@timed()
+def page_activity():
+    store: Store = st.session_state.store
+
+    st.title("🏃 Activity")
+
+    with st.form("activity_form", clear_on_submit=True):
+        type_ = st.text_input(
+            "Activity type",
+            placeholder="e.g. walking, football, gym",
+        )
+        cols = st.columns(2)
+        with cols[0]:
+            duration = st.number_input(
+                "Duration (minutes)", min_value=0, step=5
+            )
+        with cols[1]:
+            intensity = st.selectbox("Intensity", INTENSITIES)
+
+        # Date + time instead of st.datetime_input
+        date_input = st.date_input("Date (activity)", value=datetime.now().date())
+        time_input = st.time_input("Time (activity)", value=datetime.now().time())
+        time = datetime.combine(date_input, time_input)
+
+        submitted = st.form_submit_button("Save activity")
+        if submitted:
+            if not type_.strip():
+                st.error("Please enter an activity.")
+            else:
+                store.append(
+                    "activity_logs",
+                    {
+                        "time": time.isoformat(),
+                        "type": type_.strip(),
+                        "duration": int(duration),
+                        "intensity": intensity,
+                    }
+                )
+                st.success("Saved activity ✅")
+
+    st.markdown("### History")
+    history_browser(
+        "activity_logs",
+        "activity_history",
+        filters={level: level for level in INTENSITIES},
+        empty="No activity logged for these dates.",
+    )
@@ -0,0 +1,305 @@
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional
+
+import pandas as pd
+import streamlit as st
+
+from cache import shared_cache
+from charts import downsample, window
+from insights import InsightReport, build_report
+from metrics import count, timed
+from responses import activity_responses, meal_responses
+from storage import DERIVED_COLUMNS, FILTER_COLUMNS, THRESHOLD_KEYS, Store, hot_start, stored_columns
+from tir import CLASSES, classify
+
+# Helpers shared by the pages that work with whole logs. Importing this
+# module pulls in pandas and the analytics code, so light pages don't.
+
+# ---------- DATAFRAMES ----------
+def records_frame(log_name: str, records: List[Dict[str, Any]]) -> pd.DataFrame:
+    columns = stored_columns(log_name)
+    if not records:
+        df = pd.DataFrame(columns=columns)
+    else:
+        df = pd.DataFrame(records, columns=["id"] + columns).set_index("id")
+        df.index.name = None
+        df["time"] = pd.to_datetime(df["time"], errors="coerce")
+    for name, categories in DERIVED_COLUMNS.get(log_name, {}).items():
+        df[name] = pd.Categorical(df[name], categories=categories)
+    return df
+
+
+def cached_frame(log_name: str) -> pd.DataFrame:
+    # The log's hot window: entries from hot_start() on, which is all the
+    # pages keep in memory (history_frame reaches further back).
+    # Stores only ever append, so the newest entry id is the frame's version:
+    # only entries added since the last build are parsed, and the sorted
+    # frame is reused as-is when nothing changed. Readings' stored classes
+    # also depend on the thresholds the frame was built under. Frames live
+    # in the process-wide cache, so every session on the same store shares
+    # one copy and only the first to see a new version builds it.
+    store: Store = st.session_state.store
+    cache = shared_cache()
+    key = (store.cache_key, log_name)
+    version = store.version(log_name)
+    thresholds = tuple(store.settings[k] for k in THRESHOLD_KEYS)
+    start = hot_start()
+    df = cache.get(key, (version, thresholds, start))
+    if df is not None:
+        count(cache_hits=1)
+        return df
+    built = cache.latest(key)
+
+    if store.columnar:
+        # Columnar stores keep each log in time order and hand it out as
+        # views over their arrays, so there is nothing to merge.
+        seen = built[0][0] if built is not None and built[0][0] < version else 0
+        count(rows=version - seen)
+        df = store.frame(log_name)
+        df = window(df, pd.Timestamp(start), pd.Timestamp.max)
+    else:
+        if built is None or built[0][0] > version or built[0][2] > start:
+            seen, df = 0, None
+        else:
+            (seen, built_thresholds, built_start), df = built
+            if built_start != start:
+                # A month left the window since the frame was built.
+                df = window(df, pd.Timestamp(start), pd.Timestamp.max)
+            if built_thresholds != thresholds and "status" in df:
+                # The store reclassified every reading; do the same here in
+                # one pass rather than reading the whole log again.
+                codes = classify(df["value"].to_numpy(), store.settings)
+                df = df.assign(status=pd.Categorical.from_codes(codes, CLASSES))
+        # Only entries up to `version`: since() first writes anything queued
+        # after version() was read, e.g. by another session, and the frame
+        # must hold exactly what its version says or the next build would
+        # add those entries again.
+        records = [record for record in store.since(log_name, seen, start) if record["id"] <= version]
+        new = records_frame(log_name, records)
+        count(rows=len(new))
+        new = new.sort_values("time", kind="stable")
+        if df is None or df.empty:
+            df = new
+        elif new.empty:
+            pass
+        elif new["time"].iloc[0] >= df["time"].iloc[-1]:
+            df = pd.concat([df, new])
+        else:
+            # Back-dated entry: merge the new rows into the sorted history.
+            # A stable sort of an almost-sorted frame is linear here.
+            df = pd.concat([df, new]).sort_values("time", kind="stable")
+
+    cache.put(key, (version, thresholds, start), df)
+    return df
+
+
+def history_frame(log_name: str, start: Optional[datetime] = None) -> pd.DataFrame:
+    # The log from `start` (or its first entry) on, for the few places that
+    # look past the hot window. Older entries are read from the store's
+    # archive on each new version and cached alongside the hot frame.
+    store: Store = st.session_state.store
+    hot = cached_frame(log_name)
+    boundary = hot_start()
+    if start is not None and start >= boundary:
+        return window(hot, pd.Timestamp(start), pd.Timestamp.max)
+    if store.columnar:
+        df = store.frame(log_name)
+        return df if start is None else window(df, pd.Timestamp(start), pd.Timestamp.max)
+    cache = shared_cache()
+    key = (store.cache_key, log_name, "history")
+    version = (
+        store.version(log_name),
+        tuple(store.settings[k] for k in THRESHOLD_KEYS),
+        boundary,
+        start,
+    )
+    df = cache.get(key, version)
+    if df is None:
+        older = records_frame(log_name, store.between(log_name, start or datetime.min, boundary))
+        count(rows=len(older))
+        df = pd.concat([older, hot]) if not older.empty else hot
+        cache.put(key, version, df)
+    else:
+        count(cache_hits=1)
+    return df
+
+
+def first_date(log_name: str) -> Optional[date]:
+    # The date of the log's first entry, which may be in the archive.
+    store: Store = st.session_state.store
+    cache = shared_cache()
+    key = (store.cache_key, log_name, "first")
+    version = store.version(log_name)
+    found = cache.get(key, version)
+    if found is None:
+        earliest = store.earliest(log_name)
+        found = (datetime.fromisoformat(earliest["time"]).date() if earliest else None,)
+        cache.put(key, version, found)
+    return found[0]
+
+
+@timed()
+def bg_df() -> pd.DataFrame:
+    return cached_frame("bg_readings")
+
+
+@timed()
+def med_df() -> pd.DataFrame:
+    return cached_frame("med_logs")
+
+
+@timed()
+def meal_df() -> pd.DataFrame:
+    return cached_frame("meal_logs")
+
+
+@timed()
+def activity_df() -> pd.DataFrame:
+    return cached_frame("activity_logs")
+
+
+@timed()
+def insight_report(df: pd.DataFrame) -> InsightReport:
+    # Reports are cached per (store, data version, thresholds, window), so
+    # reruns of the Insights page - in any session on the same store - reuse
+    # the last report until a reading or a threshold changes, a month leaves
+    # the hot window, or the page falls back to the whole history (a frame
+    # of a different length).
+    store: Store = st.session_state.store
+    cache = shared_cache()
+    key = (store.cache_key, "insight_report")
+    version = (
+        store.version("bg_readings"),
+        tuple(store.settings[k] for k in THRESHOLD_KEYS),
+        hot_start(),
+        len(df),
+    )
+    report = cache.get(key, version)
+    if report is None:
+        report = build_report(df, store.settings)
+        cache.put(key, version, report)
+    else:
+        count(cache_hits=1)
+    return report
+
+
+@timed()
+def response_summaries(df: pd.DataFrame):
+    # Meal and activity responses, cached per version of the three logs and,
+    # like insight_report, the window and length of `df`.
+    store: Store = st.session_state.store
+    cache = shared_cache()
+    key = (store.cache_key, "response_summaries")
+    versions = tuple(store.version(name) for name in ("bg_readings", "meal_logs", "activity_logs"))
+    version = (*versions, hot_start(), len(df))
+    summaries = cache.get(key, version)
+    if summaries is None:
+        summaries = (meal_responses(df, meal_df()), activity_responses(df, activity_df()))
+        cache.put(key, version, summaries)
+    else:
+        count(cache_hits=1)
+    return summaries
+
+
+# ---------- CHARTS ----------
+@timed()
+def trend_chart(df: pd.DataFrame, key: str):
+    # The chart never gets more than `chart_points` points: the selected
+    # date range is cut out of the sorted frame and downsampled, so zooming
+    # in shows finer detail while the payload stays the same size. It opens
+    # on the hot window `df`; picking earlier dates reads the archive.
+    settings = st.session_state.settings
+    first, last = df["time"].min().date(), df["time"].max().date()
+    oldest = first_date("bg_readings") or first
+    picked = st.date_input(
+        "Date range",
+        value=(first, last),
+        min_value=min(oldest, first),
+        max_value=last,
+        key=key,
+    )
+    start, end = picked if len(picked) == 2 else (first, last)
+    if start < first:
+        df = history_frame("bg_readings", datetime.combine(start, datetime.min.time()))
+    shown = window(df, pd.Timestamp(start), pd.Timestamp(end) + pd.Timedelta(days=1))
+    budget = int(settings["chart_points"])
+    points = downsample(shown, budget)
+    st.line_chart(points.set_index("time")[["value"]])
+    if len(points) < len(shown):
+        st.caption(
+            f"Showing the shape of {len(shown):,} readings with {len(points):,} points. "
+            "Pick a shorter date range to see more detail."
+        )
+
+
+# ---------- HISTORY ----------
+def history_browser(log_name: str, key: str, filters: Optional[Dict[str, Any]] = None, empty: str = ""):
+    # A page of entries at a time, newest first, for a date range and an
+    # optional filter on the log's FILTER_COLUMNS column (label -> value).
+    # Pages are keyset-paginated: each one is fetched by an index seek from
+    # the last entry of the page before, so page 50 costs the same as page 1
+    # however long the history is.
+    store: Store = st.session_state.store
+    today = datetime.now().date()
+
+    default = (today - timedelta(days=30), today)
+
+    cols = st.columns(3)
+    with cols[0]:
+        picked = st.date_input("Dates", value=default, key=f"{key}_dates")
+    # One date while the second is still being picked; none once cleared.
+    if len(picked) == 2:
+        start, end = picked
+    elif len(picked) == 1:
+        start = end = picked[0]
+    else:
+        start, end = default
+    where = None
+    if filters:
+        with cols[1]:
+            label = FILTER_COLUMNS[log_name].capitalize()
+            choice = st.selectbox(label, ["All", *filters], key=f"{key}_filter")
+        where = filters.get(choice)
+    with cols[2]:
+        size = st.selectbox("Rows per page", [20, 50, 100], key=f"{key}_size")
+
+    # `cursors` holds the (time, id) each page shown so far started after;
+    # changing the query starts again from the newest entry.
+    query = (start, end, choice if filters else None, size)
+    state = st.session_state.setdefault(key, {"query": query, "cursors": [None]})
+    if state["query"] != query:
+        state.update(query=query, cursors=[None])
+
+    rows = store.page(
+        log_name,
+        datetime.combine(start, datetime.min.time()),
+        datetime.combine(end + timedelta(days=1), datetime.min.time()),
+        size + 1,
+        before=state["cursors"][-1],
+        where=where,
+    )
+    more, rows = len(rows) > size, rows[:size]
+
+    if not rows:
+        st.info(empty or "Nothing logged for these dates.")
+    else:
+        df = records_frame(log_name, rows)
+        df["time"] = df["time"].dt.strftime("%d %b %Y, %H:%M")
+        if "taken" in df:
+            df["taken"] = df["taken"].map({True: "Taken", False: "Missed"})
+        st.dataframe(df, use_container_width=True)
+
+    nav = st.columns([1, 1, 4])
+    nav[0].button(
+        "← Newer",
+        key=f"{key}_newer",
+        disabled=len(state["cursors"]) == 1,
+        on_click=lambda: state["cursors"].pop(),
+    )
+    nav[1].button(
+        "Older →",
+        key=f"{key}_older",
+        disabled=not more,
+        on_click=lambda: state["cursors"].append((rows[-1]["time"], rows[-1]["id"])),
+    )
+    nav[2].caption(f"Page {len(state['cursors'])}")
@@ -0,0 +1,225 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from forecast import HORIZONS
+from metrics import timed
+from storage import Store, empty_rollup
+from tir import CLASSES, LOW, VERY_HIGH, classify
+from views.common import bg_df, history_frame, trend_chart
+
+TIR_WINDOWS = {"24 hours": 1, "7 days": 7, "14 days": 14, "90 days": 90}
+
+# Colour of the latest reading by its stored class.
+STATUS_COLOURS = {
+    "low": "#f59e0b",
+    "below target": "#facc15",
+    "in range": "#22c55e",
+    "high": "#fb923c",
+    "very high": "#ef4444",
+}
+
+
+@timed()
+def forecast_panel(store: Store, settings: Dict[str, Any]):
+    # Projects the smoothed trend of the latest readings; the model is kept
+    # up to date by the store on every write, so this is a lookup.
+    forecast = store.forecast()
+    if forecast is None:
+        st.caption("A short forecast appears here when there are a few readings close together, e.g. from a CGM.")
+        return
+    at = datetime.fromisoformat(forecast["time"])
+    if datetime.now() - at > timedelta(minutes=max(HORIZONS)):
+        st.caption("No forecast – the latest reading is more than an hour old.")
+        return
+
+    predictions = forecast["predictions"]
+    codes = classify(np.array(list(predictions.values())), settings)
+    cols = st.columns(len(predictions))
+    for col, (minutes, value), code in zip(cols, predictions.items(), codes):
+        with col:
+            st.metric(
+                f"In {minutes} min ({at + timedelta(minutes=minutes):%H:%M})",
+                f"{value} mmol/L",
+                help=f"Projected {CLASSES[code]} if the current trend continues.",
+            )
+    direction = "rising" if forecast["rate"] > 0 else "falling" if forecast["rate"] < 0 else "steady"
+    st.caption(
+        f"Trend: {direction} {abs(forecast['rate'])} mmol/L per hour. "
+        "A simple projection of recent readings, not a medical prediction."
+    )
+
+    if LOW in codes:
+        minutes, value = next((m, v) for (m, v), c in zip(predictions.items(), codes) if c == LOW)
+        st.warning(
+            f"Readings are heading low – about **{value} mmol/L** within {minutes} minutes "
+            "if the current trend continues. It may be worth checking with your meter "
+            "and having fast-acting sugar to hand."
+        )
+    elif VERY_HIGH in codes:
+        minutes, value = next((m, v) for (m, v), c in zip(predictions.items(), codes) if c == VERY_HIGH)
+        st.warning(
+            f"Readings are heading high – about **{value} mmol/L** within {minutes} minutes "
+            "if the current trend continues. It may be worth checking again soon."
+        )
+
+
+def tir_metric(label: str, counts: Dict[str, int]):
+    if not counts["count"]:
+        st.metric(label, "–", help="No readings in this window.")
+        return
+    st.metric(
+        label,
+        f"{round(counts['in_range'] / counts['count'] * 100)}%",
+        help=f"{counts['count']} readings · {counts['low']} low · {counts['high']} high",
+    )
+
+
+@timed()
+def page_dashboard():
+    store: Store = st.session_state.store
+    settings = st.session_state.settings
+
+    st.title("📊 Dashboard")
+
+    df_all = bg_df()
+    if df_all.empty:
+        # Nothing in the hot window: chart the older history instead.
+        df_all = history_frame("bg_readings")
+
+    col1, col2 = st.columns([1.2, 1])
+
+    # --- LEFT: Latest + chart ---
+    with col1:
+        st.subheader("Latest reading")
+
+        latest = store.latest("bg_readings")
+
+        if latest is None:
+            st.info("No readings yet – log your first reading on the *Log blood glucose* page.")
+        else:
+            st.markdown(
+                f"""
+                <div style="
+                    padding: 1rem;
+                    border-radius: 1rem;
+                    border: 1px solid rgba(148,163,184,0.5);
+                    background: rgba(15,23,42,0.85);
+                ">
+                  <div style="font-size: 2.2rem; font-weight: 700; color: {STATUS_COLOURS[latest['status']]};">
+                    {latest['value']} <span style="font-size: 1rem; color: #9ca3af;">mmol/L</span>
+                  </div>
+                  <div style="font-size: 0.85rem; color: #9ca3af;">
+                    {datetime.fromisoformat(latest['time']).strftime('%d %b %Y, %H:%M')} · {latest['context']} · {latest['status']}
+                  </div>
+                  <div style="font-size: 0.85rem; color: #9ca3af; margin-top: 0.15rem;">
+                    Target: {settings['target_min']} – {settings['target_max']} mmol/L
+                  </div>
+                  {"<div style='margin-top:0.35rem; font-size:0.85rem; color:#e5e7eb;'>“" + str(latest['notes']) + "”</div>" if latest['notes'] else ""}
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+            forecast_panel(store, settings)
+
+        st.markdown("### Trend over time")
+        if df_all.empty:
+            st.info("Once you add some readings, a chart will appear here.")
+        else:
+            trend_chart(df_all, key="dashboard_range")
+
+    # --- RIGHT: Today & counts ---
+    with col2:
+        st.subheader("Today at a glance")
+
+        # Everything here reads pre-aggregated daily rollups, not the logs.
+        today = datetime.now().date()
+        tomorrow = today + timedelta(days=1)
+        today_rollup = next(iter(store.daily(today, tomorrow)), empty_rollup(today.isoformat()))
+
+        def stat(label: str, value: Any):
+            st.markdown(
+                f"""
+                <div style="
+                    padding: 0.4rem 0.7rem;
+                    margin-bottom: 0.3rem;
+                    border-radius: 999px;
+                    border: 1px solid rgba(148,163,184,0.6);
+                    display: flex;
+                    justify-content: space-between;
+                    font-size: 0.85rem;
+                ">
+                  <span style="color:#9ca3af;">{label}</span>
+                  <span style="font-weight:600;">{value}</span>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+
+        stat("Readings today", today_rollup["bg_count"])
+        stat("Meds logged today", today_rollup["med_count"])
+        stat("Meals today", today_rollup["meal_count"])
+        stat("Activity logs today", today_rollup["activity_count"])
+
+        overall = store.time_in_range()
+        if overall["count"]:
+            stat("Total readings", overall["count"])
+            stat("In range (%)", f"{round(overall['in_range'] / overall['count'] * 100)}%")
+            stat("Lows", overall["low"])
+            stat("Highs", overall["high"])
+        else:
+            st.caption("Log some readings to see more stats here.")
+
+        week = store.daily(today - timedelta(days=6), tomorrow)
+        if week:
+            st.markdown("#### Last 7 days")
+            summary = pd.DataFrame(week)
+            summary["in_range_pct"] = (
+                summary["bg_in_range"] / summary["bg_count"].where(summary["bg_count"] > 0) * 100
+            ).round()
+            summary["bg_mean"] = summary["bg_mean"].astype(float).round(1)
+            summary["day"] = pd.to_datetime(summary["day"]).dt.strftime("%a %d %b")
+            summary = summary[
+                ["day", "bg_count", "in_range_pct", "bg_mean", "carbs_total",
+                 "activity_minutes", "doses_taken", "doses_missed"]
+            ].rename(
+                columns={
+                    "day": "Day",
+                    "bg_count": "Readings",
+                    "in_range_pct": "In range (%)",
+                    "bg_mean": "Average",
+                    "carbs_total": "Carbs (g)",
+                    "activity_minutes": "Activity (min)",
+                    "doses_taken": "Doses taken",
+                    "doses_missed": "Doses missed",
+                }
+            )
+            st.dataframe(summary, hide_index=True, use_container_width=True)
+
+    # --- Time in range over several windows, each two lookups in the index ---
+    if overall["count"]:
+        st.markdown("### Time in range")
+        now = datetime.now()
+        cols = st.columns(len(TIR_WINDOWS) + 1)
+        for col, (label, days) in zip(cols, TIR_WINDOWS.items()):
+            with col:
+                tir_metric(label, store.time_in_range(now - timedelta(days=days)))
+        with cols[-1]:
+            picked = st.date_input(
+                "Custom", value=(today - timedelta(days=29), today), key="tir_custom"
+            )
+            if len(picked) == 2:
+                start, end = picked
+                tir_metric(
+                    f"{start:%d %b} – {end:%d %b}",
+                    store.time_in_range(
+                        datetime.combine(start, datetime.min.time()),
+                        datetime.combine(end + timedelta(days=1), datetime.min.time()),
+                    ),
+                )
+        st.caption(
+            f"Share of readings between {settings['target_min']} and {settings['target_max']} mmol/L."
+        )
@@ -0,0 +1,82 @@
+import streamlit as st
+
+from cache import shared_cache
+from metrics import METRICS_PATH, REGISTRY, timed
+
+
+@timed()
+def page_diagnostics():
+    st.title("🩺 Diagnostics")
+
+    st.markdown(
+        "How long each part of the app took on recent reruns, how many rows it "
+        "processed and how often it could reuse cached work."
+    )
+
+    history = st.session_state.get("rerun_history")
+    if not history:
+        st.info("Move between a few pages and the timings will appear here.")
+        return
+
+    last = history[-1]
+    st.markdown(f"### Previous rerun: {last.page} ({last.seconds * 1000:.0f} ms)")
+    st.dataframe(
+        [
+            {
+                "Section": name,
+                "ms": round(section.seconds * 1000, 1),
+                "Calls": section.calls,
+                "Rows": section.rows,
+                "Cache hits": section.cache_hits,
+            }
+            for name, section in last.sections.items()
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+    st.markdown("### Recent reruns")
+    st.dataframe(
+        [
+            {
+                "Page": past.page,
+                "ms": round(past.seconds * 1000, 1),
+                "Rows": sum(
+                    section.rows for name, section in past.sections.items() if name.startswith("page_")
+                ),
+            }
+            for past in reversed(history)
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+    stats = shared_cache().snapshot()
+    st.markdown("### Shared cache")
+    st.caption(
+        "Frames and reports built once per process and shared by every session of the same user."
+    )
+    cols = st.columns(5)
+    cols[0].metric("Entries", stats["entries"])
+    cols[1].metric("Size", f"{stats['bytes'] / 1e6:.1f} MB")
+    cols[2].metric("Hits", stats["hits"])
+    cols[3].metric("Misses", stats["misses"])
+    cols[4].metric("Evictions", stats["evictions"])
+
+    writes = st.session_state.store.write_stats()
+    if writes is not None:
+        st.markdown("### Write queue")
+        st.caption("Form entries are queued and written in batches by a background thread.")
+        cols = st.columns(5)
+        cols[0].metric("Queued", writes["queued"])
+        cols[1].metric("Written", writes["rows"])
+        cols[2].metric("Batches", writes["batches"])
+        cols[3].metric("Largest batch", writes["largest"])
+        cols[4].metric("Set aside", writes["failed"])
+        if writes["failed"]:
+            st.caption("Set-aside entries are listed, with a button to retry them, at the top of every page.")
+
+    with st.expander("Process-wide metrics (Prometheus text format)"):
+        st.code(REGISTRY.prometheus(), language="text")
+        if METRICS_PATH:
+            st.caption(f"Also written to {METRICS_PATH}.")
@@ -0,0 +1,48 @@
+import streamlit as st
+
+from metrics import timed
+
+
+@timed()
+def page_education():
+    st.title("📚 Education & coping")
+
+    st.markdown(
+        """
+        Living with diabetes means juggling food, movement, stress, sleep, and medication.  
+        This space is for calm, human-language explanations – not judgement.
+        """
+    )
+
+    with st.expander("Lows (hypoglycaemia)"):
+        st.write(
+            "Low blood sugar can make you feel shaky, sweaty, confused, hungry, or just 'not right'. "
+            "Treat with fast-acting sugar (like juice or glucose tablets) and re-test after about "
+            "15 minutes. If you don’t feel better, or you can’t keep sugar down, seek urgent "
+            "medical help."
+        )
+
+    with st.expander("Highs (hyperglycaemia)"):
+        st.write(
+            "High blood sugar over time can cause complications, but one high reading does **not** "
+            "mean you’ve failed. If you have very high readings and feel very unwell "
+            "(tummy pain, sickness, heavy breathing), contact emergency services – especially if you use insulin."
+        )
+
+    with st.expander("Stress, sleep & emotions"):
+        st.write(
+            "Exams, arguments, poor sleep and illness can all push your numbers up or down. You are "
+            "not a robot. Some days will just be messy – and that’s okay. What matters is safety "
+            "and patterns over time, not perfection."
+        )
+
+    with st.expander("Talking to your diabetes team"):
+        st.write(
+            "Bring this app to appointments. Show your nurse or doctor your readings and notes. "
+            "Use phrases like *'I’ve noticed I’m often high in the morning'* instead of *'I’m bad at this'*. "
+            "You deserve care, not judgement."
+        )
+
+    st.caption(
+        "Always follow advice from your diabetes team. This app is a companion, not a replacement for professional care."
+    )
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+from metrics import timed
+from storage import Store
+
+# The longest range one file covers. Streamlit holds a download in memory
+# until the page moves on (see below), so this bounds that copy: five years
+# of CGM readings every 5 minutes is about 30 MB as a CSV timeline and
+# 5 MB as Parquet.
+MAX_EXPORT_DAYS = 5 * 365
+
+
+@timed()
+def page_export():
+    store: Store = st.session_state.store
+
+    st.title("📤 Export")
+
+    st.markdown(
+        "Download your logs to share with your diabetes team or keep your own copy. "
+        "Parquet is a compact format for spreadsheets and analysis tools that support it."
+    )
+
+    choices = {
+        "Blood glucose": "bg_readings",
+        "Medication": "med_logs",
+        "Meals": "meal_logs",
+        "Activity": "activity_logs",
+        "Everything (one timeline)": "timeline",
+    }
+    label = st.selectbox("What to export", list(choices))
+    what = choices[label]
+
+    days = store.daily()
+    today = datetime.now().date()
+    first = datetime.strptime(days[0]["day"], "%Y-%m-%d").date() if days else today
+    last = max(datetime.strptime(days[-1]["day"], "%Y-%m-%d").date(), today) if days else today
+    default = (max(first, last - timedelta(days=MAX_EXPORT_DAYS - 1)), last)
+    picked = st.date_input("Date range", value=default, min_value=first, max_value=last)
+    start, end = picked if len(picked) == 2 else default
+    if (end - start).days >= MAX_EXPORT_DAYS:
+        start = end - timedelta(days=MAX_EXPORT_DAYS - 1)
+        st.info(
+            f"A file covers at most {MAX_EXPORT_DAYS // 365} years, so this one starts on "
+            f"{start:%d %b %Y}. Export earlier years as a separate file."
+        )
+
+    fmt = st.radio("Format", ["CSV", "Parquet"], horizontal=True).lower()
+
+    # Built when asked for, during this rerun: the store is only safe to
+    # read while a rerun holds it (a pooled SQLite store can be closed
+    # after, and a memory store changes under another rerun). The range is
+    # streamed out of the store a chunk at a time into a temporary file,
+    # but the finished file is then read into memory whole: st.download_button
+    # only takes the data as bytes and keeps them in Streamlit's in-memory
+    # media store, and a file served any other way would be readable by
+    # other users. MAX_EXPORT_DAYS keeps that copy bounded.
+    if st.button(f"Prepare {label.lower()}"):
+        # Imported here so the page itself doesn't load pandas and pyarrow.
+        from export import export_file
+
+        with st.spinner("Preparing your file…"):
+            with export_file(
+                store,
+                what,
+                datetime.combine(start, datetime.min.time()),
+                datetime.combine(end + timedelta(days=1), datetime.min.time()),
+                fmt,
+            ) as out:
+                data = out.read()
+        # Downloading doesn't rerun the page, so the button stays until the
+        # next change.
+        st.download_button(
+            f"Download {label.lower()}",
+            data=data,
+            file_name=f"alera-{what}-{start:%Y%m%d}-{end:%Y%m%d}.{fmt}",
+            mime="text/csv" if fmt == "csv" else "application/vnd.apache.parquet",
+            on_click="ignore",
+        )
@@ -0,0 +1,51 @@
+from datetime import datetime
+
+import streamlit as st
+
+from metrics import timed
+from storage import Store
+from views.common import history_browser
+
+
+@timed()
+def page_food():
+    store: Store = st.session_state.store
+
+    st.title("🍽️ Food & carbs")
+
+    with st.form("meal_form", clear_on_submit=True):
+        description = st.text_input(
+            "Meal / snack", placeholder="e.g. rice and chicken, porridge"
+        )
+        cols = st.columns(2)
+        with cols[0]:
+            carbs = st.number_input(
+                "Carbs (g, optional)", min_value=0, step=1
+            )
+        with cols[1]:
+            # Date + time instead of st.datetime_input
+            date_input = st.date_input("Date (meal)", value=datetime.now().date())
+            time_input = st.time_input("Time (meal)", value=datetime.now().time())
+            time = datetime.combine(date_input, time_input)
+
+        submitted = st.form_submit_button("Save meal")
+        if submitted:
+            if not description.strip():
+                st.error("Please enter a description.")
+            else:
+                store.append(
+                    "meal_logs",
+                    {
+                        "time": time.isoformat(),
+                        "description": description.strip(),
+                        "carbs": int(carbs) if carbs else None,
+                    }
+                )
+                st.success("Saved meal ✅")
+
+    st.markdown("### History")
+    history_browser(
+        "meal_logs",
+        "meal_history",
+        empty="No meals logged for these dates.",
+    )
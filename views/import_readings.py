@@ -0,0 +1,90 @@
+import pandas as pd
+import streamlit as st
+
+from importer import (
+    guess_column,
+    guess_header_row,
+    guess_units,
+    import_readings,
+    read_header,
+)
+from metrics import timed
+from storage import Store
+
+
+@timed()
+def page_import():
+    store: Store = st.session_state.store
+
+    st.title("📥 Import readings")
+
+    st.markdown(
+        "Upload a CSV export from your meter or CGM. Readings you already have "
+        "(same time and value) are skipped, so it is safe to import overlapping files."
+    )
+
+    upload = st.file_uploader("CSV export", type=["csv", "txt"])
+    if upload is None:
+        return
+
+    skiprows = st.number_input(
+        "Lines above the column headings",
+        min_value=0,
+        max_value=20,
+        value=guess_header_row(upload),
+        step=1,
+    )
+    try:
+        columns = read_header(upload, skiprows=int(skiprows))
+    except (ValueError, UnicodeDecodeError):
+        st.error("This file doesn’t look like a CSV export.")
+        return
+
+    cols = st.columns(2)
+    with cols[0]:
+        time_column = st.selectbox(
+            "Time column",
+            columns,
+            index=guess_column(columns, ["timestamp", "time", "date"]),
+        )
+        dayfirst = st.checkbox("Dates are day-first (e.g. 31/01/2025)", value=True)
+    with cols[1]:
+        value_column = st.selectbox(
+            "Glucose column",
+            columns,
+            index=guess_column(columns, ["glucose", "value", "mmol", "mg"]),
+        )
+        sample = pd.read_csv(
+            upload, skiprows=int(skiprows), usecols=[value_column], nrows=200
+        )[value_column]
+        upload.seek(0)
+        units_options = ["mmol/L", "mg/dL"]
+        units = st.radio(
+            "Units in file",
+            units_options,
+            index=units_options.index(
+                guess_units(value_column, pd.to_numeric(sample, errors="coerce"))
+            ),
+            horizontal=True,
+        )
+
+    if st.button("Import readings"):
+        bar = st.progress(0.0, text="Reading file…")
+        for progress in import_readings(
+            store,
+            upload,
+            time_column,
+            value_column,
+            units,
+            skiprows=int(skiprows),
+            dayfirst=dayfirst,
+        ):
+            bar.progress(
+                progress.fraction,
+                text=f"{progress.rows_read:,} rows read · {progress.added:,} added",
+            )
+        st.success(
+            f"Imported {progress.added:,} readings ✅  \n"
+            f"Skipped {progress.duplicates:,} already logged and "
+            f"{progress.unreadable:,} unreadable rows."
+        )
@@ -0,0 +1,81 @@
+import streamlit as st
+
+from insights import RECENT_DAYS
+from metrics import timed
+from views.common import bg_df, history_frame, insight_report, response_summaries, trend_chart
+
+
+@timed()
+def page_insights():
+    st.title("🧠 Insights & patterns")
+
+    df = bg_df()
+    if df.empty:
+        # Nothing in the hot window: look at the older history instead.
+        df = history_frame("bg_readings")
+    if df.empty:
+        st.info("Once you’ve logged some readings, insights will appear here.")
+        return
+
+    report = insight_report(df)
+
+    st.markdown("### Suggestions based on your data")
+    for i, text in enumerate(report.insights, start=1):
+        st.markdown(f"**Insight {i}:** {text}")
+
+    if report.variability is not None:
+        st.markdown("### Variability")
+        cols = st.columns(3)
+        cols[0].metric("Average", f"{report.variability['mean']:.1f} mmol/L")
+        cols[1].metric("Standard deviation", f"{report.variability['sd']:.1f}")
+        cols[2].metric("Variability (CV)", f"{report.variability['cv']:.0f}%")
+
+    if report.agp is not None:
+        st.markdown("### Your typical day")
+        st.line_chart(report.agp)
+        st.caption(
+            "Each line is a percentile of your readings at that hour: half of your readings "
+            "fall between the 25th and 75th lines."
+        )
+
+    st.caption(
+        f"Patterns, variability and your typical day use the {RECENT_DAYS} days up to your "
+        f"latest reading; the other suggestions count your readings since "
+        f"{df['time'].min():%d %B %Y}, not your whole history."
+    )
+
+    meal_effects, activity_effects = response_summaries(df)
+    if not meal_effects.empty or not activity_effects.empty:
+        st.markdown("### Food, activity and your readings")
+        columns = {
+            "meals": "Times logged",
+            "sessions": "Times logged",
+            "carbs": "Average carbs (g)",
+            "minutes": "Average minutes",
+            "before": "Before",
+            "after": "About 2h after",
+            "change": "Change",
+        }
+        if not meal_effects.empty:
+            st.markdown("**After meals**")
+            table = meal_effects.head(15).round(1).rename(columns=columns)
+            table.index = table.index.str.capitalize().rename("Meal")
+            st.dataframe(table, use_container_width=True)
+        if not activity_effects.empty:
+            st.markdown("**After activity**")
+            table = activity_effects.round(1).rename(columns=columns)
+            table.index.name = "Intensity"
+            st.dataframe(table, use_container_width=True)
+        st.caption(
+            "Compares your last reading in the hour before with the reading closest to two hours "
+            "after (one to three hours). Many things affect readings, so treat these as hints to "
+            "talk through, not rules."
+        )
+
+    st.markdown("### Graph view")
+    trend_chart(df, key="insights_range")
+
+    st.caption(
+        "This app never tells you to change your doses. It only highlights patterns so you can "
+        "discuss them with a professional."
+    )
@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import streamlit as st
+
+from importer import IMPORT_CONTEXT
+from metrics import timed
+from storage import Store
+from views.common import history_browser
+
+CONTEXTS = ["Before meal", "After meal", "Waking", "Bedtime", "Exercise"]
+
+
+@timed()
+def page_log_bg():
+    store: Store = st.session_state.store
+
+    st.title("🩸 Log blood glucose")
+
+    with st.form("bg_form", clear_on_submit=True):
+        cols = st.columns(2)
+        with cols[0]:
+            value = st.number_input("Value (mmol/L)", min_value=0.0, step=0.1)
+            context = st.selectbox("Context", CONTEXTS)
+        with cols[1]:
+            # Date + time instead of st.datetime_input
+            date_input = st.date_input("Date", value=datetime.now().date())
+            time_input = st.time_input("Time", value=datetime.now().time())
+            time = datetime.combine(date_input, time_input)
+
+            notes = st.text_input(
+                "Notes (optional)",
+                placeholder="How you felt / what was happening",
+            )
+
+        submitted = st.form_submit_button("Save reading")
+        if submitted:
+            store.append(
+                "bg_readings",
+                {
+                    "time": time.isoformat(),
+                    "value": float(value),
+                    "context": context,
+                    "notes": notes.strip(),
+                }
+            )
+            st.success("Saved blood glucose reading ✅")
+
+    st.markdown("### History")
+    history_browser(
+        "bg_readings",
+        "bg_history",
+        filters={context: context for context in [*CONTEXTS, IMPORT_CONTEXT]},
+        empty="No readings for these dates.",
+    )
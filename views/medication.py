@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import streamlit as st
+
+from metrics import timed
+from storage import Store
+from views.common import history_browser
+
+
+@timed()
+def page_meds():
+    store: Store = st.session_state.store
+
+    st.title("💊 Medication")
+
+    with st.form("med_form", clear_on_submit=True):
+        cols = st.columns(2)
+        with cols[0]:
+            name = st.text_input(
+                "Medication name",
+                placeholder="e.g. Metformin, long-acting insulin",
+            )
+            dose = st.text_input("Dose", placeholder="e.g. 500mg, 10 units")
+        with cols[1]:
+            # Date + time instead of st.datetime_input
+            date_input = st.date_input("Date (medication)", value=datetime.now().date())
+            time_input = st.time_input("Time (medication)", value=datetime.now().time())
+            time = datetime.combine(date_input, time_input)
+
+            taken = st.checkbox("Taken now", value=True)
+
+        submitted = st.form_submit_button("Save medication log")
+        if submitted:
+            if not name.strip():
+                st.error("Please enter a medication name.")
+            else:
+                store.append(
+                    "med_logs",
+                    {
+                        "time": time.isoformat(),
+                        "name": name.strip(),
+                        "dose": dose.strip() or "As prescribed",
+                        "taken": bool(taken),
+                    }
+                )
+                st.success("Saved medication log ✅")
+
+    st.markdown("### History")
+    history_browser(
+        "med_logs",
+        "med_history",
+        filters={"Taken": True, "Missed": False},
+        empty="No medication logged for these dates.",
+    )
@@ -0,0 +1,87 @@
+import streamlit as st
+
+from metrics import timed
+from storage import Store
+
+
+@timed()
+def page_settings():
+    store: Store = st.session_state.store
+    settings = st.session_state.settings
+
+    st.title("⚙️ Settings")
+
+    st.markdown("Set targets **with your healthcare team** if you can.")
+
+    with st.form("settings_form"):
+        diabetes_type = st.selectbox(
+            "Diabetes type",
+            ["Type 1", "Type 2", "Gestational", "Other / unsure"],
+            index=["Type 1", "Type 2", "Gestational", "Other / unsure"].index(
+                settings["diabetes_type"]
+            )
+            if settings["diabetes_type"]
+            in ["Type 1", "Type 2", "Gestational", "Other / unsure"]
+            else 0,
+        )
+
+        col1, col2 = st.columns(2)
+        with col1:
+            target_min = st.number_input(
+                "Target min (mmol/L)",
+                value=float(settings["target_min"]),
+                step=0.1,
+            )
+            hypo_threshold = st.number_input(
+                "Low alert threshold",
+                value=float(settings["hypo_threshold"]),
+                step=0.1,
+            )
+        with col2:
+            target_max = st.number_input(
+                "Target max (mmol/L)",
+                value=float(settings["target_max"]),
+                step=0.1,
+            )
+            hyper_threshold = st.number_input(
+                "High alert threshold",
+                value=float(settings["hyper_threshold"]),
+                step=0.1,
+            )
+
+        chart_points = st.number_input(
+            "Chart detail (most points drawn per chart)",
+            min_value=200,
+            max_value=10000,
+            value=int(settings["chart_points"]),
+            step=100,
+        )
+
+        diagnostics = st.checkbox(
+            "Show the diagnostics page (timings for each part of the app)",
+            value=bool(settings["diagnostics"]),
+        )
+
+        submitted = st.form_submit_button("Save settings")
+        if submitted:
+            entered = {
+                "diabetes_type": diabetes_type,
+                "target_min": float(target_min),
+                "target_max": float(target_max),
+                "hypo_threshold": float(hypo_threshold),
+                "hyper_threshold": float(hyper_threshold),
+                "chart_points": int(chart_points),
+                "diagnostics": bool(diagnostics),
+            }
+            # Only what was changed here, over the store's current settings,
+            # so this doesn't undo a change saved meanwhile in another session.
+            changed = {key: value for key, value in entered.items() if value != settings[key]}
+            store.save_settings({**store.settings, **changed})
+            st.session_state.settings = dict(store.settings)
+            st.success("Settings updated ✅")
+
+    st.caption(
+        "These values are used to colour readings as low / in range / high and to show safety alerts. "
+        "Each reading gets one class: one under the low alert counts as low, and one over the high "
+        "alert as very high, even where that overlaps your target range."
+    )